@@ -0,0 +1,118 @@
+import asyncio
+import os
+import secrets
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from ..utils.cache import tiered_cache
+from ..utils.profiling import memory_snapshots, profile_store, slow_calls
+
+# 未设置 ADMIN_TOKEN 时管理接口整体关闭
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+# 单次采样的最长时间（秒）
+MAX_PROFILE_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+
+def is_admin(token: Optional[str]) -> bool:
+    # 按字节比较：compare_digest 对含非 ASCII 字符的 str 会抛出 TypeError
+    return bool(ADMIN_TOKEN) and token is not None and secrets.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="管理接口未启用")
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="无效的管理令牌")
+
+def profile_interval(value: Optional[str], default: float = 0.001) -> float:
+    """解析采样间隔，非法值取默认值，并限制在 1ms 到 1s 之间"""
+    try:
+        interval = float(value) if value else default
+    except ValueError:
+        interval = default
+    return min(max(interval, 0.001), 1.0)
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+def _profile_response(profile: dict, format: str):
+    if profile is None:
+        raise HTTPException(status_code=404, detail="采样结果不存在或已被淘汰")
+    if format == "json":
+        return {key: profile[key] for key in ("id", "label", "started_at", "summary")}
+    # 折叠栈格式，可直接交给 flamegraph.pl 或 speedscope
+    return PlainTextResponse(profile["collapsed"], headers={"X-Profile-Id": profile["id"]})
+
+@router.post("/profile")
+async def profile(seconds: float = 10, interval: float = 0.005, format: str = "collapsed"):
+    """对整个进程采样 seconds 秒，默认返回折叠栈格式，format=json 时返回热点摘要"""
+    if not 0 < seconds <= MAX_PROFILE_SECONDS:
+        raise HTTPException(status_code=400, detail=f"采样时间须在 0 到 {MAX_PROFILE_SECONDS:g} 秒之间")
+    if not 0.001 <= interval <= 1:
+        raise HTTPException(status_code=400, detail="采样间隔须在 0.001 到 1 秒之间")
+    profiler = profile_store.begin(interval)
+    if profiler is None:
+        raise HTTPException(status_code=409, detail="已有采样正在进行")
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profile_id = profile_store.finish(profiler, f"{seconds:g}s")
+    return _profile_response(profile_store.get(profile_id), format)
+
+@router.get("/profiles")
+async def list_profiles():
+    """最近的采样结果，包括按请求头触发的单请求采样"""
+    return profile_store.list()
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: str = "collapsed"):
+    return _profile_response(profile_store.get(profile_id), format)
+
+@router.get("/slow-calls")
+async def get_slow_calls():
+    """最近超过阈值的服务方法调用，最新的在前"""
+    return {
+        "threshold_ms": round(slow_calls.threshold * 1000, 1),
+        "calls": list(reversed(slow_calls.records))
+    }
+
+@router.put("/slow-calls")
+async def set_slow_call_threshold(threshold_ms: float):
+    """调整慢调用阈值（毫秒），小于等于 0 时关闭记录"""
+    slow_calls.threshold = threshold_ms / 1000
+    return {"threshold_ms": threshold_ms}
+
+@router.post("/tracemalloc/start")
+async def start_tracemalloc(frames: int = Query(25, ge=1, le=100)):
+    """开始追踪内存分配，frames 为每次分配保存的调用栈深度，返回实际使用的深度"""
+    return {"tracing": True, "frames": memory_snapshots.start(frames)}
+
+@router.post("/tracemalloc/stop")
+async def stop_tracemalloc():
+    memory_snapshots.stop()
+    return {"tracing": False}
+
+@router.get("/tracemalloc/snapshot")
+async def tracemalloc_snapshot(
+    group_by: str = "lineno",
+    limit: int = 30,
+    app_only: bool = True,
+    format: str = "json"
+):
+    """缓存各前缀的估算占用，以及 tracemalloc 统计的分配来源和相对上一次快照的增长
+
+    format=collapsed 时返回按调用栈折叠、以字节数为权重的火焰图输入。
+    """
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by 只能是 lineno、filename 或 traceback")
+    try:
+        snapshot = await asyncio.to_thread(memory_snapshots.take, app_only)
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=f"{str(e)}，请先调用 /tracemalloc/start")
+    if format == "collapsed":
+        return PlainTextResponse(await asyncio.to_thread(memory_snapshots.collapsed, snapshot))
+    allocations = await asyncio.to_thread(memory_snapshots.statistics, snapshot, group_by, limit)
+    return {
+        "cache": {
+            "stats": tiered_cache.stats(),
+            "breakdown": tiered_cache.local.breakdown()
+        },
+        "allocations": allocations
+    }
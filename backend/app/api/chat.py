@@ -1,7 +1,9 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from ..models.chat import Message
 from ..services.chat_service import ChatService
-from typing import Dict, Any
+from ..utils.responses import dumps_json
+from typing import Dict, Any, AsyncIterator
 
 router = APIRouter()
 chat_service = None
@@ -16,11 +18,28 @@ async def chat(message: Message) -> Dict[str, Any]:
         if message.role != "user":
             raise HTTPException(status_code=400, detail="Invalid message role")
         
-        response = await chat_service.process_message(message.content)
+        response = await chat_service.process_message(message.content, message.conversation_id)
         return {
             "role": "assistant",
             "content": response["content"],
             "data": response.get("data")
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/stream")
+async def chat_stream(message: Message) -> StreamingResponse:
+    if message.role != "user":
+        raise HTTPException(status_code=400, detail="Invalid message role")
+
+    async def event_stream() -> AsyncIterator[str]:
+        # 以 Server-Sent Events 格式逐条推送
+        async for event in chat_service.stream_message(message.content, message.conversation_id):
+            payload = dumps_json(event).decode()
+            yield f"event: {event['event']}\ndata: {payload}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
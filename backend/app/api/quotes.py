@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import os
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+import orjson
+from ..services.quote_hub import QuoteHub, Subscription
+from ..utils.responses import dumps_json
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+quote_hub = None
+
+# 单个连接最多订阅的股票数量
+MAX_SYMBOLS = int(os.getenv("QUOTE_WS_MAX_SYMBOLS", "50"))
+
+def init_router(hub: QuoteHub):
+    global quote_hub
+    quote_hub = hub
+
+def _parse_symbols(value) -> list:
+    if isinstance(value, str):
+        value = value.split(",")
+    return [symbol.strip().upper() for symbol in value or [] if symbol and symbol.strip()]
+
+def _subscribe(subscription: Subscription, symbols: list):
+    for symbol in symbols:
+        if symbol in subscription.symbols:
+            continue
+        if len(subscription.symbols) >= MAX_SYMBOLS:
+            subscription.push({"type": "error", "message": f"每个连接最多订阅 {MAX_SYMBOLS} 只股票"})
+            return
+        quote_hub.subscribe(subscription, symbol)
+    subscription.push({"type": "subscribed", "symbols": sorted(subscription.symbols)})
+
+async def _send_quotes(websocket: WebSocket, subscription: Subscription):
+    while True:
+        message = await subscription.get()
+        await websocket.send_text(dumps_json(message).decode())
+
+@router.websocket("/ws")
+async def quote_stream(websocket: WebSocket, symbols: str = None):
+    """实时行情推送
+
+    连接时可通过 ?symbols=AAPL,MSFT 订阅，之后发送
+    {"action": "subscribe" | "unsubscribe", "symbols": [...]} 调整订阅。
+    """
+    await websocket.accept()
+    subscription = Subscription()
+    sender = asyncio.ensure_future(_send_quotes(websocket, subscription))
+    try:
+        if symbols:
+            _subscribe(subscription, _parse_symbols(symbols))
+        while True:
+            try:
+                message = orjson.loads(await websocket.receive_text())
+                action = message.get("action")
+                requested = _parse_symbols(message.get("symbols"))
+            except (orjson.JSONDecodeError, AttributeError, TypeError):
+                subscription.push({"type": "error", "message": "消息格式无效"})
+                continue
+            if action == "subscribe":
+                _subscribe(subscription, requested)
+            elif action == "unsubscribe":
+                for symbol in requested:
+                    quote_hub.unsubscribe(subscription, symbol)
+                subscription.push({"type": "subscribed", "symbols": sorted(subscription.symbols)})
+            else:
+                subscription.push({"type": "error", "message": f"不支持的操作: {action}"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        quote_hub.remove(subscription)
+        # 等待发送任务真正结束，避免其在连接关闭后继续运行，并记录其中的异常
+        sender.cancel()
+        [result] = await asyncio.gather(sender, return_exceptions=True)
+        if isinstance(result, Exception):
+            logger.warning(f"Quote stream sender failed: {str(result)}")
@@ -1,6 +1,9 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
 from ..services.stock_service import StockService
 from ..services.stock_analysis_service import StockAnalysisService
+from ..models.stock import BatchMetricsRequest, BatchForecastRequest, BacktestRequest
+from ..utils.serialization import SHAPE_RECORDS
+from ..utils.responses import negotiate_response
 from typing import List
 
 router = APIRouter()
@@ -11,52 +14,127 @@ def init_router(service: StockService):
     global stock_service
     stock_service = service
 
+async def _batch_symbols(batch) -> List[str]:
+    symbols = list(batch.symbols)
+    if batch.index:
+        symbols += await stock_analysis_service.get_index_constituents(batch.index)
+    if not symbols:
+        raise Exception("symbols 和 index 不能同时为空")
+    return symbols
+
+@router.post("/batch")
+async def get_batch_metrics(request: Request, batch: BatchMetricsRequest):
+    try:
+        symbols = await _batch_symbols(batch)
+        metrics = await stock_analysis_service.get_batch_metrics(
+            symbols, batch.start_date, batch.metrics, batch.end_date
+        )
+        return negotiate_response(request, metrics)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/forecast/batch")
+async def get_batch_forecast(request: Request, batch: BatchForecastRequest):
+    try:
+        symbols = await _batch_symbols(batch)
+        forecasts = await stock_analysis_service.get_batch_forecast(
+            symbols, batch.start_date, batch.days, batch.paths, batch.method, batch.end_date
+        )
+        return negotiate_response(request, forecasts)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/{symbol}")
-async def get_stock_data(symbol: str):
+async def get_stock_data(request: Request, symbol: str):
     try:
         stock_data = await stock_service.get_stock_data(symbol)
-        return stock_data
+        return negotiate_response(request, stock_data)
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Stock {symbol} not found")
 
 @router.get("/{symbol}/history")
-async def get_stock_history(symbol: str, period: str = "1mo"):
+async def get_stock_history(request: Request, symbol: str, period: str = "1mo", shape: str = SHAPE_RECORDS):
     try:
-        history_data = await stock_service.get_historical_data(symbol, period)
-        return history_data
+        history_data = await stock_service.get_historical_data(symbol, period, shape)
+        return negotiate_response(request, history_data)
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Failed to get history for {symbol}")
 
+@router.get("/{symbol}/forecast")
+async def get_stock_forecast(
+    request: Request,
+    symbol: str,
+    days: int = Query(7, ge=1, le=60),
+    paths: int = Query(2000, ge=100, le=20000),
+    method: str = "gbm"
+):
+    try:
+        forecast = await stock_service.get_forecast(symbol, days, paths, method)
+        return negotiate_response(request, forecast)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/{symbol}/bars")
+async def get_stock_bars(
+    request: Request,
+    symbol: str,
+    start: str = None,
+    end: str = None,
+    after: str = None,
+    limit: int = 500
+):
+    try:
+        bars = await stock_service.get_stored_bars(symbol, start, end, after, min(limit, 5000))
+        return negotiate_response(request, bars)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/analysis/{symbol}")
-async def get_stock_analysis(symbol: str, start_date: str):
+async def get_stock_analysis(request: Request, symbol: str, start_date: str):
+    try:
+        metrics = await stock_analysis_service.get_stock_metrics(symbol, start_date)
+        return negotiate_response(request, metrics)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/analysis/{symbol}/backtest")
+async def run_backtest(request: Request, symbol: str, backtest: BacktestRequest, shape: str = SHAPE_RECORDS):
     try:
-        metrics = stock_analysis_service.get_stock_metrics(symbol, start_date)
-        return metrics
+        result = await stock_analysis_service.run_backtest(
+            symbol,
+            backtest.start_date,
+            backtest.strategy,
+            backtest.params,
+            backtest.end_date,
+            backtest.cost,
+            shape
+        )
+        return negotiate_response(request, result)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/analysis/{symbol}/basic")
-async def get_stock_basic_metrics(symbol: str, start_date: str):
+async def get_stock_basic_metrics(request: Request, symbol: str, start_date: str):
     try:
         print(f"Fetching basic metrics for {symbol} from {start_date}")  # 添加日志
-        metrics = stock_analysis_service.get_basic_metrics(symbol, start_date)
-        return metrics
+        metrics = await stock_analysis_service.get_basic_metrics(symbol, start_date)
+        return negotiate_response(request, metrics)
     except Exception as e:
         print(f"Error in get_stock_basic_metrics: {str(e)}")  # 添加错误日志
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/analysis/{symbol}/price")
-async def get_stock_price_data(symbol: str, start_date: str):
+async def get_stock_price_data(request: Request, symbol: str, start_date: str, shape: str = SHAPE_RECORDS):
     try:
-        price_data = stock_analysis_service.get_price_data(symbol, start_date)
-        return price_data
+        price_data = await stock_analysis_service.get_price_data(symbol, start_date, shape)
+        return negotiate_response(request, price_data)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/analysis/{symbol}/changes")
-async def get_stock_sudden_changes(symbol: str, start_date: str):
+async def get_stock_sudden_changes(request: Request, symbol: str, start_date: str, shape: str = SHAPE_RECORDS):
     try:
-        changes = stock_analysis_service.get_sudden_changes(symbol, start_date)
-        return changes
+        changes = await stock_analysis_service.get_sudden_changes(symbol, start_date, shape)
+        return negotiate_response(request, changes)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e)) 
\ No newline at end of file
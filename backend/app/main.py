@@ -1,10 +1,21 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from motor.motor_asyncio import AsyncIOMotorClient
-from .api import chat, stock
+from .api import chat, stock, quotes, admin
 from .services.stock_service import StockService
 from .services.chat_service import ChatService
+from .services.quote_hub import QuoteHub
+from .services.prefetch_scheduler import PrefetchScheduler
+from .services.quote_sources import create_quote_source
+from .utils.executor import data_executor
+from .utils.compute_pool import compute_pool
+from .utils.tools import async_client
+from .utils.responses import FastJSONResponse
+from .utils.cache import tiered_cache
+from .utils.logging_config import setup_logging
+from .utils.metrics import HTTP_REQUEST_SECONDS, render_metrics
+from .utils.profiling import profile_store, slow_calls
 from .models.stock import Stock
 from pydantic import BaseModel
 from typing import List, Optional
@@ -17,14 +28,10 @@ import time
 # 加载环境变量
 load_dotenv()
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("app.log")
-    ]
+# 配置日志：经内存队列由后台线程写出，LOG_FILE 为空时只输出到控制台
+setup_logging(
+    level=getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO),
+    log_file=os.getenv("LOG_FILE", "app.log") or None
 )
 logger = logging.getLogger(__name__)
 
@@ -37,11 +44,13 @@ client = None
 db = None
 stock_service = None
 chat_service = None
+quote_hub = None
+prefetch_scheduler = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # MongoDB连接
-    global client, db, stock_service, chat_service
+    global client, db, stock_service, chat_service, quote_hub, prefetch_scheduler
     try:
         logger.info("Connecting to MongoDB...")
         client = AsyncIOMotorClient(MONGODB_URL, serverSelectionTimeoutMS=5000)
@@ -50,14 +59,36 @@ async def lifespan(app: FastAPI):
         
         db = client[DB_NAME]
         stock_service = StockService(client)
-        chat_service = ChatService(stock_service)
+        await stock_service.ensure_indexes()
+        chat_service = ChatService(stock_service, stock.stock_analysis_service)
+        # 慢调用记录：服务方法耗时超过 SLOW_CALL_THRESHOLD_MS 时写日志，可通过管理接口调整阈值
+        for service in (stock_service, stock.stock_analysis_service, chat_service):
+            slow_calls.instrument(service)
         chat.init_router(chat_service)
         stock.init_router(stock_service)
+        # 实时行情：每只被订阅的股票一个轮询任务，QUOTE_SOURCE=fake 时使用本地模拟行情
+        quote_hub = QuoteHub(
+            create_quote_source(os.getenv("QUOTE_SOURCE")),
+            interval=float(os.getenv("QUOTE_POLL_INTERVAL", "5"))
+        )
+        quotes.init_router(quote_hub)
+        # 热门股票提前刷新与关注列表预取
+        if os.getenv("PREFETCH_ENABLED", "true").lower() == "true":
+            prefetch_scheduler = PrefetchScheduler(stock_service, stock.stock_analysis_service)
+            prefetch_scheduler.start()
         yield
     except Exception as e:
         logger.error(f"Error during startup: {str(e)}")
         raise
     finally:
+        if prefetch_scheduler:
+            await prefetch_scheduler.stop()
+        if quote_hub:
+            await quote_hub.close()
+        data_executor.shutdown()
+        compute_pool.shutdown()
+        await async_client.close()
+        await tiered_cache.close()
         if client:
             logger.info("Closing MongoDB connection")
             client.close()
@@ -66,17 +97,39 @@ app = FastAPI(
     title="ChatWithStock API", 
     description="股票分析和聊天API",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
-# 请求计时中间件
+# 请求耗时指标：按路由模板而不是实际路径统计，避免每个股票代码产生一条时间序列
 @app.middleware("http")
-async def add_process_time_header(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
+async def record_request_metrics(request: Request, call_next):
+    start_time = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        process_time = time.perf_counter() - start_time
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        HTTP_REQUEST_SECONDS.labels(request.method, route, str(status)).observe(process_time)
     response.headers["X-Process-Time"] = str(process_time)
-    logger.info(f"Request to {request.url.path} processed in {process_time:.4f} seconds")
+    return response
+
+# 单请求采样：管理员请求带 X-Profile 头时对该请求期间的进程采样，结果 ID 通过 X-Profile-Id 返回
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    if not request.headers.get("x-profile") or not admin.is_admin(request.headers.get("x-admin-token")):
+        return await call_next(request)
+    profiler = profile_store.begin(admin.profile_interval(request.headers.get("x-profile-interval")))
+    if profiler is None:
+        logger.warning(f"Skipped profiling {request.url.path}: another profile is running")
+        return await call_next(request)
+    try:
+        response = await call_next(request)
+    finally:
+        profile_id = profile_store.finish(profiler, f"{request.method} {request.url.path}")
+    response.headers["X-Profile-Id"] = profile_id
     return response
 
 # 全局异常处理
@@ -104,6 +157,8 @@ app.add_middleware(
 # 注册路由
 app.include_router(chat.router, prefix="/api/chat", tags=["chat"])
 app.include_router(stock.router, prefix="/api/stock", tags=["stock"])
+app.include_router(quotes.router, prefix="/api/quotes", tags=["quotes"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 
 # 确保设置了必要的环境变量
 if not os.getenv("DASHSCOPE_API_KEY"):
@@ -128,6 +183,20 @@ async def health_check():
             content={"status": "unhealthy", "detail": str(e)}
         )
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus 指标：请求、上游获取、缓存、指标计算、序列化、数据库写入和大模型各阶段的耗时分布"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """共享缓存的命中、未命中和淘汰统计，以及预取调度状态"""
+    stats = tiered_cache.stats()
+    if prefetch_scheduler:
+        stats["prefetch"] = prefetch_scheduler.stats()
+    return stats
+
 @app.get("/api/stock/{symbol}")
 async def get_stock_data(symbol: str):
     try:
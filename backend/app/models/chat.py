@@ -5,6 +5,7 @@ class Message(BaseModel):
     role: str
     content: str
     data: Optional[Dict[str, Any]] = None
+    conversation_id: Optional[str] = None  # 用于在多轮对话间复用工具调用结果
 
 class ChatHistory(BaseModel):
     messages: List[Message] 
\ No newline at end of file
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 class StockBase(BaseModel):
@@ -25,4 +25,28 @@ class StockHistory(BaseModel):
     high: float
     low: float
     close: float
-    volume: int 
\ No newline at end of file
+    volume: int
+
+class BatchMetricsRequest(BaseModel):
+    symbols: List[str] = Field(default_factory=list, max_length=1000)
+    index: Optional[str] = None  # 指数代码，如 000300，其成分股会并入 symbols
+    start_date: str
+    end_date: Optional[str] = None
+    metrics: Optional[List[str]] = None
+
+class BatchForecastRequest(BaseModel):
+    symbols: List[str] = Field(default_factory=list, max_length=1000)
+    index: Optional[str] = None
+    start_date: str
+    end_date: Optional[str] = None
+    days: int = Field(7, ge=1, le=60)
+    paths: int = Field(2000, ge=100, le=20000)
+    method: str = "gbm"
+
+class BacktestRequest(BaseModel):
+    strategy: str
+    start_date: str
+    end_date: Optional[str] = None
+    # 策略参数，值为列表时做参数扫描，例如 {"fast": [5, 10], "slow": [20, 30, 60]}
+    params: Dict[str, Any] = Field(default_factory=dict)
+    cost: float = Field(0.001, ge=0, le=0.05)
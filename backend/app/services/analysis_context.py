@@ -0,0 +1,29 @@
+import pandas as pd
+from typing import Dict, Any, Optional
+from .indicators import IndicatorSet
+
+
+class StockAnalysisContext:
+    """单只股票一次分析所需的全部数据
+
+    基本信息、一年历史行情和市场基准只获取一次，
+    技术指标与风险指标共享同一份收益率序列，计算结果缓存在 metrics 中。
+    indicators 为包含最新K线的增量指标，checkpoint 为只包含已收盘K线、可持久化的指标状态。
+    """
+
+    def __init__(
+        self,
+        symbol: str,
+        info: Dict[str, Any],
+        hist: pd.DataFrame,
+        market_returns: Optional[pd.Series] = None
+    ):
+        self.symbol = symbol
+        self.info = info
+        self.hist = hist
+        self.market_returns = market_returns
+        self.prices = hist['Close']
+        self.returns = self.prices.pct_change().dropna()
+        self.metrics: Dict[str, Dict[str, Any]] = {}
+        self.indicators: Optional[IndicatorSet] = None
+        self.checkpoint: Optional[Dict[str, Any]] = None
@@ -0,0 +1,141 @@
+import itertools
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .metric_engine import PriceMatrix, rounded
+
+# 各策略的参数及默认值
+STRATEGIES = {
+    "ma_cross": {"fast": 5, "slow": 20},
+    "rsi": {"periods": 14, "lower": 30, "upper": 70},
+    "macd": {"fast": 12, "slow": 26, "signal": 9},
+}
+
+BACKTEST_METRICS = ('total_return', 'volatility', 'sharp_ratio', 'max_drawdown')
+
+
+def expand_grid(strategy: str, params: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    """将参数（单值或候选值列表）展开为全部参数组合，未提供的参数取默认值"""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"不支持的策略: {strategy}")
+    params = params or {}
+    unknown = set(params) - set(STRATEGIES[strategy])
+    if unknown:
+        raise ValueError(f"策略 {strategy} 不支持参数: {', '.join(sorted(unknown))}")
+    grid = {}
+    for name, default in STRATEGIES[strategy].items():
+        value = params.get(name, default)
+        grid[name] = list(value) if isinstance(value, (list, tuple)) else [value]
+    return [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+
+
+class _Indicators:
+    """同一价格序列上按参数缓存的指标，参数扫描中相同窗口只计算一次"""
+
+    def __init__(self, prices: np.ndarray):
+        self.prices = prices
+        self.series = pd.Series(prices)
+        self._cache: Dict[tuple, np.ndarray] = {}
+
+    def sma(self, window: int) -> np.ndarray:
+        key = ("sma", window)
+        if key not in self._cache:
+            # 累加和相减得到滑动均值，窗口未满的位置为 NaN
+            csum = np.concatenate(([0.0], np.cumsum(self.prices)))
+            sma = np.full(len(self.prices), np.nan)
+            if window <= len(self.prices):
+                sma[window - 1:] = (csum[window:] - csum[:-window]) / window
+            self._cache[key] = sma
+        return self._cache[key]
+
+    def ema(self, span: int) -> np.ndarray:
+        key = ("ema", span)
+        if key not in self._cache:
+            self._cache[key] = self.series.ewm(span=span, adjust=False).mean().to_numpy()
+        return self._cache[key]
+
+    def rsi(self, periods: int) -> np.ndarray:
+        key = ("rsi", periods)
+        if key not in self._cache:
+            # Wilder 平滑等价于 alpha = 1 / periods 的指数加权
+            change = self.series.diff()
+            avg_gain = change.clip(lower=0).ewm(alpha=1 / periods, adjust=False, min_periods=periods).mean()
+            avg_loss = (-change.clip(upper=0)).ewm(alpha=1 / periods, adjust=False, min_periods=periods).mean()
+            rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+            self._cache[key] = rsi.where(avg_loss != 0, 100.0).where(avg_gain.notna()).to_numpy()
+        return self._cache[key]
+
+
+def _hold_until(enter: np.ndarray, exit: np.ndarray) -> np.ndarray:
+    """由买入、卖出信号得到持仓（1 持有 / 0 空仓），信号之间保持上一状态"""
+    state = np.where(enter, 1.0, np.where(exit, 0.0, np.nan))
+    # 向前填充：记录每个位置最近一次信号的下标
+    index = np.where(np.isnan(state), 0, np.arange(len(state)))
+    np.maximum.accumulate(index, out=index)
+    held = state[index]
+    return np.nan_to_num(held, nan=0.0)
+
+
+def positions(indicators: _Indicators, strategy: str, params: Dict[str, Any]) -> np.ndarray:
+    """按收盘价生成信号，返回每日收盘后的目标持仓"""
+    if strategy == "ma_cross":
+        if params["fast"] >= params["slow"]:
+            raise ValueError("快线周期必须小于慢线周期")
+        return (indicators.sma(params["fast"]) > indicators.sma(params["slow"])).astype(float)
+    if strategy == "rsi":
+        rsi = indicators.rsi(params["periods"])
+        return _hold_until(rsi < params["lower"], rsi > params["upper"])
+    if strategy == "macd":
+        macd = indicators.ema(params["fast"]) - indicators.ema(params["slow"])
+        signal = pd.Series(macd).ewm(span=params["signal"], adjust=False).mean().to_numpy()
+        return (macd > signal).astype(float)
+    raise ValueError(f"不支持的策略: {strategy}")
+
+
+def sharpe_key(result: Dict[str, Any]) -> float:
+    """按夏普比率排序回测结果时的键，无法计算夏普比率的组合排在最后"""
+    return result['sharp_ratio'] if result['sharp_ratio'] is not None else float('-inf')
+
+
+def run_sweep(
+    prices: Sequence[float],
+    strategy: str,
+    combinations: List[Dict[str, Any]],
+    cost: float = 0.001
+) -> Dict[str, Any]:
+    """对一组参数组合做向量化回测
+
+    每个组合的持仓是矩阵的一列，信号在当日收盘产生、次日生效，换仓按 cost 扣除交易成本；
+    所有组合的净值曲线组成一个价格矩阵，由指标引擎一次计算收益、波动、夏普和回撤。
+    为模块级函数以便在进程池中执行。
+    """
+    prices = np.asarray(prices, dtype=float)
+    indicators = _Indicators(prices)
+    held = np.column_stack([positions(indicators, strategy, params) for params in combinations])
+
+    daily_returns = np.concatenate(([0.0], prices[1:] / prices[:-1] - 1))
+    exposure = np.vstack([np.zeros((1, held.shape[1])), held[:-1]])  # 前一日收盘后的持仓
+    turnover = np.abs(np.diff(exposure, axis=0, prepend=0.0))
+    strategy_returns = exposure * daily_returns[:, None] - turnover * cost
+    equity = np.cumprod(1 + strategy_returns, axis=0)
+
+    values = PriceMatrix(equity).compute(BACKTEST_METRICS)
+    metrics = rounded(values)
+    trades = (np.diff(held, axis=0, prepend=0.0) > 0).sum(axis=0)
+    best = int(np.argmax(np.nan_to_num(values['sharp_ratio'], nan=-np.inf)))
+    return {
+        "results": [
+            {
+                "params": params,
+                **{metric: metrics[metric][i] for metric in BACKTEST_METRICS},
+                "trades": int(trades[i]),
+                "exposure": round(float(exposure[:, i].mean()), 4),
+            }
+            for i, params in enumerate(combinations)
+        ],
+        # 只返回本组中夏普比率最高的净值曲线，避免在进程间传递整个矩阵
+        "best": best,
+        "best_equity": equity[:, best],
+    }
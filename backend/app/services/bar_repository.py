@@ -0,0 +1,123 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+from ..utils.bar_store import normalize_dates
+from ..utils.market_hours import last_session_close, market_for_symbol
+from ..utils.serialization import date_column, float_column, int_column
+
+logger = logging.getLogger(__name__)
+
+BAR_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+class StockBarRepository:
+    """按K线存储的历史行情集合
+
+    每根日K线一条记录，优先使用 MongoDB 时间序列集合（symbol 为 metaField，date 为 timeField），
+    只追加新的已收盘K线，读取通过 (symbol, date) 索引按区间分页查询。
+    """
+
+    def __init__(self, db, collection_name: str = "stock_bars"):
+        self.db = db
+        self.collection_name = collection_name
+        self.collection = db[collection_name]
+        # 时间序列集合不支持唯一索引，同一股票的追加需串行执行，否则并发刷新会重复写入相同K线
+        self._append_locks: Dict[str, asyncio.Lock] = {}
+
+    async def ensure_collection(self):
+        """创建时间序列集合及索引，服务器不支持时间序列集合时退化为普通集合"""
+        try:
+            await self.db.create_collection(
+                self.collection_name,
+                timeseries={"timeField": "date", "metaField": "symbol", "granularity": "hours"}
+            )
+        except CollectionInvalid:
+            pass  # 集合已存在
+        except OperationFailure as e:
+            logger.warning(f"Time-series collections unavailable, using a regular collection: {str(e)}")
+        try:
+            await self.collection.create_index([("symbol", ASCENDING), ("date", ASCENDING)])
+        except Exception as e:
+            logger.warning(f"Failed to create index on {self.collection_name}: {str(e)}")
+
+    async def last_bar_date(self, symbol: str) -> Optional[datetime]:
+        doc = await self.collection.find_one(
+            {"symbol": symbol},
+            {"date": 1, "_id": 0},
+            sort=[("date", DESCENDING)]
+        )
+        return doc["date"] if doc else None
+
+    async def append(self, symbol: str, hist: pd.DataFrame) -> int:
+        """追加数据库中尚不存在的已收盘日K线，返回写入条数"""
+        if hist.empty:
+            return 0
+        lock = self._append_locks.setdefault(symbol, asyncio.Lock())
+        async with lock:
+            return await self._append(symbol, hist)
+
+    async def _append(self, symbol: str, hist: pd.DataFrame) -> int:
+        dates = normalize_dates(hist.index)
+        # 当日K线在收盘前（包括午间休市时）仍会变化，只写入最后一个交易时段已结束的K线，集合因此只需追加、无需更新
+        final_before = pd.Timestamp(last_session_close(market_for_symbol(symbol)).date())
+        mask = (dates <= final_before).values
+        last = await self.last_bar_date(symbol)
+        if last is not None:
+            mask = mask & (dates > pd.Timestamp(last)).values
+        if not mask.any():
+            return 0
+
+        new_bars = hist[mask]
+        columns = {
+            "date": normalize_dates(new_bars.index).dt.to_pydatetime().tolist(),
+            "open": float_column(new_bars["Open"]),
+            "high": float_column(new_bars["High"]),
+            "low": float_column(new_bars["Low"]),
+            "close": float_column(new_bars["Close"]),
+            "volume": int_column(new_bars["Volume"]),
+        }
+        docs = [dict(zip(columns, row), symbol=symbol) for row in zip(*columns.values())]
+        await self.collection.insert_many(docs, ordered=False)
+        return len(docs)
+
+    async def get_bars(
+        self,
+        symbol: str,
+        start: datetime = None,
+        end: datetime = None,
+        after: datetime = None,
+        limit: int = None
+    ) -> List[Dict[str, Any]]:
+        """按日期升序查询区间内的K线，after 用于分页时从上一页最后一根K线之后继续"""
+        date_filter = {}
+        if start is not None:
+            date_filter["$gte"] = start
+        if end is not None:
+            date_filter["$lte"] = end
+        if after is not None:
+            date_filter["$gt"] = after
+        query = {"symbol": symbol}
+        if date_filter:
+            query["date"] = date_filter
+
+        cursor = self.collection.find(query, {"_id": 0, "symbol": 0}).sort("date", ASCENDING)
+        if limit:
+            cursor = cursor.limit(limit)
+        bars = await cursor.to_list(length=None)
+        # 多个 worker 进程之间的追加无法加锁，读取时去掉同一日期的重复K线
+        return [bar for i, bar in enumerate(bars) if i == 0 or bar["date"] != bars[i - 1]["date"]]
+
+    async def get_history(self, symbol: str, days: int = 365) -> Dict[str, List[Any]]:
+        """以 historical_data 的格式返回最近一段时间的收盘价和成交量"""
+        bars = await self.get_bars(symbol, start=datetime.now() - timedelta(days=days))
+        return {
+            "dates": date_column([bar["date"] for bar in bars]),
+            "prices": [bar["close"] for bar in bars],
+            "volumes": [bar["volume"] for bar in bars],
+        }
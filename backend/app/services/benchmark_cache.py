@@ -0,0 +1,144 @@
+import logging
+import os
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+import akshare as ak
+import pandas as pd
+import yfinance as yf
+
+from ..utils.bar_store import bar_store, normalize_dates
+from ..utils.executor import data_executor
+from ..utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# 默认预加载历史的起始日期，更早的区间在首次请求时再补齐
+DEFAULT_HISTORY_START = '20150101'
+
+
+def _fetch_akshare_index(symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+    # akshare 指数代码不带交易所前缀，例如 sh000001 -> 000001
+    df = ak.index_zh_a_hist(symbol=symbol[-6:], period="daily", start_date=start_date, end_date=end_date)
+    return df.rename(columns={'日期': 'date', '收盘': 'close'})[['date', 'close']]
+
+
+def _fetch_yfinance_index(symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+    end = pd.Timestamp(end_date) + pd.Timedelta(days=1)  # yfinance 的 end 不包含当天
+    df = yf.download(symbol, start=pd.Timestamp(start_date), end=end, progress=False)
+    df = df.reset_index().rename(columns={'Date': 'date', 'Close': 'close'})
+    return df[['date', 'close']]
+
+
+PROVIDERS: Dict[str, Tuple[str, Callable[[str, str, str], pd.DataFrame]]] = {
+    "akshare": ("akshare", _fetch_akshare_index),
+    "yfinance": ("yfinance", _fetch_yfinance_index),
+}
+
+
+def _to_day(value) -> pd.Timestamp:
+    day = pd.Timestamp(value)
+    if day.tzinfo is not None:
+        day = day.tz_localize(None)
+    return day.normalize()
+
+
+def beta_from_returns(stock_returns: pd.Series, market_returns: pd.Series) -> Optional[float]:
+    """按日期对齐两条收益率序列并计算贝塔系数，样本不足时返回 None"""
+    aligned = pd.concat([stock_returns, market_returns], axis=1, join='inner').dropna()
+    if len(aligned) < 2:
+        return None
+    values = aligned.to_numpy(dtype=float)
+    centered = values - values.mean(axis=0)
+    market_var = centered[:, 1] @ centered[:, 1]
+    if market_var == 0:
+        return None
+    return float(centered[:, 0] @ centered[:, 1] / market_var)
+
+
+class BenchmarkCache:
+    """进程内共享的市场基准指数缓存
+
+    每个指数只保存一条完整的收盘价序列，任意子区间通过切片获得；
+    每个交易日最多向上游增量刷新一次，历史部分持久化在本地K线存储中。
+    """
+
+    def __init__(self, history_start: str = DEFAULT_HISTORY_START):
+        self.history_start = history_start
+        self._providers: Dict[str, str] = {
+            "sh000001": "akshare",
+            "^SSE": "yfinance",
+            "^SZSE": "yfinance",
+        }
+        self._series: Dict[str, pd.Series] = {}
+        self._coverage: Dict[str, Tuple[str, str]] = {}  # 指数 -> (覆盖起始日期, 刷新日期)
+        self._inflight = SingleFlight()
+
+    def register(self, symbol: str, provider: str):
+        """注册额外的基准指数"""
+        if provider not in PROVIDERS:
+            raise ValueError(f"不支持的基准数据源: {provider}")
+        self._providers[symbol] = provider
+
+    async def get_closes(self, symbol: str, start=None, end=None) -> pd.Series:
+        """获取基准指数在 [start, end] 区间的收盘价，索引为不带时区的日期"""
+        start_day = _to_day(start) if start is not None else pd.Timestamp(self.history_start)
+        end_day = _to_day(end) if end is not None else None
+        series = await self._ensure_loaded(symbol, min(start_day.strftime('%Y%m%d'), self.history_start))
+        return series.loc[start_day:end_day]
+
+    async def get_returns(self, symbol: str, start=None, end=None) -> pd.Series:
+        """获取基准指数在 [start, end] 区间的日收益率"""
+        return (await self.get_closes(symbol, start, end)).pct_change().dropna()
+
+    async def _ensure_loaded(self, symbol: str, start_date: str) -> pd.Series:
+        today = datetime.now().strftime('%Y%m%d')
+        coverage = self._coverage.get(symbol)
+        if coverage is not None and coverage[0] <= start_date and coverage[1] == today:
+            return self._series[symbol]
+        return await self._inflight.do(
+            (symbol, start_date, today),
+            lambda: self._refresh(symbol, start_date, today)
+        )
+
+    async def _refresh(self, symbol: str, start_date: str, today: str) -> pd.Series:
+        if symbol not in self._providers:
+            raise ValueError(f"未注册的基准指数: {symbol}")
+        source, fetch = PROVIDERS[self._providers[symbol]]
+        logger.info(f"Refreshing benchmark {symbol} from {start_date}")
+        df = await data_executor.run(
+            source,
+            bar_store.sync,
+            "benchmark",
+            symbol,
+            start_date,
+            today,
+            lambda start, end: fetch(symbol, start, end),
+            date_column='date',
+            price_column='close',
+            operation=f"benchmark:{symbol}"
+        )
+        series = pd.Series(
+            df['close'].to_numpy(dtype=float),
+            index=pd.DatetimeIndex(normalize_dates(df['date']).values, name='date'),
+            name=symbol
+        )
+        self._series[symbol] = series
+        self._coverage[symbol] = (start_date, today)
+        return series
+
+
+def _benchmarks_from_env() -> Dict[str, str]:
+    # 格式: "sh000300:akshare,^HSI:yfinance"
+    benchmarks = {}
+    for item in os.getenv("BENCHMARK_INDICES", "").split(","):
+        if ":" in item:
+            symbol, provider = item.strip().split(":", 1)
+            benchmarks[symbol] = provider
+    return benchmarks
+
+
+# 全局共享的基准指数缓存
+benchmark_cache = BenchmarkCache()
+for _symbol, _provider in _benchmarks_from_env().items():
+    benchmark_cache.register(_symbol, _provider)
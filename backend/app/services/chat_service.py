@@ -1,82 +1,348 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import asyncio
+import os
 import re
+import time
 from ..models.stock import Stock
 from .stock_service import StockService
-from ..utils.tools import client, tools, execute_function
+from .stock_analysis_service import StockAnalysisService
+from ..utils.tools import async_client, tools, stock_tools, execute_function
+from ..utils.metrics import CHAT_TOOL_SECONDS, LLM_FIRST_TOKEN_SECONDS, LLM_REQUEST_SECONDS, timed
 import json
 
+# 工具耗时指标只按已声明的工具名区分，模型返回的未知名称统一归为 unknown
+TOOL_NAMES = {tool["function"]["name"] for tool in tools}
+# 只缓存行情和指标类工具的结果；时间、天气等工具每次都重新调用，避免返回过期的值
+MEMOIZED_TOOLS = {tool["function"]["name"] for tool in stock_tools}
+
+
+class ToolRun:
+    """一次对话请求中工具调用的共享状态"""
+
+    def __init__(self, memo: Dict[Tuple[str, str], Tuple[float, Any]]):
+        self.memo = memo  # 会话级工具结果缓存
+        self.contexts: Dict[str, asyncio.Future] = {}  # 股票代码 -> 分析上下文
+        self.stock_data: Optional[Dict[str, Any]] = None
+        self.risk_data: Optional[Dict[str, Any]] = None
+
+
 class ChatService:
-    def __init__(self, stock_service: StockService):
+    def __init__(self, stock_service: StockService, analysis_service: StockAnalysisService = None):
         self.stock_service = stock_service
+        self.analysis_service = analysis_service
         self.system_prompt = """你是一个专业的股票投资顾问，擅长：
         1. 股票基本面分析
         2. 技术指标解读
         3. 风险评估
         4. 投资建议
-        请用专业且易懂的语言回答用户问题，必要时使用markdown格式美化回复。"""
+        请用专业且易懂的语言回答用户问题，必要时使用markdown格式美化回复。
+        需要行情、指标或风险数据时，请调用提供的工具获取，不要编造数据。"""
+        # 模型与工具调用的超时时间（秒）
+        self.llm_timeout = float(os.getenv("CHAT_LLM_TIMEOUT", "60"))
+        self.data_timeout = float(os.getenv("CHAT_DATA_TIMEOUT", "20"))
+        # 工具调用循环的最大轮数及会话级工具结果缓存
+        self.max_tool_rounds = int(os.getenv("CHAT_MAX_TOOL_ROUNDS", "4"))
+        self.tool_result_ttl = float(os.getenv("CHAT_TOOL_RESULT_TTL", "300"))
+        self.max_conversations = 256
+        self._tool_memos: "OrderedDict[str, Dict[Tuple[str, str], Tuple[float, Any]]]" = OrderedDict()
+
+    async def process_message(self, message: str, conversation_id: str = None) -> Dict[str, Any]:
+        content = []
+        data = None
+        errors = []
+
+        async for event in self._run_agent(message, conversation_id):
+            if event["event"] == "token":
+                content.append(event["content"])
+            elif event["event"] == "data":
+                data = event["data"]
+            elif event["event"] == "analysis":
+                # 模型不可用时退化为基于预取数据的分析报告
+                content = [event["content"]]
+                data = event["data"]
+            elif event["event"] == "error":
+                errors.append(event["content"])
+
+        final_response = "\n\n".join(part for part in ["".join(content)] + errors if part)
+
+        return {
+            "role": "assistant",
+            "content": final_response,
+            "data": data
+        }
+
+    async def stream_message(self, message: str, conversation_id: str = None) -> AsyncIterator[Dict[str, Any]]:
+        """流式处理消息，边生成边返回
+
+        产出 token（模型增量文本）、tool（模型发起的工具调用）、data（图表数据）、
+        analysis（模型不可用时的分析报告及图表数据）、error 和 done 事件。
+        """
+        async for event in self._run_agent(message, conversation_id):
+            yield event
+        yield {"event": "done"}
+
+    async def _run_agent(self, message: str, conversation_id: str = None) -> AsyncIterator[Dict[str, Any]]:
+        """多轮工具调用循环
+
+        模型每一轮可以请求多个工具，同一轮的工具并发执行，结果按会话缓存；
+        模型不再请求工具时，其输出即为最终回答。
+        """
+        run = ToolRun(self._get_tool_memo(conversation_id))
+        # 股票代码可在任何网络调用前提取，提前预取分析上下文，与模型生成同时进行
+        stock_code = self._get_stock_query(message)
+        if stock_code:
+            run.contexts[stock_code] = asyncio.ensure_future(
+                self.stock_service.get_analysis_context(stock_code)
+            )
+
+        messages = self._build_messages(message)
+        try:
+            for round_index in range(self.max_tool_rounds + 1):
+                calls = {}
+                # 达到轮数上限后不再提供工具，要求模型直接作答
+                request_tools = tools if round_index < self.max_tool_rounds else None
+                try:
+                    async for event in self._stream_completion(messages, request_tools, calls):
+                        yield event
+                except Exception as e:
+                    async for event in self._fallback(stock_code, run, message, e):
+                        yield event
+                    return
+
+                if not calls:
+                    break
+
+                ordered = [calls[index] for index in sorted(calls)]
+                messages.append({
+                    "role": "assistant",
+                    "content": "",
+                    "tool_calls": [{
+                        "id": call["id"],
+                        "type": "function",
+                        "function": {"name": call["name"], "arguments": call["arguments"]}
+                    } for call in ordered]
+                })
+                for call in ordered:
+                    yield {"event": "tool", "name": call["name"], "arguments": call["arguments"]}
+
+                outputs = await asyncio.gather(*[
+                    self._execute_tool(call["name"], call["arguments"], run)
+                    for call in ordered
+                ])
+                for call, output in zip(ordered, outputs):
+                    messages.append({"role": "tool", "tool_call_id": call["id"], "content": output})
+
+            if run.stock_data is not None:
+                yield {"event": "data", "data": self._build_chart_data(run.stock_data, run.risk_data)}
+        finally:
+            # 客户端提前断开或无需使用时取消尚未完成的预取
+            for task in run.contexts.values():
+                if not task.done():
+                    task.cancel()
 
-    async def process_message(self, message: str) -> Dict[str, Any]:
+    async def _stream_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        request_tools: Optional[List[Dict[str, Any]]],
+        calls: Dict[int, Dict[str, str]]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """流式请求模型，文本增量直接产出，工具调用增量汇总到 calls 中"""
+        model = "qwen-plus"
+        kwargs = {"tools": request_tools} if request_tools else {}
+        start = time.perf_counter()
+        first_token = True
+        outcome = "error"
         try:
-            messages = [
-                {"role": "system", "content": self.system_prompt},
-                {"role": "user", "content": message}
-            ]
-
-            completion = client.chat.completions.create(
-                model="qwen-plus",
-                messages=messages,
-                tools=tools
+            stream = await asyncio.wait_for(
+                async_client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    stream=True,
+                    **kwargs
+                ),
+                self.llm_timeout
             )
+            async for chunk in stream:
+                if first_token:
+                    LLM_FIRST_TOKEN_SECONDS.labels(model).observe(time.perf_counter() - start)
+                    first_token = False
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    yield {"event": "token", "content": delta.content}
+                for tool_call in delta.tool_calls or []:
+                    call = calls.setdefault(tool_call.index, {"id": "", "name": "", "arguments": ""})
+                    if tool_call.id:
+                        call["id"] = tool_call.id
+                    if tool_call.function:
+                        if tool_call.function.name:
+                            call["name"] = tool_call.function.name
+                        if tool_call.function.arguments:
+                            call["arguments"] += tool_call.function.arguments
+            outcome = "tool_calls" if calls else "ok"
+        finally:
+            LLM_REQUEST_SECONDS.labels(model, outcome).observe(time.perf_counter() - start)
 
-            response = completion.choices[0].message
-            final_response = response.content
-            data = None
-
-            # 处理股票相关查询
-            if any(keyword in message for keyword in ["股票", "股价", "分析", "预测", "风险"]):
-                stock_code = self._extract_stock_code(message)
-                if stock_code:
-                    try:
-                        # 获取综合数据
-                        stock_data = await self.stock_service.get_stock_data(stock_code)
-                        risk_data = await self.stock_service.get_risk_analysis(stock_code)
-                        
-                        # 格式化markdown响应
-                        final_response = self._format_analysis_response(
-                            stock_data, 
-                            risk_data,
-                            message
-                        )
-                        
-                        # 准备图表数据
-                        data = {
-                            "chartData": {
-                                "dates": stock_data["historical_data"]["dates"],
-                                "prices": stock_data["historical_data"]["prices"],
-                                "volumes": stock_data["historical_data"]["volumes"],
-                                "predictions": stock_data["predictions"]["prices"]
-                            },
-                            "metrics": self._format_metrics(stock_data, risk_data)
-                        }
-                    except Exception as e:
-                        final_response += f"\n\n获取股票数据时出现错误：{str(e)}"
+    async def _fallback(
+        self,
+        stock_code: str,
+        run: "ToolRun",
+        message: str,
+        error: Exception
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """模型调用失败时，尽量用已预取的股票数据生成分析报告"""
+        if stock_code:
+            try:
+                stock_data, risk_data = await asyncio.wait_for(
+                    self._fetch_stock_analysis(stock_code, run), self.data_timeout
+                )
+                yield {
+                    "event": "analysis",
+                    "content": self._format_analysis_response(stock_data, risk_data, message),
+                    "data": self._build_chart_data(stock_data, risk_data)
+                }
+                return
+            except Exception as e:
+                yield {"event": "error", "content": f"获取股票数据时出现错误：{self._describe_error(e)}"}
+        yield {"event": "error", "content": f"抱歉，处理您的请求时出现错误：{self._describe_error(error)}"}
 
-            return {
-                "role": "assistant",
-                "content": final_response,
-                "data": data
-            }
+    async def _execute_tool(self, name: str, arguments: str, run: "ToolRun") -> str:
+        """执行单个工具调用，返回给模型的 JSON 字符串"""
+        try:
+            args = json.loads(arguments or "{}")
+        except json.JSONDecodeError:
+            return json.dumps({"error": "工具参数不是合法的JSON"}, ensure_ascii=False)
+
+        memo_key = (name, json.dumps(args, sort_keys=True, ensure_ascii=False))
+        memoize = name in MEMOIZED_TOOLS
+        try:
+            cached = run.memo.get(memo_key) if memoize else None
+            if cached is not None and time.time() - cached[0] < self.tool_result_ttl:
+                result = cached[1]
+            else:
+                with timed(CHAT_TOOL_SECONDS, tool=name if name in TOOL_NAMES else "unknown"):
+                    result = await asyncio.wait_for(self._call_tool(name, args, run), self.data_timeout)
+                if memoize:
+                    run.memo[memo_key] = (time.time(), result)
 
+            if name == "get_stock_quote":
+                run.stock_data = result
+            elif name == "get_risk_analysis":
+                run.risk_data = result
+            return json.dumps(self._summarize_tool_result(name, result), ensure_ascii=False, default=str)
         except Exception as e:
+            return json.dumps({"error": self._describe_error(e)}, ensure_ascii=False)
+
+    async def _call_tool(self, name: str, args: Dict[str, Any], run: "ToolRun") -> Any:
+        if name == "get_stock_quote":
+            symbol = self._normalize_symbol(args["symbol"])
+            context = await self._get_context(symbol, run)
+            return await self.stock_service.get_stock_data(symbol, context)
+        if name == "get_risk_analysis":
+            symbol = self._normalize_symbol(args["symbol"])
+            context = await self._get_context(symbol, run)
+            return await self.stock_service.get_risk_analysis(symbol, context)
+        if name == "get_stock_history":
+            symbol = self._normalize_symbol(args["symbol"])
+            return await self.stock_service.get_historical_data(symbol, args.get("period", "1mo"))
+        if name in ("get_stock_metrics", "get_sudden_changes"):
+            if self.analysis_service is None:
+                raise Exception("分析服务不可用")
+            code = args["symbol"].split(".")[0]
+            start_date = args.get("start_date") or (datetime.now() - timedelta(days=365)).strftime('%Y%m%d')
+            if name == "get_stock_metrics":
+                return await self.analysis_service.get_basic_metrics(code, start_date)
+            return await self.analysis_service.get_sudden_changes(code, start_date)
+        if name == "run_backtest":
+            if self.analysis_service is None:
+                raise Exception("分析服务不可用")
+            code = args["symbol"].split(".")[0]
+            start_date = args.get("start_date") or (datetime.now() - timedelta(days=3 * 365)).strftime('%Y%m%d')
+            return await self.analysis_service.run_backtest(code, start_date, args["strategy"], args.get("params"))
+        return execute_function(name, args)
+
+    async def _get_context(self, symbol: str, run: "ToolRun"):
+        """同一次对话中对同一股票的工具调用共享一个分析上下文"""
+        if symbol not in run.contexts:
+            run.contexts[symbol] = asyncio.ensure_future(self.stock_service.get_analysis_context(symbol))
+        return await asyncio.shield(run.contexts[symbol])
+
+    def _summarize_tool_result(self, name: str, result: Any) -> Any:
+        """精简返回给模型的数据，避免把完整历史序列放入上下文"""
+        if name == "get_stock_quote":
             return {
-                "role": "assistant",
-                "content": f"抱歉，处理您的请求时出现错误：{str(e)}"
+                "basic_info": result["basic_info"],
+                "technical_indicators": result["technical_indicators"],
+                "predictions": result["predictions"]
             }
+        if name == "get_stock_history":
+            return {"count": len(result), "bars": result[-30:]}
+        if name == "run_backtest":
+            best = {key: value for key, value in result["best"].items() if key != "equity_curve"}
+            return {"benchmark": result["benchmark"], "best": best, "top_results": result["results"][:5]}
+        return result
+
+    def _normalize_symbol(self, symbol: str) -> str:
+        """将6位A股代码补全为带交易所后缀的代码"""
+        symbol = symbol.strip().upper()
+        if re.fullmatch(r'[0-9]{6}', symbol):
+            return symbol + (".SS" if symbol[0] == "6" else ".SZ")
+        return symbol
+
+    def _get_tool_memo(self, conversation_id: str = None) -> Dict[Tuple[str, str], Tuple[float, Any]]:
+        """获取会话级的工具结果缓存，没有会话ID时只在本次请求内有效"""
+        if not conversation_id:
+            return {}
+        memo = self._tool_memos.pop(conversation_id, None)
+        if memo is None:
+            memo = {}
+        self._tool_memos[conversation_id] = memo
+        while len(self._tool_memos) > self.max_conversations:
+            self._tool_memos.popitem(last=False)
+        return memo
+
+    def _describe_error(self, error: Exception) -> str:
+        if isinstance(error, asyncio.TimeoutError):
+            return "请求超时"
+        return str(error)
+
+    def _build_messages(self, message: str) -> List[Dict[str, Any]]:
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": message}
+        ]
+
+    def _get_stock_query(self, message: str) -> str:
+        """判断是否为股票相关查询，是则返回股票代码"""
+        if any(keyword in message for keyword in ["股票", "股价", "分析", "预测", "风险"]):
+            return self._extract_stock_code(message)
+        return ""
+
+    async def _fetch_stock_analysis(self, stock_code: str, run: "ToolRun") -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """获取综合数据，行情和基准只获取一次并在两类指标间共享"""
+        context = await self._get_context(stock_code, run)
+        stock_data = await self.stock_service.get_stock_data(stock_code, context)
+        risk_data = await self.stock_service.get_risk_analysis(stock_code, context)
+        return stock_data, risk_data
+
+    def _build_chart_data(self, stock_data: Dict[str, Any], risk_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "chartData": {
+                "dates": stock_data["historical_data"]["dates"],
+                "prices": stock_data["historical_data"]["prices"],
+                "volumes": stock_data["historical_data"]["volumes"],
+                "predictions": stock_data["predictions"]["prices"]
+            },
+            "metrics": self._format_metrics(stock_data, risk_data)
+        }
 
     def _format_analysis_response(
         self, 
         stock_data: Dict[str, Any], 
-        risk_data: Dict[str, Any],
+        risk_data: Optional[Dict[str, Any]],
         query: str
     ) -> str:
         basic = stock_data["basic_info"]
@@ -97,12 +363,17 @@ class ChatService:
 - Beta系数：{tech['beta']:.2f}
 - 波动率：{tech['volatility']*100:.2f}%
 - 夏普比率：{tech['sharpe_ratio']:.2f}
+"""
 
+        if risk_data:
+            response += f"""
 ### 风险评估
 - 最大回撤：{risk_data['max_drawdown']*100:.2f}%
 - 下行风险：{risk_data['downside_risk']*100:.2f}%
 - 95% VaR：{risk_data['value_at_risk']*100:.2f}%
 """
+        else:
+            response += "\n### 风险评估\n风险数据暂时无法获取。\n"
 
         # 根据查询内容添加相应的分析
         if "预测" in query or "趋势" in query:
@@ -115,7 +386,8 @@ class ChatService:
             response += f"该股票当前风险等级为{risk_level}，主要考虑因素：\n"
             response += f"- 波动率（{tech['volatility']*100:.1f}%）\n"
             response += f"- Beta系数（{tech['beta']:.2f}）\n"
-            response += f"- 最大回撤（{risk_data['max_drawdown']*100:.1f}%）\n"
+            if risk_data:
+                response += f"- 最大回撤（{risk_data['max_drawdown']*100:.1f}%）\n"
 
         return response
 
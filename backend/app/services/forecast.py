@@ -0,0 +1,136 @@
+import zlib
+from typing import Any, Dict, List, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from ..utils.serialization import float_column
+
+# 蒙特卡洛预测支持的模拟方法：gbm 为几何布朗运动，bootstrap 为对历史日对数收益率有放回抽样
+FORECAST_METHODS = ("gbm", "bootstrap")
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def forecast_seed(symbol: str, last_date) -> int:
+    """由股票代码和最后一根K线的日期生成稳定的随机种子，行情不变时预测结果不变、可以缓存"""
+    day = pd.Timestamp(last_date).strftime('%Y-%m-%d')
+    return zlib.crc32(f"{symbol}:{day}".encode())
+
+
+def _valid(prices: Sequence[float]) -> np.ndarray:
+    array = np.asarray(prices, dtype=float)
+    return array[~np.isnan(array)]
+
+
+def _log_returns(prices: Sequence[Sequence[float]]):
+    """将多只股票长度不一的价格序列转换为右侧补 NaN 的对数收益率矩阵及每行的有效长度"""
+    series = [np.diff(np.log(_valid(p))) for p in prices]
+    lengths = np.array([len(r) for r in series])
+    if (lengths < 2).any():
+        raise ValueError("历史数据不足，无法进行预测")
+    matrix = np.full((len(series), lengths.max()), np.nan)
+    for i, r in enumerate(series):
+        matrix[i, :len(r)] = r
+    return matrix, lengths
+
+
+def _random(shape, seed: Union[int, Sequence[int], None], normal: bool) -> np.ndarray:
+    """生成标准正态（normal 为 True）或 [0, 1) 均匀分布的随机数组
+
+    seed 为序列时第一维的每只股票使用各自的种子，结果不受同一批次中其他股票的影响。
+    """
+    out = np.empty(shape)
+    if seed is None or np.isscalar(seed):
+        targets = [(np.random.default_rng(seed), out)]
+    else:
+        if len(seed) != shape[0]:
+            raise ValueError("随机种子数量与股票数量不一致")
+        targets = [(np.random.default_rng(s), out[i]) for i, s in enumerate(seed)]
+    for rng, target in targets:
+        if normal:
+            rng.standard_normal(out=target)
+        else:
+            rng.random(out=target)
+    return out
+
+
+def simulate_paths(
+    prices: Sequence[Sequence[float]],
+    days: int = 7,
+    n_paths: int = 2000,
+    method: str = "gbm",
+    seed: Union[int, Sequence[int]] = None
+) -> np.ndarray:
+    """一次性模拟多只股票的未来价格路径，返回形状为 (股票数, 路径数, 天数) 的数组
+
+    seed 可以是整个批次共用的一个种子，也可以是每只股票各自的种子。
+    """
+    if method not in FORECAST_METHODS:
+        raise ValueError(f"不支持的预测方法: {method}")
+    returns, lengths = _log_returns(prices)
+    last = np.array([_valid(p)[-1] for p in prices])
+    shape = (len(lengths), n_paths, days)
+
+    if method == "gbm":
+        # 对数收益率的均值已包含 -σ²/2 的漂移修正
+        mu = np.nanmean(returns, axis=1)[:, None, None]
+        sigma = np.nanstd(returns, axis=1, ddof=1)[:, None, None]
+        steps = _random(shape, seed, normal=True)
+        steps *= sigma
+        steps += mu
+    else:
+        # 每只股票只在自身的有效样本中抽样
+        index = (_random(shape, seed, normal=False) * lengths[:, None, None]).astype(np.int64)
+        steps = np.take_along_axis(returns[:, None, :], index.reshape(len(lengths), 1, -1), axis=2).reshape(shape)
+
+    # 原地累加和取指数，不再额外分配两个与路径数组同样大小的副本
+    np.cumsum(steps, axis=2, out=steps)
+    np.exp(steps, out=steps)
+    steps *= last[:, None, None]
+    return steps
+
+
+def summarize_paths(paths: np.ndarray, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> List[Dict[str, Any]]:
+    """计算每只股票每个预测日的分位数区间，中位数作为点预测"""
+    bands = np.percentile(paths, percentiles, axis=1)  # (分位数, 股票数, 天数)
+    means = paths.mean(axis=1)
+    return [
+        {
+            "prices": float_column(np.percentile(paths[i], 50, axis=0)),
+            "mean": float_column(means[i]),
+            "bands": {f"p{p:g}": float_column(bands[j, i]) for j, p in enumerate(percentiles)},
+        }
+        for i in range(paths.shape[0])
+    ]
+
+
+def forecast_batch(
+    prices: Sequence[Sequence[float]],
+    days: int = 7,
+    n_paths: int = 2000,
+    method: str = "gbm",
+    seed: Union[int, Sequence[int]] = None,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES
+) -> List[Dict[str, Any]]:
+    """批量预测，返回与输入顺序一致的结果；为模块级函数以便在进程池中执行"""
+    paths = simulate_paths(prices, days, n_paths, method, seed)
+    return summarize_paths(paths, percentiles)
+
+
+def future_trading_days(last_date, days: int) -> List[str]:
+    """最后一根K线之后的 days 个工作日（不含节假日）"""
+    start = pd.Timestamp(last_date).normalize() + pd.Timedelta(days=1)
+    return pd.bdate_range(start=start, periods=days).strftime('%Y-%m-%d').tolist()
+
+
+def forecast_series(
+    symbol: str,
+    prices: pd.Series,
+    days: int = 7,
+    n_paths: int = 2000,
+    method: str = "gbm"
+) -> Dict[str, Any]:
+    """单只股票的预测，种子由最后一根K线决定"""
+    last_date = prices.index[-1]
+    result = forecast_batch([prices.to_numpy(dtype=float)], days, n_paths, method, forecast_seed(symbol, last_date))[0]
+    return {"dates": future_trading_days(last_date, days), **result}
@@ -0,0 +1,260 @@
+import math
+from collections import deque
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+TRADING_DAYS = 252
+
+
+class EWMA:
+    """指数加权移动平均，与 pandas 的 ewm(span=..., adjust=False) 结果一致"""
+
+    def __init__(self, span: int = None, alpha: float = None, value: Optional[float] = None):
+        self.alpha = alpha if alpha is not None else 2 / (span + 1)
+        self.value = value
+
+    def update(self, x: float) -> float:
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        return self.value
+
+    def state(self) -> Dict[str, Any]:
+        return {"alpha": self.alpha, "value": self.value}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "EWMA":
+        return cls(alpha=state["alpha"], value=state["value"])
+
+
+class WilderRSI:
+    """Wilder 平滑的相对强弱指数
+
+    前 periods 个价格变动取简单平均作为初值，之后按 (avg * (n - 1) + x) / n 递推。
+    """
+
+    def __init__(self, periods: int = 14):
+        self.periods = periods
+        self.prev: Optional[float] = None
+        self.count = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+    def update(self, price: float) -> Optional[float]:
+        if self.prev is not None:
+            change = price - self.prev
+            gain, loss = max(change, 0.0), max(-change, 0.0)
+            self.count += 1
+            n = self.periods
+            if self.count <= n:
+                # 初始阶段累加，满 periods 个变动后得到简单平均
+                self.avg_gain += gain / n
+                self.avg_loss += loss / n
+            else:
+                self.avg_gain = (self.avg_gain * (n - 1) + gain) / n
+                self.avg_loss = (self.avg_loss * (n - 1) + loss) / n
+        self.prev = price
+        return self.value
+
+    @property
+    def value(self) -> Optional[float]:
+        if self.count < self.periods:
+            return None
+        if self.avg_loss == 0:
+            return 100.0
+        return 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "periods": self.periods,
+            "prev": self.prev,
+            "count": self.count,
+            "avg_gain": self.avg_gain,
+            "avg_loss": self.avg_loss,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "WilderRSI":
+        rsi = cls(state["periods"])
+        rsi.prev = state["prev"]
+        rsi.count = state["count"]
+        rsi.avg_gain = state["avg_gain"]
+        rsi.avg_loss = state["avg_loss"]
+        return rsi
+
+
+class MACD:
+    """MACD 及其信号线"""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = EWMA(fast)
+        self.slow = EWMA(slow)
+        self.signal = EWMA(signal)
+
+    def update(self, price: float) -> Dict[str, float]:
+        macd = self.fast.update(price) - self.slow.update(price)
+        self.signal.update(macd)
+        return self.value
+
+    @property
+    def value(self) -> Optional[Dict[str, float]]:
+        if self.signal.value is None:
+            return None
+        macd = self.fast.value - self.slow.value
+        return {
+            "macd": macd,
+            "signal": self.signal.value,
+            "histogram": macd - self.signal.value
+        }
+
+    def state(self) -> Dict[str, Any]:
+        return {"fast": self.fast.state(), "slow": self.slow.state(), "signal": self.signal.state()}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "MACD":
+        macd = cls()
+        macd.fast = EWMA.from_state(state["fast"])
+        macd.slow = EWMA.from_state(state["slow"])
+        macd.signal = EWMA.from_state(state["signal"])
+        return macd
+
+
+class RollingVariance:
+    """固定窗口的滑动均值与样本方差（ddof=1）
+
+    窗口未满时按 Welford 算法累加，窗口已满时用新值替换最旧的值，每次更新 O(1)。
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, x: float) -> Optional[float]:
+        if len(self.values) < self.window:
+            self.values.append(x)
+            delta = x - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (x - self.mean)
+        else:
+            oldest = self.values.popleft()
+            self.values.append(x)
+            old_mean = self.mean
+            self.mean += (x - oldest) / self.window
+            self.m2 += (x - oldest) * (x - self.mean + oldest - old_mean)
+            self.m2 = max(self.m2, 0.0)  # 抵消浮点误差导致的微小负值
+        return self.variance
+
+    @property
+    def variance(self) -> Optional[float]:
+        n = len(self.values)
+        return self.m2 / (n - 1) if n > 1 else None
+
+    @property
+    def std(self) -> Optional[float]:
+        variance = self.variance
+        return math.sqrt(variance) if variance is not None else None
+
+    def state(self) -> Dict[str, Any]:
+        return {"window": self.window, "values": list(self.values), "mean": self.mean, "m2": self.m2}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "RollingVariance":
+        rolling = cls(state["window"])
+        rolling.values = deque(state["values"])
+        rolling.mean = state["mean"]
+        rolling.m2 = state["m2"]
+        return rolling
+
+
+class DrawdownTracker:
+    """运行中的最高点与最大回撤（以正的比例表示）"""
+
+    def __init__(self):
+        self.peak: Optional[float] = None
+        self.max_drawdown = 0.0
+
+    def update(self, price: float) -> float:
+        if self.peak is None or price > self.peak:
+            self.peak = price
+        if self.peak > 0:
+            self.max_drawdown = max(self.max_drawdown, (self.peak - price) / self.peak)
+        return self.max_drawdown
+
+    def state(self) -> Dict[str, Any]:
+        return {"peak": self.peak, "max_drawdown": self.max_drawdown}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "DrawdownTracker":
+        tracker = cls()
+        tracker.peak = state["peak"]
+        tracker.max_drawdown = state["max_drawdown"]
+        return tracker
+
+
+class IndicatorSet:
+    """一只股票的全部增量指标
+
+    逐根K线调用 update，每根K线 O(1)。state() 可序列化为 JSON 与K线一同持久化，
+    since / last_date / last_price 记录检查点覆盖的区间和最后一根K线，用于判断检查点能否续用。
+    """
+
+    def __init__(self, rsi_periods: int = 14, volatility_window: int = TRADING_DAYS):
+        self.rsi = WilderRSI(rsi_periods)
+        self.macd = MACD()
+        self.returns = RollingVariance(volatility_window)
+        self.drawdown = DrawdownTracker()
+        self.since: Optional[pd.Timestamp] = None
+        self.last_date: Optional[pd.Timestamp] = None
+        self.last_price: Optional[float] = None
+
+    def update(self, date: pd.Timestamp, price: float):
+        if math.isnan(price):
+            return  # 缺失的价格（如上市前的空值）不参与计算，否则会污染之后所有的递推结果
+        if self.last_price is not None and self.last_price != 0:
+            self.returns.update(price / self.last_price - 1)
+        self.rsi.update(price)
+        self.macd.update(price)
+        self.drawdown.update(price)
+        if self.since is None:
+            self.since = date
+        self.last_date = date
+        self.last_price = price
+
+    def copy(self) -> "IndicatorSet":
+        return IndicatorSet.from_state(self.state())
+
+    def technical(self, risk_free_rate: float = 0.02) -> Dict[str, Any]:
+        """当前的波动率、夏普比率、RSI 和 MACD"""
+        daily_vol = self.returns.std
+        volatility = daily_vol * math.sqrt(TRADING_DAYS) if daily_vol is not None else float('nan')
+        sharpe_ratio = (self.returns.mean * TRADING_DAYS - risk_free_rate) / volatility if volatility else float('nan')
+        return {
+            "volatility": volatility,
+            "sharpe_ratio": sharpe_ratio,
+            "rsi": self.rsi.value if self.rsi.value is not None else float('nan'),
+            "macd": self.macd.value or {"macd": float('nan'), "signal": float('nan'), "histogram": float('nan')}
+        }
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "rsi": self.rsi.state(),
+            "macd": self.macd.state(),
+            "returns": self.returns.state(),
+            "drawdown": self.drawdown.state(),
+            "since": self.since.strftime('%Y-%m-%d') if self.since is not None else None,
+            "last_date": self.last_date.strftime('%Y-%m-%d') if self.last_date is not None else None,
+            "last_price": self.last_price,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "IndicatorSet":
+        indicators = cls()
+        indicators.rsi = WilderRSI.from_state(state["rsi"])
+        indicators.macd = MACD.from_state(state["macd"])
+        indicators.returns = RollingVariance.from_state(state["returns"])
+        indicators.drawdown = DrawdownTracker.from_state(state["drawdown"])
+        indicators.since = pd.Timestamp(state["since"]) if state["since"] else None
+        indicators.last_date = pd.Timestamp(state["last_date"]) if state["last_date"] else None
+        indicators.last_price = state["last_price"]
+        return indicators
@@ -0,0 +1,164 @@
+import warnings
+from functools import cached_property
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from ..utils.bar_store import normalize_dates
+
+# 支持的横截面指标
+METRICS = ('last_price', 'total_return', 'volatility', 'sharp_ratio', 'max_drawdown', 'beta')
+
+TRADING_DAYS = 252
+
+
+class PriceMatrix:
+    """日期×股票的对齐收盘价矩阵
+
+    收益率、累计净值、滚动最高点等中间结果只计算一次并在各指标间共享，
+    所有指标按列一次性向量化计算，缺失值（上市前、数据缺失）以 NaN 表示。
+    """
+
+    def __init__(self, prices: np.ndarray, dates: Optional[pd.DatetimeIndex] = None, symbols: Sequence[str] = None):
+        self.prices = np.asarray(prices, dtype=float)
+        if self.prices.ndim == 1:
+            self.prices = self.prices[:, None]
+        self.dates = dates
+        self.symbols = list(symbols) if symbols is not None else list(range(self.prices.shape[1]))
+
+    @classmethod
+    def from_closes(cls, closes: Mapping[str, pd.Series]) -> "PriceMatrix":
+        """按日期对齐多只股票的收盘价，停牌日沿用前一交易日价格"""
+        frame = pd.concat(
+            {symbol: pd.Series(series.to_numpy(dtype=float), index=normalize_dates(series.index).values)
+             for symbol, series in closes.items()},
+            axis=1
+        ).sort_index().ffill()
+        return cls(frame.to_numpy(dtype=float), frame.index, frame.columns)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, symbol: str, date_column: str = '日期', price_column: str = '收盘') -> "PriceMatrix":
+        """由单只股票的K线数据构造单列矩阵"""
+        closes = pd.Series(df[price_column].to_numpy(dtype=float), index=df[date_column])
+        return cls.from_closes({symbol: closes})
+
+    @cached_property
+    def first(self) -> np.ndarray:
+        """每列第一个有效价格"""
+        first_row = (~np.isnan(self.prices)).argmax(axis=0)
+        return self.prices[first_row, np.arange(self.prices.shape[1])]
+
+    @cached_property
+    def last(self) -> np.ndarray:
+        return self.prices[-1]
+
+    @cached_property
+    def returns(self) -> np.ndarray:
+        """日收益率矩阵，比价格矩阵少一行"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.prices[1:] / self.prices[:-1] - 1
+
+    @cached_property
+    def return_counts(self) -> np.ndarray:
+        return (~np.isnan(self.returns)).sum(axis=0)
+
+    @cached_property
+    def mean_returns(self) -> np.ndarray:
+        return _nan_reduce(np.nanmean, self.returns)
+
+    @cached_property
+    def std_returns(self) -> np.ndarray:
+        return _nan_reduce(np.nanstd, self.returns, ddof=1)
+
+    @cached_property
+    def cumulative(self) -> np.ndarray:
+        """以首个有效价格为 1 的累计净值"""
+        return self.prices / self.first
+
+    @cached_property
+    def running_max(self) -> np.ndarray:
+        # fmax 忽略 NaN，上市前的空值不影响之后的最高点
+        return np.fmax.accumulate(self.cumulative, axis=0)
+
+    @cached_property
+    def drawdowns(self) -> np.ndarray:
+        return self.cumulative / self.running_max - 1
+
+    def market_returns_for(self, market_returns: pd.Series) -> np.ndarray:
+        """将基准收益率按日期对齐到收益率矩阵的行"""
+        if self.dates is None:
+            raise ValueError("未提供日期的价格矩阵无法对齐基准收益率")
+        market = pd.Series(market_returns.to_numpy(dtype=float), index=normalize_dates(market_returns.index).values)
+        return market.reindex(self.dates[1:]).to_numpy(dtype=float)
+
+    def total_return(self) -> np.ndarray:
+        return (self.last / self.first - 1) * 100
+
+    def volatility(self) -> np.ndarray:
+        return self.std_returns * np.sqrt(TRADING_DAYS) * 100
+
+    def sharp_ratio(self, risk_free_rate: float) -> np.ndarray:
+        annual_vol = self.std_returns * np.sqrt(TRADING_DAYS)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = (self.mean_returns * TRADING_DAYS - risk_free_rate) / annual_vol
+        return np.where(annual_vol == 0, 0.0, ratio)
+
+    def max_drawdown(self) -> np.ndarray:
+        return _nan_reduce(np.nanmin, self.drawdowns) * 100
+
+    def beta(self, market_returns: np.ndarray) -> np.ndarray:
+        """逐列计算相对基准的贝塔系数，只使用双方都有数据的交易日，样本不足时为 NaN"""
+        market = np.broadcast_to(np.asarray(market_returns, dtype=float)[:, None], self.returns.shape)
+        pair = ~np.isnan(self.returns) & ~np.isnan(market)
+        x = np.where(pair, self.returns, np.nan)
+        y = np.where(pair, market, np.nan)
+        x = x - _nan_reduce(np.nanmean, x)
+        y = y - _nan_reduce(np.nanmean, y)
+        market_var = np.nansum(y * y, axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            beta = np.nansum(x * y, axis=0) / market_var
+        return np.where((pair.sum(axis=0) >= 2) & (market_var > 0), beta, np.nan)
+
+    def compute(
+        self,
+        metrics: Iterable[str] = METRICS,
+        market_returns: Optional[np.ndarray] = None,
+        risk_free_rate: float = 0.03
+    ) -> Dict[str, np.ndarray]:
+        """一次计算多个指标，返回 指标 -> 每只股票取值的数组"""
+        values = {}
+        for metric in metrics:
+            if metric == 'last_price':
+                values[metric] = self.last
+            elif metric == 'total_return':
+                values[metric] = self.total_return()
+            elif metric == 'volatility':
+                values[metric] = self.volatility()
+            elif metric == 'sharp_ratio':
+                values[metric] = self.sharp_ratio(risk_free_rate)
+            elif metric == 'max_drawdown':
+                values[metric] = self.max_drawdown()
+            elif metric == 'beta':
+                if market_returns is None:
+                    values[metric] = np.full(self.prices.shape[1], np.nan)
+                else:
+                    values[metric] = self.beta(market_returns)
+            else:
+                raise ValueError(f"不支持的指标: {metric}")
+        return values
+
+
+def rounded(values: Dict[str, np.ndarray], decimals: int = 2) -> Dict[str, List[Optional[float]]]:
+    """统一保留小数位，NaN 转换为 None"""
+    return {
+        metric: [None if np.isnan(v) else v for v in np.round(array.astype(float), decimals).tolist()]
+        for metric, array in values.items()
+    }
+
+
+def _nan_reduce(func, array: np.ndarray, **kwargs) -> np.ndarray:
+    """按列做忽略 NaN 的归约，全为 NaN 的列返回 NaN 且不产生警告"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        return func(array, axis=0, **kwargs)
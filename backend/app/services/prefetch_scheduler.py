@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils.market_hours import MARKETS, is_market_open, last_close, market_for_symbol
+from ..utils.popularity import popularity
+
+logger = logging.getLogger(__name__)
+
+
+class PrefetchScheduler:
+    """后台预取与预热调度
+
+    - 按访问热度选出最热门的股票，在缓存（或数据库文档）过期前提前刷新；
+    - 启动时以及每个市场收盘后，对关注列表批量预取当日K线；
+    - 上游出错时按股票指数退避，避免持续冲击故障的数据源。
+    """
+
+    def __init__(self, stock_service, analysis_service, watchlist: List[str] = None):
+        self.interval = float(os.getenv("PREFETCH_INTERVAL", "30"))  # 调度间隔（秒）
+        self.top_n = int(os.getenv("PREFETCH_TOP_N", "20"))  # 每轮最多提前刷新的热门条目数
+        self.min_score = float(os.getenv("PREFETCH_MIN_SCORE", "2"))  # 视为热门的最低热度
+        self.lead = float(os.getenv("PREFETCH_LEAD", "300"))  # 行情分析缓存提前刷新的时间（秒）
+        self.max_backoff = float(os.getenv("PREFETCH_MAX_BACKOFF", "1800"))
+        self._semaphore = asyncio.Semaphore(int(os.getenv("PREFETCH_CONCURRENCY", "4")))
+        if watchlist is None:
+            watchlist = [s.strip() for s in os.getenv("PREFETCH_WATCHLIST", "").split(",") if s.strip()]
+        self.watchlist = watchlist
+
+        # 数据类型 -> (预取函数, 提前量)；行情文档每轮都会检查，提前一个调度间隔即可
+        self._warmers = {
+            "stock": (stock_service.prefetch, self.interval),
+            "analysis": (analysis_service.prefetch, max(self.lead, self.interval)),
+        }
+        self._failures: Dict[Tuple[str, str], int] = {}
+        self._retry_at: Dict[Tuple[str, str], float] = {}
+        self._watchlist_done: Dict[str, Any] = {}  # 股票 -> 已完成收盘后预取的交易日
+        self._warmed_up = False
+        self._task: Optional[asyncio.Task] = None
+        self.refreshed = 0
+        self.failed = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self._tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Prefetch tick failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def _tick(self):
+        popularity.prune()
+        jobs = {
+            key: (False, None)
+            for key, _ in popularity.top(self.top_n, self.min_score)
+        }
+        for symbol, close_day in self._due_watchlist():
+            jobs[(self._kind_for(symbol), symbol)] = (close_day is not None, close_day)
+        self._warmed_up = True
+        if jobs:
+            await asyncio.gather(*[
+                self._warm(kind, symbol, force, close_day)
+                for (kind, symbol), (force, close_day) in jobs.items()
+            ])
+
+    def _kind_for(self, symbol: str) -> str:
+        # A 股代码使用 akshare 行情，其余使用 yfinance
+        return "analysis" if symbol.isdigit() and len(symbol) == 6 else "stock"
+
+    def _due_watchlist(self):
+        """启动时预热关注列表；之后每个市场当日收盘后强制预取一次"""
+        now = datetime.now(timezone.utc)
+        for symbol in self.watchlist:
+            market = market_for_symbol(symbol)
+            close = last_close(market, now)
+            _, sessions = MARKETS[market]
+            after_close = not is_market_open(market, now) and close.time() == sessions[-1][1]
+            if after_close and self._watchlist_done.get(symbol) != close.date():
+                yield symbol, close.date()
+            elif not self._warmed_up:
+                yield symbol, None
+
+    async def _warm(self, kind: str, symbol: str, force: bool, close_day=None):
+        key = (kind, symbol)
+        if time.time() < self._retry_at.get(key, 0):
+            return
+        prefetch, lead = self._warmers[kind]
+        try:
+            async with self._semaphore:
+                refreshed = await prefetch(symbol, lead=lead, force=force)
+        except Exception as e:
+            failures = self._failures[key] = self._failures.get(key, 0) + 1
+            delay = min(self.interval * 2 ** failures, self.max_backoff)
+            self._retry_at[key] = time.time() + delay
+            self.failed += 1
+            logger.warning(f"Prefetch of {kind} data for {symbol} failed ({failures} in a row), backing off {delay:.0f}s: {str(e)}")
+            return
+        self._failures.pop(key, None)
+        self._retry_at.pop(key, None)
+        if close_day is not None:
+            self._watchlist_done[symbol] = close_day
+        if refreshed:
+            self.refreshed += 1
+            logger.info(f"Prefetched {kind} data for {symbol}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "tracked": len(popularity),
+            "hot": [
+                {"kind": kind, "symbol": symbol, "score": round(score, 2)}
+                for (kind, symbol), score in popularity.top(self.top_n, self.min_score)
+            ],
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "backing_off": len(self._retry_at),
+        }
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+from typing import Any, Dict, Set
+
+from .quote_sources import QuoteSource
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """一个客户端连接的订阅
+
+    行情通过有界队列推送给连接的发送协程，客户端消费过慢时丢弃最旧的消息，
+    不会阻塞轮询任务，也不会影响其他订阅者。
+    """
+
+    def __init__(self, max_pending: int = 100):
+        self.symbols: Set[str] = set()
+        self.dropped = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+
+    def push(self, message: Dict[str, Any]):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(message)
+
+    async def get(self) -> Dict[str, Any]:
+        return await self._queue.get()
+
+
+class QuoteHub:
+    """实时行情的服务端扇出
+
+    每个被订阅的股票只有一个后台轮询任务，按固定间隔从数据源获取报价，
+    价格或成交量变化时推送给该股票的全部订阅者。上游请求量只与不同股票的数量有关，
+    与连接数无关；最后一个订阅者离开时停止轮询，上游出错时按指数退避重试，
+    连续失败 error_after 次后向订阅者推送一次错误消息（如股票代码无效或已退市）。
+    """
+
+    def __init__(self, source: QuoteSource, interval: float = 5.0, max_backoff: float = 60.0, error_after: int = 3):
+        self.source = source
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.error_after = error_after
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._pollers: Dict[str, asyncio.Task] = {}
+        self._latest: Dict[str, Dict[str, Any]] = {}
+
+    def subscribe(self, subscription: Subscription, symbol: str):
+        subscription.symbols.add(symbol)
+        self._subscribers.setdefault(symbol, set()).add(subscription)
+        # 新订阅者立即收到最近一次报价，无需等待下一轮轮询
+        if symbol in self._latest:
+            subscription.push(self._latest[symbol])
+        if symbol not in self._pollers:
+            self._pollers[symbol] = asyncio.ensure_future(self._poll(symbol))
+
+    def unsubscribe(self, subscription: Subscription, symbol: str):
+        subscription.symbols.discard(symbol)
+        subscribers = self._subscribers.get(symbol)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[symbol]
+            self._latest.pop(symbol, None)
+            poller = self._pollers.pop(symbol, None)
+            if poller is not None:
+                poller.cancel()
+
+    def remove(self, subscription: Subscription):
+        """连接断开时取消其全部订阅"""
+        for symbol in list(subscription.symbols):
+            self.unsubscribe(subscription, symbol)
+
+    async def _poll(self, symbol: str):
+        failures = 0
+        while True:
+            try:
+                quote = await self.source.fetch(symbol)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                # 限制指数，长时间连续失败时浮点乘方不会溢出
+                delay = min(self.interval * 2 ** min(failures, 16), self.max_backoff)
+                logger.warning(f"Quote fetch failed for {symbol} ({failures} in a row), retrying in {delay:.0f}s: {str(e)}")
+                if failures == self.error_after:
+                    message = {"type": "error", "symbol": symbol, "message": f"无法获取 {symbol} 的实时行情: {str(e)}"}
+                    for subscription in list(self._subscribers.get(symbol, ())):
+                        subscription.push(message)
+                await asyncio.sleep(delay)
+                continue
+
+            failures = 0
+            latest = self._latest.get(symbol)
+            if latest is None or latest["price"] != quote["price"] or latest["volume"] != quote["volume"]:
+                message = {"type": "quote", **quote}
+                self._latest[symbol] = message
+                for subscription in list(self._subscribers.get(symbol, ())):
+                    subscription.push(message)
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "symbols": len(self._pollers),
+            "subscriptions": sum(len(subscribers) for subscribers in self._subscribers.values()),
+        }
+
+    async def close(self):
+        pollers = list(self._pollers.values())
+        self._pollers.clear()
+        for poller in pollers:
+            poller.cancel()
+        await asyncio.gather(*pollers, return_exceptions=True)
+        await self.source.close()
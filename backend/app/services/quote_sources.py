@@ -0,0 +1,71 @@
+import logging
+import random
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import yfinance as yf
+
+from ..utils.executor import data_executor
+
+logger = logging.getLogger(__name__)
+
+
+def _quote(symbol: str, price: float, previous_close: Optional[float], volume: Optional[int]) -> Dict[str, Any]:
+    change = price - previous_close if previous_close else 0.0
+    return {
+        "symbol": symbol,
+        "price": price,
+        "change": change,
+        "change_percent": change / previous_close * 100 if previous_close else 0.0,
+        "volume": volume,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+class QuoteSource:
+    """实时行情数据源接口"""
+
+    async def fetch(self, symbol: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class YFinanceQuoteSource(QuoteSource):
+    """通过 yfinance 的 fast_info 获取最新价，只请求报价而不下载历史行情"""
+
+    async def fetch(self, symbol: str) -> Dict[str, Any]:
+        def load():
+            info = yf.Ticker(symbol).fast_info
+            return info["lastPrice"], info["previousClose"], info["lastVolume"]
+
+        price, previous_close, volume = await data_executor.run("yfinance", load, operation="quote")
+        return _quote(symbol, float(price), previous_close, int(volume) if volume is not None else None)
+
+
+class FakeQuoteSource(QuoteSource):
+    """本地随机游走行情，用于测试和离线开发"""
+
+    def __init__(self, start_price: float = 100.0, volatility: float = 0.002, seed: Optional[int] = None):
+        self.start_price = start_price
+        self.volatility = volatility
+        self._random = random.Random(seed)
+        self._prices: Dict[str, float] = {}
+        self.fetch_count = 0
+
+    async def fetch(self, symbol: str) -> Dict[str, Any]:
+        self.fetch_count += 1
+        price = self._prices.get(symbol, self.start_price)
+        price *= 1 + self._random.gauss(0, self.volatility)
+        self._prices[symbol] = price
+        return _quote(symbol, round(price, 4), self.start_price, self._random.randint(0, 10000))
+
+
+def create_quote_source(name: Optional[str]) -> QuoteSource:
+    """根据名称创建行情数据源，默认使用 yfinance"""
+    if not name or name == "yfinance":
+        return YFinanceQuoteSource()
+    if name == "fake":
+        return FakeQuoteSource()
+    raise ValueError(f"不支持的行情数据源: {name}")
@@ -3,241 +3,422 @@ import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 import logging
-from functools import lru_cache
-import time
+import asyncio
+import os
+from ..utils.executor import data_executor
+from ..utils.singleflight import SingleFlight
+from ..utils.cache import tiered_cache, estimate_size
+from ..utils.cache_backends import encode_frame, decode_frame, encode_json, decode_json
+from ..utils.bar_store import bar_store, normalize_dates
+from ..utils.popularity import popularity
+from ..utils.serialization import SHAPE_RECORDS, date_column, float_column, int_column, shape_payload
+from .benchmark_cache import benchmark_cache
+from .metric_engine import METRICS, PriceMatrix, rounded
+from .forecast import FORECAST_METHODS, forecast_batch, forecast_seed, future_trading_days
+from .backtest import expand_grid, run_sweep, sharpe_key
+from ..utils.compute_pool import compute_pool
+from ..utils.metrics import INDICATOR_COMPUTE_SECONDS, timed
 
-# 配置日志
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+class CoveredFrame:
+    """缓存的K线数据及其覆盖的日期区间（YYYYMMDD，两端均包含）"""
+
+    def __init__(self, df: pd.DataFrame, start: str, end: str):
+        self.df = df
+        self.start = start
+        self.end = end
+        self._dates = normalize_dates(df['日期']).values
+
+    def contains(self, start: str, end: str) -> bool:
+        return self.start <= start and end <= self.end
+
+    def __sizeof__(self) -> int:
+        return estimate_size(self.df)
+
+    def to_bytes(self) -> bytes:
+        return encode_frame(self.df, {'start': self.start, 'end': self.end})
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CoveredFrame":
+        df, meta = decode_frame(data)
+        return cls(df, meta['start'], meta['end'])
+
+    def slice(self, start: str, end: str) -> pd.DataFrame:
+        """按日期二分查找截取子区间，返回副本"""
+        left = np.searchsorted(self._dates, np.datetime64(pd.Timestamp(start)), side='left')
+        right = np.searchsorted(self._dates, np.datetime64(pd.Timestamp(end)), side='right')
+        return self.df.iloc[left:right].reset_index(drop=True).copy()
+
+
 class StockAnalysisService:
     def __init__(self):
         self.risk_free_rate = 0.03  # 假设无风险利率为3%
-        self._data_cache = {}
-        self._cache_expiry = {}  # 缓存过期时间
+        self._cache = tiered_cache
         self._cache_duration = 3600  # 缓存有效期（秒）
+        self._inflight = SingleFlight()  # 合并相同区间的并发下载
+        self._batch_concurrency = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))  # 批量接口的并发获取上限
+        self._forecast_chunk_size = int(os.getenv("FORECAST_CHUNK_SIZE", "100"))  # 批量预测时每个进程最多处理的股票数
+        # 批量预测按 股票数×路径数×天数 衡量计算量：每块不超过 chunk_cells，总量超过 inline_cells 时交给进程池
+        self._forecast_chunk_cells = int(os.getenv("FORECAST_CHUNK_CELLS", "2000000"))
+        self._forecast_inline_cells = int(os.getenv("FORECAST_INLINE_CELLS", "200000"))
+        self._backtest_chunk_size = int(os.getenv("BACKTEST_CHUNK_SIZE", "200"))  # 参数扫描时每个进程处理的组合数
+        self._backtest_max_combinations = int(os.getenv("BACKTEST_MAX_COMBINATIONS", "5000"))
 
-    def get_stock_metrics(self, symbol: str, start_date: str, end_date: str = None):
+    async def get_stock_metrics(self, symbol: str, start_date: str, end_date: str = None):
         """获取股票的所有指标"""
         try:
             if end_date is None:
                 end_date = datetime.now().strftime('%Y%m%d')
                 
             # 获取股票历史数据
-            df = self._get_stock_data(symbol, start_date, end_date)
+            df = await self._get_stock_data(symbol, start_date, end_date)
             
             # 计算各项指标
-            metrics = {
-                'total_return': self._calculate_total_return(df),
-                'volatility': self._calculate_volatility(df),
-                'sharp_ratio': self._calculate_sharp_ratio(df),
-                'max_drawdown': self._calculate_max_drawdown(df),
-                'sudden_changes': self._detect_sudden_changes(df),
-                'beta': self._calculate_beta(df, symbol),
-                'daily_stats': self._get_daily_stats(df)
-            }
+            metrics = await self._calculate_metrics(
+                df, symbol, ('total_return', 'volatility', 'sharp_ratio', 'max_drawdown', 'beta')
+            )
+            metrics['sudden_changes'] = self._detect_sudden_changes(df)
+            metrics['daily_stats'] = self._get_daily_stats(df)
             
             return metrics
         except Exception as e:
             logger.error(f"Error calculating metrics for {symbol}: {str(e)}")
             raise Exception(f"无法计算股票 {symbol} 的指标: {str(e)}")
     
-    def _calculate_total_return(self, df):
-        """计算总收益率"""
-        if df.empty or len(df) < 2:
-            return 0.0
-        total_return = (df['收盘'].iloc[-1] / df['收盘'].iloc[0] - 1) * 100
-        return round(total_return, 2)
-    
-    def _calculate_volatility(self, df):
-        """计算年化波动率"""
-        if df.empty or len(df) < 2:
-            return 0.0
-        daily_vol = df['daily_returns'].std()
-        annual_vol = daily_vol * np.sqrt(252) * 100
-        return round(annual_vol, 2)
-    
-    def _calculate_sharp_ratio(self, df):
-        """计算夏普比率"""
-        if df.empty or len(df) < 2:
-            return 0.0
-        daily_returns = df['daily_returns'].mean() * 252
-        daily_vol = df['daily_returns'].std() * np.sqrt(252)
-        if daily_vol == 0:
-            return 0.0
-        sharp_ratio = (daily_returns - self.risk_free_rate) / daily_vol
-        return round(sharp_ratio, 2)
-    
-    def _calculate_max_drawdown(self, df):
-        """计算最大回撤"""
-        if df.empty or len(df) < 2:
-            return 0.0
-        cumulative = (1 + df['daily_returns'].fillna(0)).cumprod()
-        rolling_max = cumulative.expanding().max()
-        drawdowns = (cumulative - rolling_max) / rolling_max
-        max_drawdown = drawdowns.min() * 100
-        return round(max_drawdown, 2)
+    async def _calculate_metrics(self, df, symbol, metrics):
+        """以单列价格矩阵计算单只股票的指标，无法计算时贝塔取 1.0、其余取 0.0"""
+        matrix = PriceMatrix.from_frame(df, symbol)
+        market_returns = await self._market_returns(matrix) if 'beta' in metrics else None
+        with timed(INDICATOR_COMPUTE_SECONDS, kind="metrics"):
+            values = rounded(matrix.compute(metrics, market_returns, self.risk_free_rate))
+        return {
+            metric: (1.0 if metric == 'beta' else 0.0) if column[0] is None else column[0]
+            for metric, column in values.items()
+        }
+
+    async def _market_returns(self, matrix: PriceMatrix):
+        """以上证指数作为市场基准，从共享的基准缓存中截取价格矩阵对应区间的收益率"""
+        try:
+            market_returns = await benchmark_cache.get_returns('sh000001', matrix.dates[0], matrix.dates[-1])
+            return matrix.market_returns_for(market_returns)
+        except Exception as e:
+            logger.warning(f"Error fetching benchmark returns: {str(e)}")
+            return None
     
-    def _detect_sudden_changes(self, df):
+    def _detect_sudden_changes(self, df, shape=SHAPE_RECORDS):
         """检测突变点（这里定义为单日涨跌幅超过5%的点）"""
         if df.empty:
-            return []
+            return shape_payload({'date': [], 'change': [], 'price': []}, shape)
         threshold = 5
         sudden_changes = df[abs(df['涨跌幅']) > threshold]
         # 限制返回最近的10个突变点
         sudden_changes = sudden_changes.tail(10)
-        return [{
-            'date': row['日期'],
-            'change': round(row['涨跌幅'], 2),
-            'price': round(row['收盘'], 2)
-        } for _, row in sudden_changes.iterrows()]
+        return shape_payload({
+            'date': date_column(sudden_changes['日期']),
+            'change': float_column(sudden_changes['涨跌幅'], 2),
+            'price': float_column(sudden_changes['收盘'], 2)
+        }, shape)
     
-    def _calculate_beta(self, df, symbol):
-        """计算贝塔系数（相对于市场）"""
-        try:
-            # 获取上证指数作为市场基准
-            market_df = self._get_market_index(df.index[0].strftime('%Y%m%d'), df.index[-1].strftime('%Y%m%d'))
-            
-            # 计算市场和股票的日收益率
-            market_returns = market_df['收盘'].pct_change().dropna()
-            stock_returns = df['daily_returns'].dropna()
-            
-            # 确保日期对齐
-            aligned_data = pd.concat([stock_returns, market_returns], axis=1).dropna()
-            
-            if aligned_data.empty or len(aligned_data) < 2:
-                return 1.0
-                
-            # 计算协方差和方差
-            covariance = aligned_data.iloc[:, 0].cov(aligned_data.iloc[:, 1])
-            market_variance = aligned_data.iloc[:, 1].var()
-            
-            if market_variance == 0:
-                return 1.0
-                
-            beta = covariance / market_variance
-            return round(beta, 2)
-        except Exception as e:
-            logger.warning(f"Error calculating beta for {symbol}: {str(e)}")
-            return 1.0
-    
-    @lru_cache(maxsize=20)
-    def _get_market_index(self, start_date, end_date):
-        """获取市场指数数据（上证指数）"""
-        try:
-            df = ak.stock_zh_index_daily(symbol="sh000001", start_date=start_date, end_date=end_date)
-            return df
-        except Exception as e:
-            logger.warning(f"Error fetching market index: {str(e)}")
-            # 返回空DataFrame，保持结构一致
-            return pd.DataFrame(columns=['日期', '开盘', '收盘', '最高', '最低', '成交量'])
-    
-    def _get_daily_stats(self, df):
+    def _get_daily_stats(self, df, shape=SHAPE_RECORDS):
         """获取每日统计数据"""
         if df.empty:
-            return []
-        return [{
-            'date': row['日期'],
-            'close': round(float(row['收盘']), 2),
-            'volume': int(row['成交量']),
-            'change': round(float(row['涨跌幅']), 2)
-        } for _, row in df.iterrows()]
-
-    def get_basic_metrics(self, symbol: str, start_date: str):
+            return shape_payload({'date': [], 'close': [], 'volume': [], 'change': []}, shape)
+        return shape_payload({
+            'date': date_column(df['日期']),
+            'close': float_column(df['收盘'], 2),
+            'volume': int_column(df['成交量']),
+            'change': float_column(df['涨跌幅'], 2)
+        }, shape)
+
+    async def get_basic_metrics(self, symbol: str, start_date: str):
         """获取基本指标"""
         try:
             logger.info(f"Fetching basic metrics for {symbol} from {start_date}")
-            df = self._get_stock_data(symbol, start_date)
-            return {
-                'total_return': self._calculate_total_return(df),
-                'volatility': self._calculate_volatility(df),
-                'sharp_ratio': self._calculate_sharp_ratio(df),
-                'max_drawdown': self._calculate_max_drawdown(df),
-            }
+            df = await self._get_stock_data(symbol, start_date)
+            return await self._calculate_metrics(
+                df, symbol, ('total_return', 'volatility', 'sharp_ratio', 'max_drawdown')
+            )
         except Exception as e:
             logger.error(f"Error getting basic metrics for {symbol}: {str(e)}")
             raise Exception(f"获取股票 {symbol} 的基本指标失败: {str(e)}")
 
-    def get_price_data(self, symbol: str, start_date: str):
+    async def get_price_data(self, symbol: str, start_date: str, shape: str = SHAPE_RECORDS):
         """获取价格数据"""
         try:
-            df = self._get_stock_data(symbol, start_date)
+            df = await self._get_stock_data(symbol, start_date)
             return {
-                'daily_stats': self._get_daily_stats(df)
+                'daily_stats': self._get_daily_stats(df, shape)
             }
         except Exception as e:
             logger.error(f"Error getting price data for {symbol}: {str(e)}")
             raise Exception(f"获取股票 {symbol} 的价格数据失败: {str(e)}")
 
-    def get_sudden_changes(self, symbol: str, start_date: str):
+    async def get_sudden_changes(self, symbol: str, start_date: str, shape: str = SHAPE_RECORDS):
         """获取突变点数据"""
         try:
-            df = self._get_stock_data(symbol, start_date)
+            df = await self._get_stock_data(symbol, start_date)
             return {
-                'sudden_changes': self._detect_sudden_changes(df)
+                'sudden_changes': self._detect_sudden_changes(df, shape)
             }
         except Exception as e:
             logger.error(f"Error getting sudden changes for {symbol}: {str(e)}")
             raise Exception(f"获取股票 {symbol} 的突变点数据失败: {str(e)}")
 
-    def _get_stock_data(self, symbol: str, start_date: str, end_date: str = None):
-        """获取股票数据并缓存"""
+    async def get_batch_metrics(self, symbols, start_date: str, metrics=None, end_date: str = None):
+        """批量获取多只股票的指标
+
+        并发获取各股票行情（受并发上限约束），按日期对齐为价格矩阵后一次性向量化计算。
+        """
+        metrics = list(metrics or METRICS)
+        unknown = [m for m in metrics if m not in METRICS]
+        if unknown:
+            raise Exception(f"不支持的指标: {', '.join(unknown)}")
         if end_date is None:
             end_date = datetime.now().strftime('%Y%m%d')
+        frames, errors = await self._load_frames(symbols, start_date, end_date)
+        if not frames:
+            return {'start_date': start_date, 'end_date': end_date, 'metrics': {}, 'errors': errors}
+
+        # 宽表：行为交易日，列为股票，停牌日沿用前一交易日价格
+        matrix = PriceMatrix.from_closes({
+            symbol: pd.Series(df['收盘'].values, index=df['日期']) for symbol, df in frames.items()
+        })
+        market_returns = await self._market_returns(matrix) if 'beta' in metrics else None
+        with timed(INDICATOR_COMPUTE_SECONDS, kind="batch_metrics"):
+            values = rounded(matrix.compute(metrics, market_returns, self.risk_free_rate))
+        if 'beta' in values:
+            values['beta'] = [1.0 if beta is None else beta for beta in values['beta']]
+        return {
+            'start_date': start_date,
+            'end_date': end_date,
+            'metrics': {
+                symbol: {metric: values[metric][i] for metric in metrics}
+                for i, symbol in enumerate(matrix.symbols)
+            },
+            'errors': errors
+        }
+
+    async def get_batch_forecast(
+        self,
+        symbols,
+        start_date: str,
+        days: int = 7,
+        paths: int = 2000,
+        method: str = "gbm",
+        end_date: str = None
+    ):
+        """批量蒙特卡洛预测
+
+        所有股票的路径在一个 (股票数, 路径数, 天数) 数组中同时模拟；计算量较大时按数组大小分块交给进程池并行计算，
+        避免在事件循环中分配大数组。
+        """
+        if method not in FORECAST_METHODS:
+            raise Exception(f"不支持的预测方法: {method}")
+        if end_date is None:
+            end_date = datetime.now().strftime('%Y%m%d')
+        frames, errors = await self._load_frames(symbols, start_date, end_date)
+        symbols = [symbol for symbol in frames if len(frames[symbol]) >= 3]
+        errors.update({symbol: "历史数据不足，无法进行预测" for symbol in frames if symbol not in symbols})
+
+        # 每块的模拟数组约为 块内股票数×paths×days 个 float64，按该上限切块以限制单个进程的内存
+        size = max(1, min(self._forecast_chunk_size, self._forecast_chunk_cells // (paths * days)))
+        chunks = [symbols[i:i + size] for i in range(0, len(symbols), size)]
+        # 每只股票使用各自的种子，结果与同一批次中的其他股票无关，并与单只股票的预测一致
+        args = [
+            ([frames[symbol]['收盘'].to_numpy(dtype=float) for symbol in chunk],
+             [forecast_seed(symbol, frames[symbol]['日期'].iloc[-1]) for symbol in chunk])
+            for chunk in chunks
+        ]
+        with timed(INDICATOR_COMPUTE_SECONDS, kind="batch_forecast"):
+            if len(symbols) * paths * days > self._forecast_inline_cells:
+                results = await asyncio.gather(*[
+                    compute_pool.run(forecast_batch, prices, days, paths, method, seed) for prices, seed in args
+                ])
+            else:
+                results = [forecast_batch(prices, days, paths, method, seed) for prices, seed in args]
+
+        forecasts = {}
+        for chunk, chunk_results in zip(chunks, results):
+            for symbol, result in zip(chunk, chunk_results):
+                forecasts[symbol] = {
+                    "dates": future_trading_days(frames[symbol]['日期'].iloc[-1], days),
+                    **result
+                }
+        return {'days': days, 'method': method, 'forecasts': forecasts, 'errors': errors}
+
+    async def run_backtest(
+        self,
+        symbol: str,
+        start_date: str,
+        strategy: str,
+        params=None,
+        end_date: str = None,
+        cost: float = 0.001,
+        shape: str = SHAPE_RECORDS
+    ):
+        """回测交易策略，参数可为候选值列表以做参数扫描
+
+        组合较多时分块交给进程池并行计算；返回各组合的指标（按夏普比率降序）、
+        买入持有的基准指标以及最优组合的净值曲线。
+        """
+        try:
+            if end_date is None:
+                end_date = datetime.now().strftime('%Y%m%d')
+            combinations = expand_grid(strategy, params)
+            if len(combinations) > self._backtest_max_combinations:
+                raise ValueError(f"参数组合过多（{len(combinations)}），最多 {self._backtest_max_combinations} 个")
+            df = await self._get_stock_data(symbol, start_date, end_date)
+            prices = df['收盘'].to_numpy(dtype=float)
+
+            size = self._backtest_chunk_size
+            chunks = [combinations[i:i + size] for i in range(0, len(combinations), size)]
+            with timed(INDICATOR_COMPUTE_SECONDS, kind="backtest"):
+                if len(chunks) > 1:
+                    sweeps = await asyncio.gather(*[
+                        compute_pool.run(run_sweep, prices, strategy, chunk, cost) for chunk in chunks
+                    ])
+                else:
+                    sweeps = [run_sweep(prices, strategy, chunks[0], cost)]
+
+            results = sorted((result for sweep in sweeps for result in sweep['results']), key=sharpe_key, reverse=True)
+            best_sweep = max(sweeps, key=lambda sweep: sharpe_key(sweep['results'][sweep['best']]))
+
+            return {
+                'symbol': symbol,
+                'strategy': strategy,
+                'start_date': start_date,
+                'end_date': end_date,
+                'benchmark': await self._calculate_metrics(
+                    df, symbol, ('total_return', 'volatility', 'sharp_ratio', 'max_drawdown')
+                ),
+                'results': results,
+                'best': {
+                    **best_sweep['results'][best_sweep['best']],
+                    'equity_curve': shape_payload({
+                        'date': date_column(df['日期']),
+                        'equity': float_column(best_sweep['best_equity'], 4)
+                    }, shape)
+                }
+            }
+        except Exception as e:
+            logger.error(f"Error running backtest for {symbol}: {str(e)}")
+            raise Exception(f"股票 {symbol} 的回测失败: {str(e)}")
+
+    async def _load_frames(self, symbols, start_date: str, end_date: str):
+        """受并发上限约束地获取多只股票的行情，返回 (行情, 错误信息)"""
+        symbols = list(dict.fromkeys(symbols))  # 去重并保持顺序
+        semaphore = asyncio.Semaphore(self._batch_concurrency)
+
+        async def load(symbol):
+            async with semaphore:
+                return await self._get_stock_data(symbol, start_date, end_date)
+
+        results = await asyncio.gather(*[load(symbol) for symbol in symbols], return_exceptions=True)
+        frames, errors = {}, {}
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                errors[symbol] = str(result)
+            else:
+                frames[symbol] = result
+        return frames, errors
+
+    async def get_index_constituents(self, index: str):
+        """获取中证指数（如 000300 沪深300）的成分股代码，按天缓存"""
+        cache_key = ("csindex_cons", index)
+        symbols = await self._cache.get(cache_key, loads=decode_json)
+        if symbols is not None:
+            return symbols
+        try:
+            df = await data_executor.run("akshare", ak.index_stock_cons_csindex, symbol=index, operation="index_constituents")
+        except Exception as e:
+            logger.error(f"Error fetching constituents for {index}: {str(e)}")
+            raise Exception(f"获取指数 {index} 的成分股失败: {str(e)}")
+        symbols = df['成分券代码'].astype(str).str.zfill(6).tolist()
+        self._cache.set(cache_key, symbols, ttl=86400, dumps=encode_json)
+        return symbols
+
+    async def _get_stock_data(self, symbol: str, start_date: str, end_date: str = None):
+        """获取股票数据并缓存
+
+        每只股票（按复权方式）只缓存一份带覆盖区间的数据，区间内的请求直接切片，
+        超出区间时只补齐缺失的一端。
+        """
+        if end_date is None:
+            end_date = datetime.now().strftime('%Y%m%d')
+        popularity.record(("analysis", symbol))
             
-        cache_key = f"{symbol}_{start_date}_{end_date}"
-        current_time = time.time()
+        cache_key = ("akshare_hist", symbol, "qfq")
         
-        # 检查缓存是否有效
-        if (cache_key in self._data_cache and 
-            cache_key in self._cache_expiry and 
-            current_time < self._cache_expiry[cache_key]):
+        # 检查缓存是否覆盖请求区间
+        covered = await self._cache.get(cache_key, loads=CoveredFrame.from_bytes)
+        if covered is not None and covered.contains(start_date, end_date):
             logger.info(f"Using cached data for {symbol}")
-            return self._data_cache[cache_key]
+            return self._ensure_not_empty(symbol, covered.slice(start_date, end_date))
         
-        # 缓存无效或不存在，重新获取数据
+        # 缓存未覆盖请求区间，与已缓存区间合并后只获取缺失部分；相同区间的并发请求只下载一次
+        if covered is not None:
+            fetch_start, fetch_end = min(start_date, covered.start), max(end_date, covered.end)
+        else:
+            fetch_start, fetch_end = start_date, end_date
+        covered = await self._inflight.do(
+            (cache_key, fetch_start, fetch_end),
+            lambda: self._fetch_stock_data(symbol, fetch_start, fetch_end, cache_key)
+        )
+        return self._ensure_not_empty(symbol, covered.slice(start_date, end_date))
+
+    async def prefetch(self, symbol: str, lead: float = 0.0, force: bool = False) -> bool:
+        """提前刷新：缓存在 lead 秒内过期（或已不在缓存中）时重新获取其覆盖区间至今的数据，返回是否刷新"""
+        cache_key = ("akshare_hist", symbol, "qfq")
+        remaining = self._cache.ttl_remaining(cache_key)
+        if not force and remaining is not None and remaining > lead:
+            return False
+        covered = await self._cache.get(cache_key, loads=CoveredFrame.from_bytes)
+        end_date = datetime.now().strftime('%Y%m%d')
+        start_date = covered.start if covered is not None else (datetime.now() - timedelta(days=365)).strftime('%Y%m%d')
+        await self._inflight.do(
+            (cache_key, start_date, end_date),
+            lambda: self._fetch_stock_data(symbol, start_date, end_date, cache_key)
+        )
+        return True
+
+    async def _fetch_stock_data(self, symbol: str, start_date: str, end_date: str, cache_key: tuple):
+        """获取股票数据并写入缓存，本地K线存储只向上游请求尚未覆盖的区间"""
         try:
             logger.info(f"Fetching new data for {symbol} from {start_date} to {end_date}")
-            df = ak.stock_zh_a_hist(
-                symbol=symbol,
-                period="daily",
-                start_date=start_date,
-                end_date=end_date,
-                adjust="qfq"
+            df = await data_executor.run(
+                "akshare",
+                bar_store.sync,
+                "akshare_qfq",
+                symbol,
+                start_date,
+                end_date,
+                lambda start, end: ak.stock_zh_a_hist(
+                    symbol=symbol,
+                    period="daily",
+                    start_date=start,
+                    end_date=end,
+                    adjust="qfq"
+                ),
+                date_column='日期',
+                price_column='收盘',
+                operation="stock_zh_a_hist"
             )
             
             # 确保数据不为空
             if df.empty:
                 raise Exception(f"No data available for {symbol} in the specified date range")
-                
-            # 计算日收益率
-            df['daily_returns'] = df['收盘'].pct_change()
-            
-            # 更新缓存
-            self._data_cache[cache_key] = df
-            self._cache_expiry[cache_key] = current_time + self._cache_duration
             
-            # 清理过期缓存
-            self._clean_cache(current_time)
+            # 更新缓存，超出内存预算时由缓存自动淘汰
+            covered = CoveredFrame(df, start_date, end_date)
+            self._cache.set(cache_key, covered, ttl=self._cache_duration, dumps=CoveredFrame.to_bytes)
             
-            return df
+            return covered
         except Exception as e:
             logger.error(f"Error fetching data for {symbol}: {str(e)}")
             raise Exception(f"获取股票 {symbol} 的数据失败: {str(e)}")
-    
-    def _clean_cache(self, current_time):
-        """清理过期缓存"""
-        expired_keys = [k for k, v in self._cache_expiry.items() if current_time > v]
-        for key in expired_keys:
-            if key in self._data_cache:
-                del self._data_cache[key]
-            del self._cache_expiry[key]
-        
-        # 如果缓存过大，删除最旧的项
-        if len(self._data_cache) > 50:  # 最多保留50个缓存项
-            oldest_keys = sorted(self._cache_expiry.items(), key=lambda x: x[1])[:10]  # 删除10个最旧的
-            for key, _ in oldest_keys:
-                if key in self._data_cache:
-                    del self._data_cache[key]
-                if key in self._cache_expiry:
-                    del self._cache_expiry[key] 
\ No newline at end of file
+
+    def _ensure_not_empty(self, symbol: str, df: pd.DataFrame):
+        if df.empty:
+            raise Exception(f"No data available for {symbol} in the specified date range")
+        return df
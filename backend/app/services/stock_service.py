@@ -1,34 +1,245 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 import yfinance as yf
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import pandas as pd
 import numpy as np
+import re
+import os
+import asyncio
 from typing import Dict, Any, List
 from ..models.stock import Stock, StockHistory
+from .analysis_context import StockAnalysisContext
+from .indicators import IndicatorSet
+from .forecast import forecast_series
+from .bar_repository import StockBarRepository
+from ..utils.executor import data_executor
+from ..utils.singleflight import SingleFlight
+from ..utils.cache import tiered_cache
+from ..utils.cache_backends import encode_frame, decode_frame, encode_json, decode_json
+from ..utils.bar_store import bar_store, normalize_dates
+from ..utils.market_hours import market_for_symbol, is_market_open, last_close, last_session_close
+from ..utils.popularity import popularity
+from ..utils.metrics import DB_WRITE_SECONDS, INDICATOR_COMPUTE_SECONDS, timed
+from ..utils.serialization import SHAPE_RECORDS, date_column, float_column, int_column, isoformat_column, shape_payload
+from .benchmark_cache import benchmark_cache, beta_from_returns
 from scipy import stats
+import logging
+
+logger = logging.getLogger(__name__)
+
+# get_stock_data 返回并持久化的字段
+STOCK_DATA_FIELDS = ("basic_info", "technical_indicators", "historical_data", "predictions")
 
 class StockService:
     def __init__(self, client: AsyncIOMotorClient):
         self.db = client.chatwithstock
         self.collection = self.db.stocks
+        self.bars = StockBarRepository(self.db)
+        self._inflight = SingleFlight()  # 合并同一股票的并发上游请求
+        self._cache = tiered_cache
+        self._cache_duration = float(os.getenv("QUOTE_CACHE_TTL", "60"))  # 行情缓存有效期（秒）
+        # 数据库文档在交易时段内的有效期，以及过期后仍可先行返回的最长时间（秒）
+        self._doc_ttl_trading = float(os.getenv("STOCK_DOC_TTL_TRADING", "60"))
+        self._doc_max_stale = float(os.getenv("STOCK_DOC_MAX_STALE", "86400"))
+        self._background_tasks = set()
+        self._forecast_paths = int(os.getenv("FORECAST_PATHS", "2000"))  # get_stock_data 中预测的模拟路径数
+        # 增量指标检查点的起点最多早于当前行情窗口的天数，超过后从头重建
+        self._indicator_max_lag = int(os.getenv("INDICATOR_CHECKPOINT_MAX_LAG_DAYS", "90"))
 
-    async def get_stock_data(self, symbol: str) -> Dict[str, Any]:
-        stock = yf.Ticker(symbol)
-        info = stock.info
-        
-        # 获取历史数据
-        hist = stock.history(period="1y")
+    async def _cached_fetch(self, key: tuple, fetch, loads, dumps, refresh: bool = False) -> Any:
+        """先查共享缓存，未命中时合并并发请求并在获取后写入缓存，refresh 为 True 时跳过缓存读取"""
+        if not refresh:
+            value = await self._cache.get(key, loads=loads)
+            if value is not None:
+                return value
+
+        async def load():
+            value = await fetch()
+            self._cache.set(key, value, ttl=self._cache_duration, dumps=dumps)
+            return value
+
+        return await self._inflight.do(key, load)
+
+    async def _fetch_info(self, symbol: str, refresh: bool = False) -> Dict[str, Any]:
+        """在线程池中获取股票基本信息"""
+        return await self._cached_fetch(
+            ("yf_info", symbol),
+            lambda: data_executor.run("yfinance", lambda: yf.Ticker(symbol).info, operation="info"),
+            loads=decode_json,
+            dumps=encode_json,
+            refresh=refresh
+        )
+
+    async def _fetch_history(self, symbol: str, period: str, refresh: bool = False) -> pd.DataFrame:
+        """在线程池中获取股票历史数据"""
+        return await self._cached_fetch(
+            ("yf_history", symbol, period),
+            lambda: data_executor.run("yfinance", self._load_history, symbol, period, operation="history"),
+            loads=lambda data: decode_frame(data)[0],
+            dumps=encode_frame,
+            refresh=refresh
+        )
+
+    def _load_history(self, symbol: str, period: str) -> pd.DataFrame:
+        """优先从本地K线存储读取历史数据，只下载缺失的部分"""
+        start = self._period_start(period)
+        if start is None:
+            return yf.Ticker(symbol).history(period=period)
+
+        def fetch(start_date: str, end_date: str) -> pd.DataFrame:
+            # yfinance 的 end 不包含当天，因此向后顺延一天
+            end = datetime.strptime(end_date, '%Y%m%d') + timedelta(days=1)
+            hist = yf.Ticker(symbol).history(
+                start=datetime.strptime(start_date, '%Y%m%d').strftime('%Y-%m-%d'),
+                end=end.strftime('%Y-%m-%d')
+            )
+            return hist.reset_index()
+
+        hist = bar_store.sync(
+            "yfinance",
+            symbol,
+            start.strftime('%Y%m%d'),
+            datetime.now().strftime('%Y%m%d'),
+            fetch,
+            date_column='Date',
+            price_column='Close'
+        )
+        return hist.set_index('Date')
+
+    def _period_start(self, period: str):
+        """将 yfinance 的 period 转换为起始日期，无法转换时返回 None"""
+        today = pd.Timestamp(datetime.now().date())
+        if period == "ytd":
+            return today.replace(month=1, day=1)
+        match = re.fullmatch(r'(\d+)(d|wk|mo|y)', period)
+        if not match:
+            return None
+        n, unit = int(match.group(1)), match.group(2)
+        offsets = {
+            "d": pd.DateOffset(days=n),
+            "wk": pd.DateOffset(weeks=n),
+            "mo": pd.DateOffset(months=n),
+            "y": pd.DateOffset(years=n),
+        }
+        return today - offsets[unit]
+
+    async def get_analysis_context(self, symbol: str, refresh: bool = False) -> StockAnalysisContext:
+        """一次性获取分析所需的基本信息、历史行情和市场基准，refresh 为 True 时不使用行情缓存"""
+        info, hist = await asyncio.gather(
+            self._fetch_info(symbol, refresh),
+            self._fetch_history(symbol, "1y", refresh)
+        )
+        market_returns = await self._fetch_market_returns(hist['Close'], symbol)
+        context = StockAnalysisContext(symbol, info, hist, market_returns)
+        await self._attach_indicators(context)
+        return context
+
+    async def _attach_indicators(self, context: StockAnalysisContext):
+        """从检查点续算增量指标，只对检查点之后的新K线做 O(1) 更新"""
+        key = ("indicators", context.symbol)
+        state = await self._cache.get(key)
+        if state is None:
+            doc = await self.collection.find_one({"symbol": context.symbol}, {"indicator_state": 1, "_id": 0})
+            state = doc.get("indicator_state") if doc else None
+
+        checkpoint, live = self._advance_indicators(context.symbol, context.hist, state)
+        context.indicators = live
+        context.checkpoint = checkpoint.state()
+        self._cache.set(key, context.checkpoint, ttl=86400)
+
+    def _advance_indicators(self, symbol: str, hist: pd.DataFrame, state: Dict[str, Any] = None):
+        """返回 (只含已收盘K线的检查点, 含当日未收盘K线的指标)"""
+        dates = normalize_dates(hist.index)
+        closes = hist['Close'].to_numpy(dtype=float)
+        checkpoint = IndicatorSet.from_state(state) if state and self._checkpoint_valid(state, dates, closes) else IndicatorSet()
+        # 未收盘（包括午间休市）的K线仍会变化，只更新到副本上，不写入检查点
+        final_before = pd.Timestamp(last_session_close(market_for_symbol(symbol)).date())
+        live = None
+        with timed(INDICATOR_COMPUTE_SECONDS, kind="incremental"):
+            for date, price in zip(dates, closes):
+                if checkpoint.last_date is not None and date <= checkpoint.last_date:
+                    continue
+                if date <= final_before:
+                    checkpoint.update(date, price)
+                else:
+                    live = live or checkpoint.copy()
+                    live.update(date, price)
+        return checkpoint, live or checkpoint
+
+    def _checkpoint_valid(self, state: Dict[str, Any], dates: pd.Series, closes: np.ndarray) -> bool:
+        """检查点的最后一根K线仍在当前行情中且价格未变（未发生除权复权调整），
+        且起点不早于行情窗口太多（回撤等指标按近一年左右的区间计算）"""
+        if not state.get("last_date") or not state.get("since"):
+            return False
+        if pd.Timestamp(state["since"]) < dates.iloc[0] - pd.Timedelta(days=self._indicator_max_lag):
+            return False
+        matches = np.flatnonzero((dates == pd.Timestamp(state["last_date"])).values)
+        return len(matches) > 0 and bool(np.isclose(closes[matches[0]], state["last_price"], rtol=1e-6))
+
+    async def ensure_indexes(self):
+        """创建查询所需的集合和索引"""
+        try:
+            await self.collection.create_index("symbol", unique=True)
+        except Exception as e:
+            logger.warning(f"Failed to create index on stocks.symbol: {str(e)}")
+        await self.bars.ensure_collection()
+
+    async def get_stock_data(self, symbol: str, context: StockAnalysisContext = None) -> Dict[str, Any]:
+        popularity.record(("stock", symbol))
+        # 已提供分析上下文时直接基于其计算
+        if context is not None:
+            return await self._refresh_stock_data(symbol, context)
+
+        # 读穿透：数据库中的文档足够新时直接返回，过期但仍可用时先返回并在后台刷新
+        doc = await self.collection.find_one({"symbol": symbol}, {"_id": 0})
+        if doc is not None and doc.get("last_updated") is not None:
+            freshness = self._document_freshness(symbol, doc["last_updated"])
+            if freshness != "expired":
+                if freshness == "stale":
+                    self._spawn(self._inflight.do(("stock_data", symbol), lambda: self._refresh_stock_data(symbol)))
+                stock_data = {field: doc[field] for field in STOCK_DATA_FIELDS if field in doc}
+                # 历史行情按K线存储在独立集合中，按区间读取
+                stock_data["historical_data"] = await self.bars.get_history(symbol)
+                return stock_data
+
+        return await self._inflight.do(("stock_data", symbol), lambda: self._refresh_stock_data(symbol))
+
+    async def prefetch(self, symbol: str, lead: float = 0.0, force: bool = False) -> bool:
+        """提前刷新：数据库文档在 lead 秒后将不再新鲜时绕过行情缓存重新获取，返回是否刷新"""
+        if not force:
+            doc = await self.collection.find_one({"symbol": symbol}, {"last_updated": 1, "_id": 0})
+            if doc is not None and doc.get("last_updated") is not None:
+                at = datetime.now(timezone.utc) + timedelta(seconds=lead)
+                if self._document_freshness(symbol, doc["last_updated"], at) == "fresh":
+                    return False
+        await self._inflight.do(("stock_data", symbol), lambda: self._refresh_stock_data(symbol, refresh=True))
+        return True
+
+    async def _refresh_stock_data(
+        self,
+        symbol: str,
+        context: StockAnalysisContext = None,
+        refresh: bool = False
+    ) -> Dict[str, Any]:
+        """从上游获取最新数据，计算指标并在后台写入数据库"""
+        if context is None:
+            context = await self.get_analysis_context(symbol, refresh)
+        stock_data = self._build_stock_data(symbol, context)
+        self._spawn(self._save_stock_data(symbol, stock_data, context.hist, context.checkpoint))
+        return stock_data
+
+    def _build_stock_data(self, symbol: str, context: StockAnalysisContext) -> Dict[str, Any]:
+        info = context.info
+        hist = context.hist
         
         # 计算技术指标
-        returns = hist['Close'].pct_change().dropna()
-        volatility = returns.std() * np.sqrt(252)  # 年化波动率
-        sharpe_ratio = (returns.mean() * 252 - 0.02) / volatility  # 夏普比率
-        beta = self._calculate_beta(hist['Close'], symbol)
+        technical_indicators = self._compute_technical(context)
         
-        # 预测未来走势
-        prediction = self._predict_future_prices(hist['Close'])
+        # 预测未来走势：种子由最后一根K线决定，行情不变时结果稳定
+        with timed(INDICATOR_COMPUTE_SECONDS, kind="forecast"):
+            prediction = forecast_series(symbol, hist['Close'], days=7, n_paths=self._forecast_paths)
         
-        stock_data = {
+        return {
             "basic_info": {
                 "symbol": symbol,
                 "name": info.get("longName", ""),
@@ -39,13 +250,7 @@ class StockService:
                 "pe_ratio": info.get("trailingPE", 0),
                 "volume": info.get("volume", 0)
             },
-            "technical_indicators": {
-                "volatility": volatility,
-                "sharpe_ratio": sharpe_ratio,
-                "beta": beta,
-                "rsi": self._calculate_rsi(hist['Close']),
-                "macd": self._calculate_macd(hist['Close'])
-            },
+            "technical_indicators": technical_indicators,
             "historical_data": {
                 "dates": hist.index.strftime('%Y-%m-%d').tolist(),
                 "prices": hist['Close'].tolist(),
@@ -53,122 +258,177 @@ class StockService:
             },
             "predictions": {
                 "dates": prediction["dates"],
-                "prices": prediction["prices"]
+                "prices": prediction["prices"],
+                "bands": prediction["bands"]
             }
         }
-        
-        # 更新数据库
-        await self.collection.update_one(
-            {"symbol": symbol},
-            {"$set": {
-                "last_updated": datetime.now(),
-                **stock_data
-            }},
-            upsert=True
-        )
-        
-        return stock_data
 
-    def _calculate_beta(self, prices: pd.Series, symbol: str) -> float:
-        # 获取市场指数数据
-        if symbol.endswith('.SS'):
-            market = yf.download('^SSE', start=prices.index[0], end=prices.index[-1])
-        else:
-            market = yf.download('^SZSE', start=prices.index[0], end=prices.index[-1])
-        
-        # 计算收益率
-        stock_returns = prices.pct_change().dropna()
-        market_returns = market['Close'].pct_change().dropna()
-        
-        # 对齐数据
-        aligned_data = pd.concat([stock_returns, market_returns], axis=1).dropna()
-        
-        # 计算beta
-        beta = np.cov(aligned_data.iloc[:,0], aligned_data.iloc[:,1])[0,1] / np.var(aligned_data.iloc[:,1])
-        return beta
-
-    def _calculate_rsi(self, prices: pd.Series, periods: int = 14) -> float:
-        returns = prices.diff()
-        gains = returns.clip(lower=0)
-        losses = -returns.clip(upper=0)
-        
-        avg_gain = gains.rolling(window=periods).mean()
-        avg_loss = losses.rolling(window=periods).mean()
-        
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi.iloc[-1]
-
-    def _calculate_macd(self, prices: pd.Series) -> Dict[str, float]:
-        exp1 = prices.ewm(span=12, adjust=False).mean()
-        exp2 = prices.ewm(span=26, adjust=False).mean()
-        macd = exp1 - exp2
-        signal = macd.ewm(span=9, adjust=False).mean()
-        return {
-            "macd": macd.iloc[-1],
-            "signal": signal.iloc[-1],
-            "histogram": macd.iloc[-1] - signal.iloc[-1]
-        }
+    async def _save_stock_data(
+        self,
+        symbol: str,
+        stock_data: Dict[str, Any],
+        hist: pd.DataFrame,
+        indicator_state: Dict[str, Any] = None
+    ):
+        # 更新数据库：摘要文档不再内嵌历史数组，K线只追加新增部分，增量指标检查点与K线一同保存
+        summary = {key: value for key, value in stock_data.items() if key != "historical_data"}
+        if indicator_state is not None:
+            summary["indicator_state"] = indicator_state
+        with timed(DB_WRITE_SECONDS, collection="stocks", operation="upsert"):
+            await self.collection.update_one(
+                {"symbol": symbol},
+                {
+                    "$set": {
+                        "last_updated": datetime.now(timezone.utc),
+                        **summary
+                    },
+                    "$unset": {"historical_data": ""}
+                },
+                upsert=True
+            )
+        with timed(DB_WRITE_SECONDS, collection="stock_bars", operation="append"):
+            await self.bars.append(symbol, hist)
 
-    def _predict_future_prices(self, prices: pd.Series) -> Dict[str, List]:
-        # 简单的时间序列预测
-        days = 7
-        last_price = prices.iloc[-1]
-        trend = (prices.iloc[-1] - prices.iloc[-20]) / 20  # 计算趋势
-        
-        future_dates = [
-            (datetime.now() + timedelta(days=i)).strftime('%Y-%m-%d')
-            for i in range(1, days + 1)
-        ]
-        
-        predicted_prices = [
-            last_price + trend * i + np.random.normal(0, prices.std() * 0.1)
-            for i in range(1, days + 1)
-        ]
-        
+    async def get_stored_bars(
+        self,
+        symbol: str,
+        start: str = None,
+        end: str = None,
+        after: str = None,
+        limit: int = 500
+    ) -> Dict[str, Any]:
+        """分页查询已持久化的日K线，日期格式为 YYYY-MM-DD，next 为下一页的 after 参数"""
+        parse = lambda value: datetime.strptime(value, '%Y-%m-%d') if value else None
+        bars = await self.bars.get_bars(symbol, parse(start), parse(end), parse(after), limit + 1)
+        has_more = len(bars) > limit
+        bars = bars[:limit]
+        dates = date_column([bar["date"] for bar in bars])
+        for bar, date in zip(bars, dates):
+            bar["date"] = date
         return {
-            "dates": future_dates,
-            "prices": predicted_prices
+            "bars": bars,
+            "next": dates[-1] if has_more else None
         }
 
-    async def get_risk_analysis(self, symbol: str) -> Dict[str, Any]:
-        stock = yf.Ticker(symbol)
-        hist = stock.history(period="1y")
-        
-        returns = hist['Close'].pct_change().dropna()
-        
-        var_95 = np.percentile(returns, 5)  # 95% VaR
-        cvar_95 = returns[returns <= var_95].mean()  # 95% CVaR
-        
-        return {
-            "value_at_risk": abs(var_95),
-            "conditional_var": abs(cvar_95),
-            "max_drawdown": self._calculate_max_drawdown(hist['Close']),
-            "downside_risk": self._calculate_downside_risk(returns)
-        }
+    def _document_freshness(self, symbol: str, last_updated: datetime, now: datetime = None) -> str:
+        """判断数据库文档的新鲜程度：fresh / stale / expired
+
+        交易时段内按固定时长判断；非交易时段只要文档在最近一次收盘后更新过即视为最新。
+        """
+        if last_updated.tzinfo is None:
+            last_updated = last_updated.replace(tzinfo=timezone.utc)
+        now = now or datetime.now(timezone.utc)
+        age = (now - last_updated).total_seconds()
+        market = market_for_symbol(symbol)
+
+        if is_market_open(market, now):
+            if age < self._doc_ttl_trading:
+                return "fresh"
+        elif last_updated >= last_close(market, now):
+            return "fresh"
+        return "stale" if age < self._doc_max_stale else "expired"
+
+    def _spawn(self, coro):
+        """在后台执行任务并记录异常"""
+        task = asyncio.ensure_future(coro)
+        self._background_tasks.add(task)
+
+        def done(task):
+            self._background_tasks.discard(task)
+            if not task.cancelled() and task.exception() is not None:
+                logger.warning(f"Background task failed: {str(task.exception())}")
+
+        task.add_done_callback(done)
 
-    def _calculate_max_drawdown(self, prices: pd.Series) -> float:
-        cummax = prices.cummax()
-        drawdown = (prices - cummax) / cummax
-        return abs(drawdown.min())
+    def _compute_technical(self, context: StockAnalysisContext) -> Dict[str, Any]:
+        """基于分析上下文中共享的收益率序列计算技术指标"""
+        if "technical" not in context.metrics:
+            # 波动率、夏普比率、RSI 和 MACD 直接读取增量指标的当前值
+            indicators = self._indicators(context).technical(risk_free_rate=0.02)
+            with timed(INDICATOR_COMPUTE_SECONDS, kind="technical"):
+                context.metrics["technical"] = {
+                    "volatility": indicators["volatility"],
+                    "sharpe_ratio": indicators["sharpe_ratio"],
+                    "beta": self._calculate_beta(context.returns, context.market_returns),
+                    "rsi": indicators["rsi"],
+                    "macd": indicators["macd"]
+                }
+        return context.metrics["technical"]
+
+    def _compute_risk(self, context: StockAnalysisContext) -> Dict[str, Any]:
+        """基于分析上下文中共享的收益率序列计算风险指标"""
+        if "risk" not in context.metrics:
+            max_drawdown = self._indicators(context).drawdown.max_drawdown
+            with timed(INDICATOR_COMPUTE_SECONDS, kind="risk"):
+                returns = context.returns
+                var_95 = np.percentile(returns, 5)  # 95% VaR
+                cvar_95 = returns[returns <= var_95].mean()  # 95% CVaR
+                context.metrics["risk"] = {
+                    "value_at_risk": abs(var_95),
+                    "conditional_var": abs(cvar_95),
+                    "max_drawdown": max_drawdown,
+                    "downside_risk": self._calculate_downside_risk(returns)
+                }
+        return context.metrics["risk"]
+
+    def _indicators(self, context: StockAnalysisContext) -> IndicatorSet:
+        """上下文未附带增量指标时，基于其行情从头计算"""
+        if context.indicators is None:
+            checkpoint, context.indicators = self._advance_indicators(context.symbol, context.hist)
+            context.checkpoint = checkpoint.state()
+        return context.indicators
+
+    async def _fetch_market_returns(self, prices: pd.Series, symbol: str) -> pd.Series:
+        """从共享的基准缓存中截取与股票行情区间对应的市场收益率"""
+        index_symbol = '^SSE' if symbol.endswith('.SS') else '^SZSE'
+        try:
+            return await benchmark_cache.get_returns(index_symbol, prices.index[0], prices.index[-1])
+        except Exception as e:
+            logger.warning(f"Error fetching benchmark {index_symbol}: {str(e)}")
+            return pd.Series(dtype=float)
+
+    def _calculate_beta(self, stock_returns: pd.Series, market_returns: pd.Series) -> float:
+        # 按交易日对齐后计算beta
+        stock_returns = pd.Series(stock_returns.values, index=normalize_dates(stock_returns.index).values)
+        beta = beta_from_returns(stock_returns, market_returns)
+        return 1.0 if beta is None else beta
+
+    async def get_forecast(self, symbol: str, days: int = 7, paths: int = 2000, method: str = "gbm") -> Dict[str, Any]:
+        """蒙特卡洛价格预测，返回中位数路径和分位数区间；同一根K线上的结果固定，可直接缓存"""
+        hist = await self._fetch_history(symbol, "1y")
+        if hist.empty:
+            raise Exception(f"股票 {symbol} 没有历史数据")
+        key = ("forecast", symbol, hist.index[-1].strftime('%Y-%m-%d'), days, paths, method)
+        forecast = await self._cache.get(key, loads=decode_json)
+        if forecast is None:
+            with timed(INDICATOR_COMPUTE_SECONDS, kind="forecast"):
+                forecast = forecast_series(symbol, hist['Close'], days, paths, method)
+            self._cache.set(key, forecast, dumps=encode_json)
+        return forecast
+
+    async def get_risk_analysis(self, symbol: str, context: StockAnalysisContext = None) -> Dict[str, Any]:
+        if context is None:
+            # 风险指标只依赖历史行情，无需获取基本信息和市场基准
+            hist = await self._fetch_history(symbol, "1y")
+            context = StockAnalysisContext(symbol, {}, hist)
+            await self._attach_indicators(context)
+        return self._compute_risk(context)
 
     def _calculate_downside_risk(self, returns: pd.Series) -> float:
         # 计算下行风险（低于0的收益率的标准差）
         negative_returns = returns[returns < 0]
         return negative_returns.std() * np.sqrt(252)
 
-    async def get_historical_data(self, symbol: str, period: str = "1mo") -> List[StockHistory]:
-        stock = yf.Ticker(symbol)
-        hist = stock.history(period=period)
+    async def get_historical_data(self, symbol: str, period: str = "1mo", shape: str = SHAPE_RECORDS):
+        hist = await self._fetch_history(symbol, period)
         
-        return [
-            StockHistory(
-                date=index,
-                open=row["Open"],
-                high=row["High"],
-                low=row["Low"],
-                close=row["Close"],
-                volume=row["Volume"]
-            )
-            for index, row in hist.iterrows()
-        ] 
\ No newline at end of file
+        # 按列整体转换，避免逐行创建对象
+        columns = {
+            "date": isoformat_column(hist.index),
+            "open": float_column(hist["Open"]),
+            "high": float_column(hist["High"]),
+            "low": float_column(hist["Low"]),
+            "close": float_column(hist["Close"]),
+            "volume": int_column(hist["Volume"])
+        }
+        return shape_payload(columns, shape)
@@ -0,0 +1,168 @@
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime, time, timedelta, timezone
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .market_hours import MARKETS, last_session_close, market_for_symbol
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMAT = '%Y%m%d'
+
+
+def normalize_dates(values) -> pd.Series:
+    """将日期列统一转换为不带时区的 datetime64"""
+    dates = pd.to_datetime(pd.Series(values))
+    if getattr(dates.dt, 'tz', None) is not None:
+        dates = dates.dt.tz_localize(None)
+    return dates.dt.normalize()
+
+
+class BarStore:
+    """本地持久化的K线存储
+
+    每个 (数据源, 复权方式, 股票代码) 对应一个 Parquet 文件，并附带一个记录覆盖区间的元数据文件。
+    请求时只从上游获取本地尚未覆盖的区间并追加，已获取过的历史直接从磁盘读取。
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _base_path(self, namespace: str, symbol: str) -> str:
+        safe_symbol = re.sub(r'[^A-Za-z0-9._-]', '_', symbol)
+        return os.path.join(self.root, namespace, safe_symbol)
+
+    def _lock(self, path: str) -> threading.Lock:
+        with self._locks_guard:
+            if path not in self._locks:
+                self._locks[path] = threading.Lock()
+            return self._locks[path]
+
+    def read(self, namespace: str, symbol: str) -> Tuple[Optional[pd.DataFrame], Optional[dict]]:
+        """读取本地K线及其覆盖区间"""
+        base = self._base_path(namespace, symbol)
+        try:
+            with open(base + '.json', 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            df = pd.read_parquet(base + '.parquet')
+            return df, meta
+        except FileNotFoundError:
+            return None, None
+        except Exception as e:
+            logger.warning(f"Failed to read bar store for {namespace}/{symbol}: {str(e)}")
+            return None, None
+
+    def write(self, namespace: str, symbol: str, df: pd.DataFrame, meta: dict):
+        """原子写入K线及元数据"""
+        base = self._base_path(namespace, symbol)
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        df.to_parquet(base + '.parquet.tmp', index=False)
+        os.replace(base + '.parquet.tmp', base + '.parquet')
+        with open(base + '.json.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(base + '.json.tmp', base + '.json')
+
+    def sync(
+        self,
+        namespace: str,
+        symbol: str,
+        start_date: str,
+        end_date: str,
+        fetch: Callable[[str, str], pd.DataFrame],
+        date_column: str,
+        price_column: str,
+    ) -> pd.DataFrame:
+        """返回 [start_date, end_date] 区间的K线，只从上游获取缺失部分
+
+        fetch(start, end) 为阻塞的上游调用，日期格式为 YYYYMMDD，两端均包含。
+        该方法会阻塞，应在线程池中调用。
+        """
+        base = self._base_path(namespace, symbol)
+        with self._lock(base):
+            df, meta = self.read(namespace, symbol)
+            now = datetime.now(timezone.utc)
+
+            if df is None or df.empty:
+                df = self._fetch(fetch, start_date, end_date)
+                meta = {'start': start_date, 'end': end_date}
+            else:
+                df = self._extend(df, meta, market_for_symbol(symbol), start_date, end_date, fetch, date_column, price_column)
+                meta = {'start': min(start_date, meta['start']), 'end': max(end_date, meta['end'])}
+
+            meta['updated_at'] = now.isoformat()
+            if not df.empty:
+                self.write(namespace, symbol, df, meta)
+            return self._slice(df, start_date, end_date, date_column)
+
+    def _extend(self, df, meta, market, start_date, end_date, fetch, date_column, price_column):
+        """补齐本地数据缺失的头部和尾部"""
+        frames = []
+        if start_date < meta['start']:
+            head_end = (datetime.strptime(meta['start'], DATE_FORMAT) - timedelta(days=1)).strftime(DATE_FORMAT)
+            logger.info(f"Bar store: fetching head {start_date}-{head_end}")
+            frames.append(self._fetch(fetch, start_date, head_end))
+        frames.append(df)
+
+        if end_date > meta['end'] or not self._is_final(meta, market):
+            # 从最后一根K线当天开始获取，用重叠的K线校验复权价格是否变化
+            last_date = normalize_dates(df[date_column]).iloc[-1]
+            tail_start = last_date.strftime(DATE_FORMAT)
+            tail_end = max(end_date, meta['end'])
+            logger.info(f"Bar store: fetching tail {tail_start}-{tail_end}")
+            tail = self._fetch(fetch, tail_start, tail_end)
+            if not tail.empty:
+                tail_dates = normalize_dates(tail[date_column])
+                overlap = tail[(tail_dates == last_date).values]
+                if not overlap.empty and not np.isclose(
+                    float(overlap[price_column].iloc[0]), float(df[price_column].iloc[-1]), rtol=1e-6
+                ):
+                    # 除权除息导致历史复权价格整体变化，重新获取完整区间
+                    logger.info("Bar store: adjusted prices changed, refetching full range")
+                    return self._fetch(fetch, min(start_date, meta['start']), tail_end)
+            frames.append(tail)
+
+        merged = pd.concat([f for f in frames if not f.empty], ignore_index=True)
+        dates = normalize_dates(merged[date_column])
+        keep = ~dates.duplicated(keep='last').values
+        merged = merged[keep]
+        order = np.argsort(dates[keep].values, kind='stable')
+        return merged.iloc[order].reset_index(drop=True)
+
+    @staticmethod
+    def _fetch(fetch, start_date, end_date) -> pd.DataFrame:
+        df = fetch(start_date, end_date)
+        return df if df is not None else pd.DataFrame()
+
+    @staticmethod
+    def _is_final(meta: dict, market: str) -> bool:
+        """覆盖区间内的K线是否均在其所属交易日完整收盘后写入
+
+        与 MongoDB K线集合使用相同的判断：写入时最近一个完整收盘的交易日不早于区间最后一天（或之前最近的交易日）。
+        早期的元数据中 updated_at 不带时区，按服务器本地时间解释。
+        """
+        if 'updated_at' not in meta:
+            return False
+        tz, _ = MARKETS[market]
+        end_of_range = datetime.combine(datetime.strptime(meta['end'], DATE_FORMAT).date(), time.max, tzinfo=tz)
+        updated_at = datetime.fromisoformat(meta['updated_at'])
+        return last_session_close(market, updated_at) >= last_session_close(market, end_of_range)
+
+    @staticmethod
+    def _slice(df: pd.DataFrame, start_date: str, end_date: str, date_column: str) -> pd.DataFrame:
+        if df.empty:
+            return df
+        dates = normalize_dates(df[date_column])
+        mask = ((dates >= pd.Timestamp(start_date)) & (dates <= pd.Timestamp(end_date))).values
+        return df[mask].reset_index(drop=True)
+
+
+# 全局共享的K线存储
+bar_store = BarStore(os.getenv("BAR_STORE_DIR", os.path.join("data", "bars")))
@@ -0,0 +1,267 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .cache_backends import CacheBackend, create_backend
+from .metrics import CACHE_LOOKUP_SECONDS, cache_name
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(value: Any) -> int:
+    """估算缓存对象占用的内存字节数
+
+    dict / list / tuple / set 递归计入其中的键和元素，被多处引用的同一对象只计一次；
+    其他对象使用 sys.getsizeof，需要计入内部数据的类型可以实现 __sizeof__。
+    """
+    seen = set()
+    total = 0
+    stack = [value]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, pd.DataFrame):
+            total += int(obj.memory_usage(index=True, deep=True).sum())
+        elif isinstance(obj, (pd.Series, pd.Index)):
+            total += int(obj.memory_usage(deep=True))
+        elif isinstance(obj, np.ndarray):
+            total += int(obj.nbytes)
+        else:
+            total += sys.getsizeof(obj)
+            if isinstance(obj, dict):
+                stack.extend(obj.keys())
+                stack.extend(obj.values())
+            elif isinstance(obj, (list, tuple, set, frozenset)):
+                stack.extend(obj)
+    return total
+
+
+class _Entry:
+    __slots__ = ("value", "size", "expires_at")
+
+    def __init__(self, value: Any, size: int, expires_at: float):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+
+
+class FrameCache:
+    """按内存大小限制的 LRU + TTL 缓存
+
+    使用 OrderedDict 实现 O(1) 的 LRU 更新，按对象实际占用的字节数淘汰，
+    所有操作加锁，可在事件循环和线程池中同时使用，并统计命中、未命中和淘汰次数。
+    """
+
+    def __init__(self, max_bytes: int, default_ttl: float = 3600, max_entries: int = None):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """读取缓存，不存在或已过期时返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.time():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def set(self, key: Hashable, value: Any, ttl: float = None, size: int = None):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        size = estimate_size(value) if size is None else size
+        if size > self.max_bytes:
+            logger.warning(f"Cache entry {key} ({size} bytes) exceeds cache budget, skipped")
+            return
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(value, size, time.time() + ttl)
+            self._total_bytes += size
+            self._evict()
+
+    def ttl_remaining(self, key: Hashable) -> Optional[float]:
+        """条目剩余的有效时间（秒），不存在或已过期时返回 None，不影响 LRU 顺序和命中统计"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            remaining = entry.expires_at - time.time()
+            return remaining if remaining > 0 else None
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def breakdown(self) -> Dict[str, Dict[str, int]]:
+        """按 key 前缀汇总条目数和估算的字节数，用于定位占用内存最多的缓存"""
+        with self._lock:
+            result: Dict[str, Dict[str, int]] = {}
+            for key, entry in self._entries.items():
+                group = result.setdefault(cache_name(key), {"entries": 0, "bytes": 0})
+                group["entries"] += 1
+                group["bytes"] += entry.size
+        return dict(sorted(result.items(), key=lambda item: item[1]["bytes"], reverse=True))
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.size
+
+    def _evict(self):
+        while self._entries and (
+            self._total_bytes > self.max_bytes
+            or (self.max_entries is not None and len(self._entries) > self.max_entries)
+        ):
+            key, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry.size
+            self.evictions += 1
+
+
+class TieredCache:
+    """进程内缓存 + 可选的共享二级缓存
+
+    读取时先查进程内缓存，未命中再查二级缓存并回填；写入时同时写入两级，
+    二级缓存的写入在后台进行，其故障只记录日志，不影响请求。
+    """
+
+    def __init__(self, local: FrameCache, backend: Optional[CacheBackend] = None, namespace: str = "cws"):
+        self.local = local
+        self.backend = backend
+        self.namespace = namespace
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self.l2_errors = 0
+        self._pending = set()
+
+    def _backend_key(self, key: Hashable) -> str:
+        parts = key if isinstance(key, tuple) else (key,)
+        return ":".join([self.namespace] + [str(part) for part in parts])
+
+    async def get(self, key: Hashable, loads: Callable[[bytes], Any] = None) -> Optional[Any]:
+        """读取缓存，loads 用于将二级缓存中的字节串还原为对象"""
+        start = time.perf_counter()
+        value = self.local.get(key)
+        if value is not None or self.backend is None or loads is None:
+            self._observe(key, "miss" if value is None else "hit", start)
+            return value
+        try:
+            data, remaining = await self.backend.get_with_ttl(self._backend_key(key))
+        except Exception as e:
+            self.l2_errors += 1
+            logger.warning(f"L2 cache get failed for {key}: {str(e)}")
+            self._observe(key, "miss", start)
+            return None
+        if data is None:
+            self.l2_misses += 1
+            self._observe(key, "miss", start)
+            return None
+        self.l2_hits += 1
+        value = loads(data)
+        # 回填进程内缓存时沿用二级缓存中剩余的有效时间，短 TTL 的条目不会被延长到 default_ttl
+        ttl = self.local.default_ttl if remaining is None else min(remaining, self.local.default_ttl)
+        if ttl > 0:
+            self.local.set(key, value, ttl=ttl)
+        self._observe(key, "l2_hit", start)
+        return value
+
+    @staticmethod
+    def _observe(key: Hashable, result: str, start: float):
+        CACHE_LOOKUP_SECONDS.labels(cache_name(key), result).observe(time.perf_counter() - start)
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: float = None,
+        dumps: Callable[[Any], bytes] = None,
+        size: int = None
+    ):
+        """写入缓存，提供 dumps 时同时写入二级缓存"""
+        self.local.set(key, value, ttl=ttl, size=size)
+        if self.backend is None or dumps is None:
+            return
+        ttl = self.local.default_ttl if ttl is None else ttl
+        task = asyncio.ensure_future(self._write_backend(key, value, ttl, dumps))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _write_backend(self, key: Hashable, value: Any, ttl: float, dumps: Callable[[Any], bytes]):
+        try:
+            await self.backend.set(self._backend_key(key), dumps(value), ttl)
+        except Exception as e:
+            self.l2_errors += 1
+            logger.warning(f"L2 cache set failed for {key}: {str(e)}")
+
+    def ttl_remaining(self, key: Hashable) -> Optional[float]:
+        """进程内缓存条目的剩余有效时间，用于提前刷新"""
+        return self.local.ttl_remaining(key)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.local.stats()
+        stats["l2"] = {
+            "enabled": self.backend is not None,
+            "hits": self.l2_hits,
+            "misses": self.l2_misses,
+            "errors": self.l2_errors,
+        }
+        return stats
+
+    async def close(self):
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        if self.backend is not None:
+            await self.backend.close()
+
+
+# 全局共享缓存，各服务通过不同的 key 前缀区分
+shared_cache = FrameCache(
+    max_bytes=int(os.getenv("CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+    default_ttl=float(os.getenv("CACHE_DEFAULT_TTL", "3600")),
+)
+
+# 多 worker 部署时通过 CACHE_BACKEND_URL（如 redis://localhost:6379/0）启用共享二级缓存
+tiered_cache = TieredCache(shared_cache, create_backend(os.getenv("CACHE_BACKEND_URL")))
@@ -0,0 +1,123 @@
+import io
+import logging
+import struct
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import orjson
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend:
+    """二级缓存后端接口，按字节串存取，供多个 worker 进程共享"""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def get_with_ttl(self, key: str) -> Tuple[Optional[bytes], Optional[float]]:
+        """读取值及其剩余有效时间（秒），无过期时间时剩余时间为 None"""
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """进程内的二级缓存实现，用于测试和单进程部署"""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, float]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at <= time.time():
+            del self._data[key]
+            return None
+        return value
+
+    async def get_with_ttl(self, key: str) -> Tuple[Optional[bytes], Optional[float]]:
+        value = await self.get(key)
+        if value is None:
+            return None, None
+        return value, self._data[key][1] - time.time()
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        self._data[key] = (value, time.time() + ttl)
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+
+
+class RedisCacheBackend(CacheBackend):
+    """基于 Redis（或兼容协议服务）的二级缓存实现"""
+
+    def __init__(self, url: str):
+        # redis 为可选依赖，仅在启用该后端时导入
+        import redis.asyncio as redis
+        self._client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(key)
+
+    async def get_with_ttl(self, key: str) -> Tuple[Optional[bytes], Optional[float]]:
+        # GET 与 PTTL 在同一个事务中执行，PTTL 为 -1 表示未设置过期时间
+        async with self._client.pipeline(transaction=True) as pipe:
+            value, pttl = await pipe.get(key).pttl(key).execute()
+        if value is None:
+            return None, None
+        return value, pttl / 1000 if pttl is not None and pttl >= 0 else None
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self._client.set(key, value, px=max(int(ttl * 1000), 1))
+
+    async def delete(self, key: str):
+        await self._client.delete(key)
+
+    async def close(self):
+        await self._client.close()
+
+
+def create_backend(url: Optional[str]) -> Optional[CacheBackend]:
+    """根据 URL 创建二级缓存后端，未配置时返回 None"""
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return InMemoryCacheBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCacheBackend(url)
+    raise ValueError(f"不支持的缓存后端: {url}")
+
+
+def encode_frame(df: pd.DataFrame, meta: Dict[str, Any] = None) -> bytes:
+    """将 DataFrame 编码为 Parquet 字节串，前置一段 JSON 元数据"""
+    header = orjson.dumps(meta or {})
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=True)
+    return struct.pack('>I', len(header)) + header + buffer.getvalue()
+
+
+def decode_frame(data: bytes) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """解码 encode_frame 生成的字节串"""
+    (header_size,) = struct.unpack('>I', data[:4])
+    meta = orjson.loads(data[4:4 + header_size])
+    df = pd.read_parquet(io.BytesIO(data[4 + header_size:]))
+    return df, meta
+
+
+def encode_json(value: Any) -> bytes:
+    return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def decode_json(data: bytes) -> Any:
+    return orjson.loads(data)
@@ -0,0 +1,43 @@
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ComputePool:
+    """CPU 密集型计算的进程池
+
+    蒙特卡洛模拟、参数扫描等纯 NumPy 计算在独立进程中执行，不占用事件循环和 GIL。
+    进程池在首次使用时创建；提交的函数及参数必须可被 pickle（模块级函数和 NumPy 数组）。
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """在进程池中执行计算并等待结果"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_pool(), functools.partial(func, *args, **kwargs))
+
+    async def map(self, func: Callable[..., Any], chunks, **kwargs) -> list:
+        """将多个数据块分发到各进程并按顺序返回结果"""
+        return await asyncio.gather(*[self.run(func, chunk, **kwargs) for chunk in chunks])
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# 全局共享的计算进程池，默认进程数为 CPU 核数
+compute_pool = ComputePool(int(os.getenv("COMPUTE_MAX_WORKERS", "0")) or None)
@@ -0,0 +1,136 @@
+import asyncio
+import functools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from .metrics import UPSTREAM_FETCH_SECONDS, UPSTREAM_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# 各数据源的默认并发上限，避免单一上游占满线程池
+DEFAULT_SOURCE_LIMITS = {
+    "yfinance": 4,
+    "akshare": 4,
+}
+
+
+class DataFetchExecutor:
+    """上游数据获取执行器
+
+    将 yfinance/akshare 等阻塞调用放到有界线程池中执行，
+    并为每个数据源提供独立的并发上限和超时控制，保证事件循环不被阻塞。
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 16,
+        source_limits: Optional[Dict[str, int]] = None,
+        default_timeout: float = 30.0,
+        default_source_limit: int = 4,
+    ):
+        self.max_workers = max_workers
+        self.source_limits = dict(DEFAULT_SOURCE_LIMITS)
+        if source_limits:
+            self.source_limits.update(source_limits)
+        self.default_timeout = default_timeout
+        self.default_source_limit = default_source_limit
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="data-fetch"
+            )
+        return self._pool
+
+    def _get_semaphore(self, source: str) -> asyncio.Semaphore:
+        # 信号量在首次使用时创建，绑定到当前运行的事件循环
+        if source not in self._semaphores:
+            limit = self.source_limits.get(source, self.default_source_limit)
+            self._semaphores[source] = asyncio.Semaphore(limit)
+        return self._semaphores[source]
+
+    async def run(
+        self,
+        source: str,
+        func: Callable[..., Any],
+        *args,
+        timeout: Optional[float] = None,
+        operation: Optional[str] = None,
+        **kwargs
+    ) -> Any:
+        """在线程池中执行阻塞调用并等待结果，operation 用于区分同一数据源的不同接口的耗时指标"""
+        timeout = self.default_timeout if timeout is None else timeout
+        operation = operation or getattr(func, "__name__", "call")
+        submitted = time.perf_counter()
+        semaphore = self._get_semaphore(source)
+        try:
+            # 等待并发名额的时间同样计入超时，数据源繁忙时调用方不会无限等待
+            await asyncio.wait_for(semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise self._timeout_error(source, timeout)
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(
+                self._get_pool(),
+                functools.partial(self._timed_call, source, operation, submitted, func, args, kwargs)
+            )
+        except BaseException:
+            semaphore.release()
+            raise
+        # 线程真正结束后才释放名额，超时的调用仍计入并发上限，防止线程堆积
+        future.add_done_callback(lambda _: semaphore.release())
+
+        try:
+            remaining = max(timeout - (time.perf_counter() - submitted), 0)
+            return await asyncio.wait_for(asyncio.shield(future), remaining)
+        except asyncio.TimeoutError:
+            raise self._timeout_error(source, timeout)
+
+    @staticmethod
+    def _timeout_error(source: str, timeout: float) -> TimeoutError:
+        logger.warning(f"Fetching from {source} timed out after {timeout}s")
+        return TimeoutError(f"从 {source} 获取数据超时（{timeout}秒）")
+
+    @staticmethod
+    def _timed_call(source: str, operation: str, submitted: float, func: Callable[..., Any], args, kwargs) -> Any:
+        """在工作线程中执行调用，分别记录排队等待和实际执行的耗时"""
+        started = time.perf_counter()
+        UPSTREAM_WAIT_SECONDS.labels(source).observe(started - submitted)
+        outcome = "error"
+        try:
+            result = func(*args, **kwargs)
+            outcome = "ok"
+            return result
+        finally:
+            UPSTREAM_FETCH_SECONDS.labels(source, operation, outcome).observe(time.perf_counter() - started)
+
+    def shutdown(self):
+        """关闭线程池"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._semaphores.clear()
+
+
+def _source_limits_from_env() -> Dict[str, int]:
+    limits = {}
+    for source in DEFAULT_SOURCE_LIMITS:
+        value = os.getenv(f"{source.upper()}_MAX_CONCURRENCY")
+        if value:
+            limits[source] = int(value)
+    return limits
+
+
+# 全局共享的数据获取执行器
+data_executor = DataFetchExecutor(
+    max_workers=int(os.getenv("DATA_FETCH_MAX_WORKERS", "16")),
+    source_limits=_source_limits_from_env(),
+    default_timeout=float(os.getenv("DATA_FETCH_TIMEOUT", "30")),
+)
@@ -0,0 +1,40 @@
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Optional
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(level: int = logging.INFO, log_file: Optional[str] = None) -> QueueListener:
+    """配置非阻塞日志
+
+    请求路径上的日志只放入内存队列，由后台线程格式化并写入控制台和文件，
+    避免磁盘或终端 I/O 拖慢请求；进程退出时刷新队列中剩余的日志。重复调用返回已有的监听器。
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers: List[logging.Handler] = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    root = logging.getLogger()
+    # 替换其他模块可能已添加的同步处理器
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
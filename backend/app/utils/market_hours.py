@@ -0,0 +1,70 @@
+from datetime import datetime, time, timedelta
+from typing import List, Tuple
+from zoneinfo import ZoneInfo
+
+# 各市场的时区与交易时段（不含节假日）
+MARKETS = {
+    "CN": (ZoneInfo("Asia/Shanghai"), [(time(9, 30), time(11, 30)), (time(13, 0), time(15, 0))]),
+    "HK": (ZoneInfo("Asia/Hong_Kong"), [(time(9, 30), time(12, 0)), (time(13, 0), time(16, 0))]),
+    "US": (ZoneInfo("America/New_York"), [(time(9, 30), time(16, 0))]),
+}
+
+
+# 无法从代码格式判断市场的指数
+INDEX_MARKETS = {"^SSE": "CN", "^SZSE": "CN", "^HSI": "HK"}
+
+
+def market_for_symbol(symbol: str) -> str:
+    """根据股票代码后缀（或 akshare 指数代码的 sh/sz 前缀）判断所属市场"""
+    if symbol in INDEX_MARKETS:
+        return INDEX_MARKETS[symbol]
+    if symbol.endswith((".SS", ".SZ")) or (symbol.isdigit() and len(symbol) == 6):
+        return "CN"
+    if symbol[:2] in ("sh", "sz") and symbol[2:].isdigit():
+        return "CN"
+    if symbol.endswith(".HK"):
+        return "HK"
+    return "US"
+
+
+def _sessions(market: str) -> Tuple[ZoneInfo, List[Tuple[time, time]]]:
+    return MARKETS[market]
+
+
+def is_market_open(market: str, now: datetime = None) -> bool:
+    """当前是否处于交易时段"""
+    tz, sessions = _sessions(market)
+    local = (now or datetime.now(tz)).astimezone(tz)
+    if local.weekday() >= 5:
+        return False
+    return any(start <= local.time() < end for start, end in sessions)
+
+
+def last_close(market: str, now: datetime = None) -> datetime:
+    """最近一次已经结束的交易时段的收盘时间（带时区）"""
+    tz, sessions = _sessions(market)
+    local = (now or datetime.now(tz)).astimezone(tz)
+    day = local.date()
+    while True:
+        if day.weekday() < 5:
+            for _, end in reversed(sessions):
+                close = datetime.combine(day, end, tzinfo=tz)
+                if close <= local:
+                    return close
+        day -= timedelta(days=1)
+
+
+def last_session_close(market: str, now: datetime = None) -> datetime:
+    """最近一个全部交易时段都已结束的交易日的收盘时间（带时区）
+
+    与 last_close 不同，午间休市时返回前一交易日的收盘，只有此前的日K线才是最终数据。
+    """
+    tz, sessions = _sessions(market)
+    local = (now or datetime.now(tz)).astimezone(tz)
+    day = local.date()
+    while True:
+        if day.weekday() < 5:
+            close = datetime.combine(day, sessions[-1][1], tzinfo=tz)
+            if close <= local:
+                return close
+        day -= timedelta(days=1)
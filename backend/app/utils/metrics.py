@@ -0,0 +1,101 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Hashable, Iterator, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Histogram, generate_latest, multiprocess
+
+# 毫秒级的计算 / 序列化 / 缓存读取
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# 上游行情接口与数据库写入
+IO_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 大模型：首 token 与完整回复
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0, 60.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "cws_http_request_seconds",
+    "HTTP 请求总耗时",
+    ["method", "route", "status"],
+    buckets=IO_BUCKETS
+)
+UPSTREAM_FETCH_SECONDS = Histogram(
+    "cws_upstream_fetch_seconds",
+    "上游数据获取在线程池中的执行耗时（含本地K线存储的读写）",
+    ["provider", "operation", "outcome"],
+    buckets=IO_BUCKETS
+)
+UPSTREAM_WAIT_SECONDS = Histogram(
+    "cws_upstream_wait_seconds",
+    "上游调用等待数据源并发名额和线程池的时间",
+    ["provider"],
+    buckets=IO_BUCKETS
+)
+CACHE_LOOKUP_SECONDS = Histogram(
+    "cws_cache_lookup_seconds",
+    "缓存读取耗时，result 为 hit（进程内）/ l2_hit / miss",
+    ["cache", "result"],
+    buckets=FAST_BUCKETS
+)
+INDICATOR_COMPUTE_SECONDS = Histogram(
+    "cws_indicator_compute_seconds",
+    "指标、预测与回测的计算耗时",
+    ["kind"],
+    buckets=FAST_BUCKETS
+)
+SERIALIZATION_SECONDS = Histogram(
+    "cws_serialization_seconds",
+    "响应编码与压缩耗时",
+    ["format", "encoding"],
+    buckets=FAST_BUCKETS
+)
+DB_WRITE_SECONDS = Histogram(
+    "cws_db_write_seconds",
+    "MongoDB 写入耗时",
+    ["collection", "operation"],
+    buckets=IO_BUCKETS
+)
+LLM_FIRST_TOKEN_SECONDS = Histogram(
+    "cws_llm_time_to_first_token_seconds",
+    "从发起模型请求到收到第一个增量的时间",
+    ["model"],
+    buckets=LLM_BUCKETS
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "cws_llm_request_seconds",
+    "一次模型流式请求的总耗时",
+    ["model", "outcome"],
+    buckets=LLM_BUCKETS
+)
+CHAT_TOOL_SECONDS = Histogram(
+    "cws_chat_tool_seconds",
+    "聊天中单次工具调用的耗时",
+    ["tool"],
+    buckets=IO_BUCKETS
+)
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels) -> Iterator[None]:
+    """记录代码块耗时，异常时同样记录"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(**labels).observe(time.perf_counter() - start)
+
+
+def cache_name(key: Hashable) -> str:
+    """缓存指标按 key 的前缀（如 yf_info、analysis）区分，避免按股票代码产生大量时间序列"""
+    return str(key[0]) if isinstance(key, tuple) and key else "other"
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """以 Prometheus 文本格式输出全部指标
+
+    多 worker 部署时设置 PROMETHEUS_MULTIPROC_DIR，由各进程写入的文件汇总。
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
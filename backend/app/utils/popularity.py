@@ -0,0 +1,54 @@
+import math
+import os
+import threading
+import time
+from typing import Dict, Hashable, List, Tuple
+
+
+class PopularityTracker:
+    """按时间衰减的访问热度统计
+
+    每次访问加 1，热度按半衰期指数衰减，只在读写时按经过的时间惰性衰减，
+    因此记录一次访问是 O(1)，长期不访问的条目在 prune 时移除。
+    """
+
+    def __init__(self, half_life: float = 1800.0):
+        self.decay = math.log(2) / half_life
+        self._scores: Dict[Hashable, Tuple[float, float]] = {}  # key -> (热度, 更新时间)
+        self._lock = threading.Lock()
+
+    def _decayed(self, key: Hashable, now: float) -> float:
+        score, updated_at = self._scores.get(key, (0.0, now))
+        return score * math.exp(-self.decay * (now - updated_at))
+
+    def record(self, key: Hashable, weight: float = 1.0):
+        now = time.time()
+        with self._lock:
+            self._scores[key] = (self._decayed(key, now) + weight, now)
+
+    def score(self, key: Hashable) -> float:
+        with self._lock:
+            return self._decayed(key, time.time())
+
+    def top(self, n: int, min_score: float = 0.0) -> List[Tuple[Hashable, float]]:
+        """热度最高的 n 个条目，按热度降序"""
+        now = time.time()
+        with self._lock:
+            scores = [(key, self._decayed(key, now)) for key in self._scores]
+        scores = [item for item in scores if item[1] >= min_score]
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores[:n]
+
+    def prune(self, min_score: float = 0.01):
+        """移除热度已衰减到可以忽略的条目"""
+        now = time.time()
+        with self._lock:
+            for key in [key for key in self._scores if self._decayed(key, now) < min_score]:
+                del self._scores[key]
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+
+# 全局访问热度，键为 (数据类型, 股票代码)
+popularity = PopularityTracker(half_life=float(os.getenv("POPULARITY_HALF_LIFE", "1800")))
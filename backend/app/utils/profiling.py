@@ -0,0 +1,306 @@
+import functools
+import inspect
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict, deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_PROJECT_DIR = os.path.dirname(APP_DIR)
+
+
+def _short_path(filename: str) -> str:
+    """第三方库路径从 site-packages 之后截取，项目内路径相对于 backend 目录"""
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    if filename.startswith(_PROJECT_DIR + os.sep):
+        return os.path.relpath(filename, _PROJECT_DIR)
+    return filename
+
+
+def _frame_label(code) -> str:
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+
+
+def to_collapsed(counts: Counter) -> str:
+    """输出 flamegraph.pl / speedscope 可直接读取的折叠栈格式：每行“栈帧;栈帧;... 计数”"""
+    return "\n".join(f"{stack} {count}" for stack, count in counts.most_common()) + "\n"
+
+
+class SamplingProfiler:
+    """基于 sys._current_frames 的采样分析器
+
+    后台线程每隔 interval 秒记录一次各线程的调用栈并按栈累计次数，无需重启进程或安装原生扩展；
+    栈底为线程名，事件循环线程上看到的是当前正在执行的协程。thread_ids 为空时采样所有线程。
+    """
+
+    def __init__(self, interval: float = 0.005, thread_ids: Iterable[int] = None, max_depth: int = 128):
+        self.interval = interval
+        self.thread_ids = set(thread_ids) if thread_ids else None
+        self.max_depth = max_depth
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.time() - self.started_at if self.started_at else 0.0
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or (self.thread_ids and thread_id not in self.thread_ids):
+                    continue
+                self.counts[self._collapse(names.get(thread_id, str(thread_id)), frame)] += 1
+            self.samples += 1
+
+    def _collapse(self, thread_name: str, frame) -> str:
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            stack.append(_frame_label(frame.f_code))
+            frame = frame.f_back
+        stack.append(thread_name)
+        return ";".join(reversed(stack))
+
+    def collapsed(self) -> str:
+        return to_collapsed(self.counts)
+
+    def summary(self, top: int = 20) -> Dict[str, Any]:
+        """按叶子函数统计的自身耗时占比，便于不画火焰图时快速查看热点"""
+        leaves: Counter = Counter()
+        for stack, count in self.counts.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(self.counts.values()) or 1
+        return {
+            "samples": self.samples,
+            "interval": self.interval,
+            "duration": round(self.duration, 3),
+            "top": [
+                {"frame": frame, "samples": count, "ratio": round(count / total, 4)}
+                for frame, count in leaves.most_common(top)
+            ],
+        }
+
+
+class ProfileStore:
+    """保存最近的采样结果，同一时间只允许一个采样器运行，避免多个采样线程叠加开销"""
+
+    def __init__(self, capacity: int = 20):
+        self.capacity = capacity
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._active: Optional[SamplingProfiler] = None
+
+    def begin(self, interval: float = 0.005) -> Optional[SamplingProfiler]:
+        """开始采样，已有采样器在运行时返回 None"""
+        with self._lock:
+            if self._active is not None:
+                return None
+            self._active = SamplingProfiler(interval)
+        return self._active.start()
+
+    def finish(self, profiler: SamplingProfiler, label: str) -> str:
+        """停止采样并保存结果，返回结果 ID"""
+        profiler.stop()
+        with self._lock:
+            if self._active is profiler:
+                self._active = None
+            profile_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{next(self._ids)}"
+            self._profiles[profile_id] = {
+                "id": profile_id,
+                "label": label,
+                "started_at": datetime.fromtimestamp(profiler.started_at).isoformat(timespec='seconds'),
+                "summary": profiler.summary(),
+                "collapsed": profiler.collapsed(),
+            }
+            while len(self._profiles) > self.capacity:
+                self._profiles.popitem(last=False)
+        logger.info(f"Profile {profile_id} ({label}): {profiler.samples} samples in {profiler.duration:.2f}s")
+        return profile_id
+
+    @property
+    def active(self) -> bool:
+        return self._active is not None
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "id": profile["id"],
+                "label": profile["label"],
+                "started_at": profile["started_at"],
+                "samples": profile["summary"]["samples"],
+            }
+            for profile in reversed(self._profiles.values())
+        ]
+
+
+class SlowCallLog:
+    """服务方法的慢调用记录
+
+    instrument 将服务实例上的方法替换为计时包装，耗时超过阈值时记录日志并保留最近的记录；
+    阈值可在运行时调整，小于等于 0 时只做一次比较，不记录。异步生成器方法（流式接口）不包装。
+    """
+
+    def __init__(self, threshold: float = 1.0, capacity: int = 200):
+        self.threshold = threshold
+        self.records: deque = deque(maxlen=capacity)
+
+    def instrument(self, service: Any) -> Any:
+        cls = type(service)
+        for name, func in inspect.getmembers(cls, inspect.isfunction):
+            if name.startswith("__") or inspect.isasyncgenfunction(func) or inspect.isgeneratorfunction(func):
+                continue
+            if name in vars(service):
+                continue  # 已经包装过
+            setattr(service, name, self._wrap(getattr(service, name), f"{cls.__name__}.{name}"))
+        return service
+
+    def _wrap(self, method, qualname: str):
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await method(*args, **kwargs)
+                finally:
+                    self._check(qualname, time.perf_counter() - start, args, kwargs)
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._check(qualname, time.perf_counter() - start, args, kwargs)
+        return wrapper
+
+    def _check(self, qualname: str, elapsed: float, args, kwargs):
+        if self.threshold <= 0 or elapsed < self.threshold:
+            return
+        # 在包装器的 finally 中执行，记录失败不能覆盖被调用方法的返回值或异常
+        try:
+            arguments = ", ".join([_brief(arg) for arg in args] + [f"{key}={_brief(value)}" for key, value in kwargs.items()])
+            self.records.append({
+                "method": qualname,
+                "elapsed_ms": round(elapsed * 1000, 1),
+                "at": datetime.now().isoformat(timespec='seconds'),
+                "arguments": arguments,
+            })
+            logger.warning(f"Slow call {qualname}({arguments}) took {elapsed * 1000:.0f}ms")
+        except Exception as e:
+            logger.warning(f"Failed to record slow call {qualname}: {str(e)}")
+
+
+def _brief(value: Any, limit: int = 60) -> str:
+    """参数的简短表示，DataFrame 等大对象只显示类型和长度"""
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        text = repr(value)
+    else:
+        try:
+            text = f"<{type(value).__name__} len={len(value)}>"
+        except Exception:
+            # 没有长度或 __len__ 出错（如 0 维 ndarray）时只显示类型
+            text = f"<{type(value).__name__}>"
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+class MemorySnapshots:
+    """tracemalloc 快照
+
+    start 之后的分配才会被追踪，追踪本身会让分配变慢，排查结束后应调用 stop；
+    每次快照与上一次比较，用于观察缓存等长期对象的增长来源。
+    """
+
+    def __init__(self):
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    def start(self, frames: int = 25) -> int:
+        """开始追踪，已在追踪时沿用原有的调用栈深度，返回实际使用的深度"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._previous = None
+        return tracemalloc.get_traceback_limit()
+
+    def stop(self):
+        tracemalloc.stop()
+        self._previous = None
+
+    def take(self, app_only: bool = True) -> tracemalloc.Snapshot:
+        """获取快照，app_only 时只保留调用栈经过 app 代码的分配（缓存中的行情、指标等都由 app 代码创建）"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc 未启动")
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__, all_frames=True),
+            tracemalloc.Filter(False, __file__, all_frames=True),
+        ])
+        if app_only:
+            snapshot = snapshot.filter_traces([tracemalloc.Filter(True, os.path.join(APP_DIR, "*"), all_frames=True)])
+        return snapshot
+
+    def statistics(self, snapshot: tracemalloc.Snapshot, group_by: str = "lineno", limit: int = 30) -> Dict[str, Any]:
+        """分配最多的位置，以及与上一次快照相比增长最多的位置"""
+        current, peak = tracemalloc.get_traced_memory()
+        result = {
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "top": [_stat(stat) for stat in snapshot.statistics(group_by)[:limit]],
+        }
+        if self._previous is not None:
+            result["growth"] = [
+                {**_stat(diff), "size_diff": diff.size_diff, "count_diff": diff.count_diff}
+                for diff in snapshot.compare_to(self._previous, group_by)[:limit]
+            ]
+        self._previous = snapshot
+        return result
+
+    def collapsed(self, snapshot: tracemalloc.Snapshot) -> str:
+        """按分配调用栈折叠、以字节数为权重的火焰图输入"""
+        counts: Counter = Counter()
+        for stat in snapshot.statistics("traceback"):
+            frames = [f"{_short_path(frame.filename)}:{frame.lineno}" for frame in stat.traceback]
+            counts[";".join(frames)] += stat.size  # Traceback 的顺序为最早调用在前
+        return to_collapsed(counts)
+
+
+def _stat(stat) -> Dict[str, Any]:
+    frame = stat.traceback[-1]
+    return {
+        "location": f"{_short_path(frame.filename)}:{frame.lineno}",
+        "size": stat.size,
+        "count": stat.count,
+    }
+
+
+# 全局共享的采样结果、慢调用记录和内存快照
+profile_store = ProfileStore(capacity=int(os.getenv("PROFILE_HISTORY", "20")))
+slow_calls = SlowCallLog(threshold=float(os.getenv("SLOW_CALL_THRESHOLD_MS", "1000")) / 1000)
+memory_snapshots = MemorySnapshots()
@@ -0,0 +1,121 @@
+import gzip
+import time
+from datetime import date, datetime
+from typing import Any, Optional
+
+import brotli
+import msgpack
+import numpy as np
+import orjson
+import pandas as pd
+import pyarrow as pa
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+from .metrics import SERIALIZATION_SECONDS
+
+MEDIA_JSON = "application/json"
+MEDIA_MSGPACK = "application/msgpack"
+MEDIA_ARROW = "application/vnd.apache.arrow.stream"
+
+# 序列化耗时指标中的格式名称
+_FORMATS = {MEDIA_JSON: "json", MEDIA_MSGPACK: "msgpack", MEDIA_ARROW: "arrow"}
+
+# 小于该字节数的响应不压缩
+COMPRESS_MIN_SIZE = 1024
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    """序列化 orjson / msgpack 不直接支持的 NumPy、pandas 和 pydantic 对象"""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return obj.tolist()
+    if isinstance(obj, pd.DataFrame):
+        return obj.to_dict(orient='list')
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def dumps_json(content: Any) -> bytes:
+    """使用 orjson 序列化，NumPy 数组和标量直接编码，NaN 输出为 null"""
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """基于 orjson 的 JSON 响应"""
+
+    media_type = MEDIA_JSON
+
+    def render(self, content: Any) -> bytes:
+        start = time.perf_counter()
+        body = dumps_json(content)
+        SERIALIZATION_SECONDS.labels("json", "identity").observe(time.perf_counter() - start)
+        return body
+
+
+def _to_arrow_table(content: Any) -> Optional[pa.Table]:
+    """将表格型数据（逐行对象列表或按列数组）转换为 Arrow 表，非表格数据返回 None"""
+    if isinstance(content, list) and content and all(isinstance(row, dict) for row in content):
+        return pa.Table.from_pylist(content)
+    if isinstance(content, dict) and content:
+        values = list(content.values())
+        if all(isinstance(v, (list, np.ndarray)) for v in values) and len({len(v) for v in values}) == 1:
+            return pa.table(content)
+        # 形如 {'daily_stats': [...]} 的单字段包装
+        if len(content) == 1:
+            return _to_arrow_table(values[0])
+    return None
+
+
+def _encode_arrow(table: pa.Table) -> bytes:
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _encode(content: Any, accept: str):
+    """根据 Accept 头选择编码格式，返回 (body, media_type)"""
+    if MEDIA_ARROW in accept:
+        table = _to_arrow_table(content)
+        if table is not None:
+            return _encode_arrow(table), MEDIA_ARROW
+    if MEDIA_MSGPACK in accept or "application/x-msgpack" in accept:
+        return msgpack.packb(content, default=_default, use_bin_type=True), MEDIA_MSGPACK
+    return dumps_json(content), MEDIA_JSON
+
+
+def _compress(body: bytes, accept_encoding: str):
+    """根据 Accept-Encoding 头压缩响应体，返回 (body, content_encoding)"""
+    if len(body) < COMPRESS_MIN_SIZE:
+        return body, None
+    if "br" in accept_encoding:
+        return brotli.compress(body, quality=4), "br"
+    if "gzip" in accept_encoding:
+        return gzip.compress(body, compresslevel=5), "gzip"
+    return body, None
+
+
+def negotiate_response(request: Request, content: Any, status_code: int = 200) -> Response:
+    """按客户端声明的格式和压缩方式编码响应
+
+    支持 JSON（默认）、MessagePack 和 Arrow IPC 流（仅表格型数据），
+    以及 brotli / gzip 压缩。直接返回 Response 以跳过 jsonable_encoder。
+    """
+    start = time.perf_counter()
+    body, media_type = _encode(content, request.headers.get("accept", ""))
+    body, content_encoding = _compress(body, request.headers.get("accept-encoding", ""))
+    SERIALIZATION_SECONDS.labels(_FORMATS[media_type], content_encoding or "identity").observe(time.perf_counter() - start)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if content_encoding:
+        headers["Content-Encoding"] = content_encoding
+    return Response(content=body, status_code=status_code, media_type=media_type, headers=headers)
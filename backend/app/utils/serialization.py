@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List
+
+# 响应数据的组织方式：records 为逐行对象列表，columns 为按列组织的数组
+SHAPE_RECORDS = "records"
+SHAPE_COLUMNS = "columns"
+
+
+def float_column(values, decimals: int = None) -> List[float]:
+    """将数值列整体转换为浮点列表，可选统一保留小数位"""
+    array = np.asarray(values, dtype=float)
+    if decimals is not None:
+        array = np.round(array, decimals)
+    return array.tolist()
+
+
+def int_column(values) -> List[int]:
+    """将数值列整体转换为整数列表"""
+    return np.asarray(values, dtype=np.int64).tolist()
+
+
+def date_column(values, fmt: str = '%Y-%m-%d') -> List[str]:
+    """将日期列整体格式化为字符串列表"""
+    return pd.to_datetime(pd.Series(values)).dt.strftime(fmt).tolist()
+
+
+def isoformat_column(values) -> List[str]:
+    """将日期时间列整体格式化为 ISO 8601 字符串列表，带时区时包含偏移量"""
+    dates = pd.to_datetime(pd.Series(values))
+    text = dates.dt.strftime('%Y-%m-%dT%H:%M:%S%z')
+    if dates.dt.tz is not None:
+        text = text.str[:-2] + ':' + text.str[-2:]
+    return text.tolist()
+
+
+def columns_to_records(columns: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """将按列组织的数据转换为逐行对象列表"""
+    keys = list(columns)
+    return [dict(zip(keys, row)) for row in zip(*columns.values())]
+
+
+def shape_payload(columns: Dict[str, List[Any]], shape: str = SHAPE_RECORDS):
+    """按请求的数据组织方式返回结果"""
+    if shape == SHAPE_COLUMNS:
+        return columns
+    if shape != SHAPE_RECORDS:
+        raise ValueError(f"不支持的数据格式: {shape}")
+    return columns_to_records(columns)
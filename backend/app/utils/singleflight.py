@@ -0,0 +1,39 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """并发请求合并
+
+    同一个 key 的并发调用只会真正执行一次，其余调用方等待同一个结果，
+    用于避免多个请求同时对同一股票发起重复的上游下载。
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """执行 func，若已有相同 key 的请求在进行中则等待其结果"""
+        future = self._inflight.get(key)
+        if future is not None:
+            logger.debug(f"Joining in-flight request for {key}")
+            # shield 防止某个调用方被取消时连带取消共享的请求
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(func())
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._forget(key, future))
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # 所有调用方都已离开时避免出现 "exception was never retrieved" 警告
+        if not future.cancelled():
+            future.exception()
+
+    def inflight_count(self) -> int:
+        return len(self._inflight)
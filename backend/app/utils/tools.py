@@ -1,5 +1,6 @@
 import os
-from openai import OpenAI
+import httpx
+from openai import OpenAI, AsyncOpenAI
 from datetime import datetime
 import requests
 from typing import Dict, Any
@@ -12,6 +13,19 @@ client = OpenAI(
     base_url="https://dashscope.aliyuncs.com/compatible-mode/v1"
 )
 
+# 异步客户端，复用连接池，供异步接口和流式输出使用
+async_client = AsyncOpenAI(
+    api_key=os.getenv("DASHSCOPE_API_KEY"),
+    base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
+    http_client=httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+        ),
+        timeout=httpx.Timeout(float(os.getenv("LLM_TIMEOUT", "60")), connect=5.0)
+    )
+)
+
 def get_current_time() -> str:
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
@@ -49,6 +63,140 @@ tools = [
     }
 ]
 
+# 股票数据工具，由 ChatService 调用 StockService / StockAnalysisService 执行
+stock_tools = [
+    {
+        "type": "function",
+        "function": {
+            "name": "get_stock_quote",
+            "description": "查询股票的实时行情、基本面信息、技术指标（RSI、MACD、Beta、波动率、夏普比率）及未来7天价格预测。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "symbol": {
+                        "type": "string",
+                        "description": "股票代码，A股为6位数字加交易所后缀，比如600519.SS、000001.SZ；港股如0700.HK。"
+                    }
+                },
+                "required": ["symbol"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_risk_analysis",
+            "description": "查询股票近一年的风险指标，包括最大回撤、下行风险、95% VaR 和 CVaR。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "symbol": {
+                        "type": "string",
+                        "description": "股票代码，比如600519.SS、000001.SZ、0700.HK。"
+                    }
+                },
+                "required": ["symbol"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_stock_history",
+            "description": "查询股票在指定时间范围内的日K线（开盘、最高、最低、收盘、成交量）。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "symbol": {
+                        "type": "string",
+                        "description": "股票代码，比如600519.SS、000001.SZ、0700.HK。"
+                    },
+                    "period": {
+                        "type": "string",
+                        "enum": ["5d", "1mo", "3mo", "6mo", "1y"],
+                        "description": "时间范围，默认1mo。"
+                    }
+                },
+                "required": ["symbol"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_stock_metrics",
+            "description": "查询A股自指定日期以来的总收益率、年化波动率、夏普比率和最大回撤。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "symbol": {
+                        "type": "string",
+                        "description": "A股6位股票代码，比如600519。"
+                    },
+                    "start_date": {
+                        "type": "string",
+                        "description": "起始日期，格式YYYYMMDD，默认一年前。"
+                    }
+                },
+                "required": ["symbol"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_sudden_changes",
+            "description": "查询A股自指定日期以来单日涨跌幅超过5%的突变点（最近10个）。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "symbol": {
+                        "type": "string",
+                        "description": "A股6位股票代码，比如600519。"
+                    },
+                    "start_date": {
+                        "type": "string",
+                        "description": "起始日期，格式YYYYMMDD，默认一年前。"
+                    }
+                },
+                "required": ["symbol"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "run_backtest",
+            "description": "回测A股交易策略（均线交叉、RSI 超买超卖、MACD 金叉死叉），返回策略与买入持有的总收益率、波动率、夏普比率、最大回撤及交易次数。参数可给出候选值列表做参数扫描。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "symbol": {
+                        "type": "string",
+                        "description": "A股6位股票代码，比如600519。"
+                    },
+                    "strategy": {
+                        "type": "string",
+                        "enum": ["ma_cross", "rsi", "macd"],
+                        "description": "策略：ma_cross 参数为 fast、slow；rsi 参数为 periods、lower、upper；macd 参数为 fast、slow、signal。"
+                    },
+                    "start_date": {
+                        "type": "string",
+                        "description": "起始日期，格式YYYYMMDD，默认三年前。"
+                    },
+                    "params": {
+                        "type": "object",
+                        "description": "策略参数，未提供的使用默认值，值为数组时做参数扫描，例如 {\"fast\": [5, 10], \"slow\": [20, 60]}。"
+                    }
+                },
+                "required": ["symbol", "strategy"]
+            }
+        }
+    }
+]
+
+tools.extend(stock_tools)
+
 def execute_function(function_name: str, parameters: Dict[str, Any]) -> str:
     if function_name == "get_current_time":
         return get_current_time()
@@ -0,0 +1,68 @@
+"""比较两次基准测试结果
+
+    python -m benchmarks.compare benchmarks/results/base.json benchmarks/results/new.json [--threshold 10]
+
+按用例 key 对齐两次结果，输出 p50 / p95 / 峰值内存的变化比例；
+任一用例的 p50 变慢超过阈值（百分比）时以非零状态退出，便于在 CI 中使用。
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Optional
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _ratio(old: Optional[float], new: Optional[float]) -> Optional[float]:
+    if not old or new is None:
+        return None
+    return new / old
+
+
+def _format(ratio: Optional[float]) -> str:
+    return "n/a" if ratio is None else f"{ratio:.2f}x"
+
+
+def compare(base: Dict[str, Any], head: Dict[str, Any], threshold: float) -> int:
+    old = {result["key"]: result for result in base["results"]}
+    new = {result["key"]: result for result in head["results"]}
+    print(f"base {base['meta'].get('git_sha')} ({base['meta'].get('timestamp')})  ->  "
+          f"head {head['meta'].get('git_sha')} ({head['meta'].get('timestamp')})")
+    print(f"{'case':<72} {'p50':>18} {'p95':>8} {'peak':>8} {'upstream':>12}")
+
+    regressions = 0
+    for key in sorted(old.keys() & new.keys()):
+        a, b = old[key], new[key]
+        p50 = _ratio(a["p50_ms"], b["p50_ms"])
+        calls = f"{sum(a['upstream_calls'].values()):g}->{sum(b['upstream_calls'].values()):g}"
+        flag = ""
+        if p50 is not None and p50 > 1 + threshold / 100:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{key:<72} {a['p50_ms']:>8.2f}->{_format(p50):>7} {_format(_ratio(a['p95_ms'], b['p95_ms'])):>8} "
+              f"{_format(_ratio(a['peak_kb'], b['peak_kb'])):>8} {calls:>12}{flag}")
+
+    for key in sorted(old.keys() - new.keys()):
+        print(f"{key:<72} only in base")
+    for key in sorted(new.keys() - old.keys()):
+        print(f"{key:<72} only in head")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="比较两次基准测试结果")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=10.0, help="p50 变慢超过该百分比视为回退")
+    args = parser.parse_args(argv)
+    regressions = compare(_load(args.base), _load(args.head), args.threshold)
+    if regressions:
+        print(f"{regressions} case(s) slower than {args.threshold:g}% threshold")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
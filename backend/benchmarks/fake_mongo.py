@@ -0,0 +1,153 @@
+import copy
+from typing import Any, Dict, List, Optional
+
+from pymongo.errors import CollectionInvalid
+
+
+def _matches(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for field, condition in query.items():
+        value = doc.get(field)
+        if isinstance(condition, dict):
+            for op, operand in condition.items():
+                if value is None:
+                    return False
+                if op == "$gte" and not value >= operand:
+                    return False
+                if op == "$gt" and not value > operand:
+                    return False
+                if op == "$lte" and not value <= operand:
+                    return False
+                if op == "$lt" and not value < operand:
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _project(doc: Dict[str, Any], projection: Optional[Dict[str, int]]) -> Dict[str, Any]:
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    include = {field for field, flag in projection.items() if flag and field != "_id"}
+    if include:
+        result = {field: doc[field] for field in include if field in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    for field, flag in projection.items():
+        if not flag:
+            doc.pop(field, None)
+    return doc
+
+
+class FakeCursor:
+    def __init__(self, docs: List[Dict[str, Any]], projection: Optional[Dict[str, int]]):
+        self._docs = docs
+        self._projection = projection
+        self._limit = None
+
+    def sort(self, key, direction: int = 1) -> "FakeCursor":
+        keys = key if isinstance(key, list) else [(key, direction)]
+        for field, order in reversed(keys):
+            self._docs.sort(key=lambda doc: doc.get(field), reverse=order < 0)
+        return self
+
+    def limit(self, n: int) -> "FakeCursor":
+        self._limit = n
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        docs = self._docs[:self._limit] if self._limit else self._docs
+        if length:
+            docs = docs[:length]
+        return [_project(doc, self._projection) for doc in docs]
+
+
+class FakeCollection:
+    """内存中的集合，只实现服务用到的 motor 接口"""
+
+    def __init__(self):
+        self.docs: List[Dict[str, Any]] = []
+        self._next_id = 0
+
+    def _insert(self, doc: Dict[str, Any]):
+        doc = copy.deepcopy(doc)
+        doc.setdefault("_id", self._next_id)
+        self._next_id += 1
+        self.docs.append(doc)
+
+    async def create_index(self, *args, **kwargs):
+        return "index"
+
+    async def find_one(self, query: Dict[str, Any], projection: Dict[str, int] = None, sort=None):
+        cursor = self.find(query, projection)
+        if sort:
+            cursor.sort(sort)
+        docs = await cursor.limit(1).to_list()
+        return docs[0] if docs else None
+
+    def find(self, query: Dict[str, Any] = None, projection: Dict[str, int] = None) -> FakeCursor:
+        return FakeCursor([doc for doc in self.docs if _matches(doc, query or {})], projection)
+
+    async def update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False):
+        for doc in self.docs:
+            if _matches(doc, query):
+                break
+        else:
+            if not upsert:
+                return
+            doc = dict(query)
+            self._insert(doc)
+            doc = self.docs[-1]
+        doc.update(copy.deepcopy(update.get("$set", {})))
+        for field in update.get("$unset", {}):
+            doc.pop(field, None)
+
+    async def insert_many(self, docs: List[Dict[str, Any]], ordered: bool = True):
+        for doc in docs:
+            self._insert(doc)
+
+
+class FakeDatabase:
+    def __init__(self):
+        self._collections: Dict[str, FakeCollection] = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        return self._collections.setdefault(name, FakeCollection())
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def create_collection(self, name: str, **kwargs):
+        if name in self._collections:
+            raise CollectionInvalid(f"collection {name} already exists")
+        return self[name]
+
+    async def command(self, *args, **kwargs):
+        return {"ok": 1}
+
+
+class FakeMotorClient:
+    """可替代 AsyncIOMotorClient 的内存客户端"""
+
+    def __init__(self, *args, **kwargs):
+        self._databases: Dict[str, FakeDatabase] = {}
+
+    def __getitem__(self, name: str) -> FakeDatabase:
+        return self._databases.setdefault(name, FakeDatabase())
+
+    def __getattr__(self, name: str) -> FakeDatabase:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def clear(self):
+        """清空全部文档，保留服务已持有的集合对象"""
+        for database in self._databases.values():
+            for collection in database._collections.values():
+                collection.docs.clear()
+
+    def close(self):
+        pass
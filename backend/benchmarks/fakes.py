@@ -0,0 +1,178 @@
+import asyncio
+import json
+import re
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import akshare as ak
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from .fixtures import FixtureStore
+
+
+class UpstreamStats:
+    """记录回放的上游调用次数，用于验证缓存与合并请求的效果"""
+
+    def __init__(self):
+        self.calls: Dict[str, int] = {}
+
+    def hit(self, name: str):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def reset(self):
+        self.calls.clear()
+
+
+def _between(df: pd.DataFrame, dates: pd.Series, start, end) -> pd.DataFrame:
+    mask = np.ones(len(df), dtype=bool)
+    if start is not None:
+        mask &= (dates >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        mask &= (dates <= pd.Timestamp(end)).to_numpy()
+    return df[mask]
+
+
+def _period_start(end: pd.Timestamp, period: str) -> pd.Timestamp:
+    match = re.fullmatch(r'(\d+)(d|wk|mo|y)', period)
+    if not match:
+        return None
+    units = {"d": "days", "wk": "weeks", "mo": "months", "y": "years"}
+    return end - pd.DateOffset(**{units[match.group(2)]: int(match.group(1))})
+
+
+class FakeTicker:
+    """回放录制数据的 yfinance.Ticker"""
+
+    def __init__(self, store: FixtureStore, stats: UpstreamStats, latency: float, symbol: str):
+        self._store = store
+        self._stats = stats
+        self._latency = latency
+        self.symbol = symbol
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        self._stats.hit("yfinance.info")
+        time.sleep(self._latency)
+        return self._store.yfinance_info(self.symbol)
+
+    @property
+    def fast_info(self) -> Dict[str, Any]:
+        self._stats.hit("yfinance.fast_info")
+        hist = self._store.yfinance_history(self.symbol)
+        return {
+            "lastPrice": float(hist['Close'].iloc[-1]),
+            "previousClose": float(hist['Close'].iloc[-2]),
+            "lastVolume": int(hist['Volume'].iloc[-1]),
+        }
+
+    def history(self, period: str = None, start=None, end=None, **kwargs) -> pd.DataFrame:
+        self._stats.hit("yfinance.history")
+        time.sleep(self._latency)
+        hist = self._store.yfinance_history(self.symbol)
+        dates = pd.Series(hist.index.tz_localize(None).normalize())
+        if period is not None and start is None:
+            start = _period_start(self._store.end, period)
+        # yfinance 的 end 不包含当天
+        end = pd.Timestamp(end) - pd.Timedelta(days=1) if end is not None else None
+        return _between(hist, dates, start, end).copy()
+
+
+@contextmanager
+def install_fakes(store: FixtureStore, stats: UpstreamStats, latency: float = 0.0):
+    """将 akshare / yfinance 的上游调用替换为回放录制数据，latency 为每次调用模拟的网络延迟（秒）"""
+
+    def stock_zh_a_hist(symbol, period="daily", start_date=None, end_date=None, adjust="", **kwargs):
+        stats.hit("akshare.stock_zh_a_hist")
+        time.sleep(latency)
+        df = store.akshare_hist(symbol)
+        return _between(df, pd.to_datetime(df['日期']), start_date, end_date).reset_index(drop=True)
+
+    def index_zh_a_hist(symbol, period="daily", start_date=None, end_date=None, **kwargs):
+        stats.hit("akshare.index_zh_a_hist")
+        time.sleep(latency)
+        df = store.akshare_hist(f"sh{symbol}")
+        return _between(df, pd.to_datetime(df['日期']), start_date, end_date).reset_index(drop=True)
+
+    def index_stock_cons_csindex(symbol, **kwargs):
+        stats.hit("akshare.index_stock_cons_csindex")
+        return store.index_constituents(symbol)
+
+    def download(symbol, start=None, end=None, **kwargs):
+        stats.hit("yfinance.download")
+        time.sleep(latency)
+        hist = store.yfinance_history(symbol)
+        dates = pd.Series(hist.index.tz_localize(None).normalize())
+        end = pd.Timestamp(end) - pd.Timedelta(days=1) if end is not None else None
+        return _between(hist, dates, start, end)[['Open', 'High', 'Low', 'Close', 'Volume']].copy()
+
+    patches = [
+        (ak, "stock_zh_a_hist", stock_zh_a_hist),
+        (ak, "index_zh_a_hist", index_zh_a_hist),
+        (ak, "index_stock_cons_csindex", index_stock_cons_csindex),
+        (yf, "download", download),
+        (yf, "Ticker", lambda symbol: FakeTicker(store, stats, latency, symbol)),
+    ]
+    originals = [(module, name, getattr(module, name)) for module, name, _ in patches]
+    for module, name, fake in patches:
+        setattr(module, name, fake)
+    try:
+        yield
+    finally:
+        for module, name, original in originals:
+            setattr(module, name, original)
+
+
+def _chunk(content: str = None, tool_calls: List[Any] = None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+class FakeCompletions:
+    """按脚本流式返回的 chat.completions
+
+    消息中还没有工具结果时返回脚本中的工具调用，否则按 token_size 个字符一块流式返回文本，
+    first_token_latency / token_latency 模拟模型的首 token 延迟和生成速度（秒）。
+    """
+
+    def __init__(self, script: Dict[str, Any], token_size: int = 4, first_token_latency: float = 0.0, token_latency: float = 0.0):
+        self.script = script
+        self.token_size = token_size
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.requests = 0
+
+    async def create(self, model: str, messages: List[Dict[str, Any]], stream: bool = False, tools=None, **kwargs):
+        self.requests += 1
+        has_tool_results = any(message.get("role") == "tool" for message in messages)
+        if tools and not has_tool_results and self.script.get("tool_calls"):
+            chunks = [
+                _chunk(tool_calls=[SimpleNamespace(
+                    index=i,
+                    id=f"call_{i}",
+                    function=SimpleNamespace(name=call["name"], arguments=json.dumps(call["arguments"]))
+                )])
+                for i, call in enumerate(self.script["tool_calls"])
+            ]
+        else:
+            content = self.script["content"]
+            chunks = [_chunk(content=content[i:i + self.token_size]) for i in range(0, len(content), self.token_size)]
+        return self._stream(chunks)
+
+    async def _stream(self, chunks):
+        await asyncio.sleep(self.first_token_latency)
+        for chunk in chunks:
+            yield chunk
+            if self.token_latency:
+                await asyncio.sleep(self.token_latency)
+
+
+class FakeLLMClient:
+    def __init__(self, completions: FakeCompletions):
+        self.chat = SimpleNamespace(completions=completions)
+
+    async def close(self):
+        pass
@@ -0,0 +1,140 @@
+import json
+import os
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# 合成行情覆盖的区间，足以切出不同长度的历史
+SYNTHETIC_START = '2012-01-02'
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+AKSHARE_COLUMNS = ['日期', '开盘', '收盘', '最高', '最低', '成交量', '成交额', '振幅', '涨跌幅', '涨跌额', '换手率']
+
+
+def _seed(symbol: str) -> int:
+    return zlib.crc32(symbol.encode())
+
+
+class FixtureStore:
+    """离线回放用的行情与模型回复
+
+    优先读取 record.py 录制到 fixtures 目录下的真实数据：
+    akshare/<代码>.parquet、akshare_index/<代码>.parquet、yfinance/<代码>.parquet、
+    yfinance_info/<代码>.json、llm/<名称>.json；
+    没有录制数据的股票使用按代码固定种子生成的合成行情，保证多次运行结果一致。
+    """
+
+    def __init__(self, root: str = FIXTURE_DIR, end: Optional[str] = None):
+        self.root = root
+        self.end = pd.Timestamp(end or datetime.now().date())
+        self._frames: Dict[tuple, pd.DataFrame] = {}
+
+    def _path(self, kind: str, symbol: str, suffix: str) -> str:
+        safe = symbol.replace("^", "_").replace("/", "_")
+        return os.path.join(self.root, kind, safe + suffix)
+
+    def _recorded(self, kind: str, symbol: str) -> Optional[pd.DataFrame]:
+        path = self._path(kind, symbol, ".parquet")
+        return pd.read_parquet(path) if os.path.exists(path) else None
+
+    def _synthetic_ohlcv(self, symbol: str) -> pd.DataFrame:
+        """按几何布朗运动生成的日K线，工作日为交易日"""
+        dates = pd.bdate_range(SYNTHETIC_START, self.end)
+        rng = np.random.default_rng(_seed(symbol))
+        returns = rng.normal(0.0003, 0.018, len(dates))
+        close = 20 * (1 + rng.random()) * np.exp(np.cumsum(returns))
+        open_ = close * (1 + rng.normal(0, 0.004, len(dates)))
+        high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.006, len(dates))))
+        low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.006, len(dates))))
+        volume = rng.integers(1e5, 1e7, len(dates))
+        return pd.DataFrame({
+            'date': dates, 'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume
+        })
+
+    def akshare_hist(self, symbol: str) -> pd.DataFrame:
+        """akshare stock_zh_a_hist / index_zh_a_hist 格式的完整K线"""
+        key = ("akshare", symbol)
+        if key not in self._frames:
+            df = self._recorded("akshare", symbol)
+            if df is None:
+                df = self._recorded("akshare_index", symbol)
+            if df is None:
+                bars = self._synthetic_ohlcv(symbol)
+                previous = bars['close'].shift(1).fillna(bars['open'])
+                df = pd.DataFrame({
+                    '日期': bars['date'].dt.date,
+                    '开盘': bars['open'].round(2),
+                    '收盘': bars['close'].round(2),
+                    '最高': bars['high'].round(2),
+                    '最低': bars['low'].round(2),
+                    '成交量': bars['volume'],
+                    '成交额': (bars['volume'] * bars['close']).round(2),
+                    '振幅': ((bars['high'] - bars['low']) / previous * 100).round(2),
+                    '涨跌幅': ((bars['close'] / previous - 1) * 100).round(2),
+                    '涨跌额': (bars['close'] - previous).round(2),
+                    '换手率': (bars['volume'] / 1e8 * 100).round(2),
+                })
+            self._frames[key] = df
+        return self._frames[key]
+
+    def yfinance_history(self, symbol: str) -> pd.DataFrame:
+        """yfinance Ticker.history 格式的完整K线，索引为带时区的 Date"""
+        key = ("yfinance", symbol)
+        if key not in self._frames:
+            df = self._recorded("yfinance", symbol)
+            if df is None:
+                bars = self._synthetic_ohlcv(symbol)
+                tz = "Asia/Shanghai" if symbol.endswith((".SS", ".SZ")) or symbol in ("^SSE", "^SZSE") else "America/New_York"
+                df = pd.DataFrame({
+                    'Open': bars['open'].values,
+                    'High': bars['high'].values,
+                    'Low': bars['low'].values,
+                    'Close': bars['close'].values,
+                    'Volume': bars['volume'].values,
+                    'Dividends': 0.0,
+                    'Stock Splits': 0.0,
+                }, index=pd.DatetimeIndex(bars['date']).tz_localize(tz).rename('Date'))
+            self._frames[key] = df
+        return self._frames[key]
+
+    def yfinance_info(self, symbol: str) -> Dict[str, Any]:
+        path = self._path("yfinance_info", symbol, ".json")
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        hist = self.yfinance_history(symbol)
+        last, previous = float(hist['Close'].iloc[-1]), float(hist['Close'].iloc[-2])
+        return {
+            "symbol": symbol,
+            "longName": f"Synthetic {symbol}",
+            "currentPrice": last,
+            "regularMarketChange": last - previous,
+            "regularMarketChangePercent": (last / previous - 1) * 100,
+            "marketCap": int(last * 1e9),
+            "trailingPE": 18.5,
+            "volume": int(hist['Volume'].iloc[-1]),
+        }
+
+    def index_constituents(self, index: str, count: int = 300) -> pd.DataFrame:
+        path = self._path("index_cons", index, ".parquet")
+        if os.path.exists(path):
+            return pd.read_parquet(path)
+        return pd.DataFrame({'成分券代码': [f"{600000 + i:06d}" for i in range(count)]})
+
+    def llm_script(self, name: str = "default") -> Dict[str, Any]:
+        """模型回复脚本：第一轮返回 tool_calls，收到工具结果后返回 content"""
+        path = self._path("llm", name, ".json")
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {
+            "tool_calls": [
+                {"name": "get_stock_quote", "arguments": {"symbol": "AAPL"}},
+                {"name": "get_risk_analysis", "arguments": {"symbol": "AAPL"}},
+            ],
+            "content": "根据最新行情和风险指标，该股票近一年波动较大，短期走势偏强，建议控制仓位、关注回撤风险。" * 4,
+        }
@@ -0,0 +1,100 @@
+"""录制基准测试使用的上游数据（需要网络）
+
+    python -m benchmarks.record --a-shares 600000 000001 --us AAPL MSFT --llm
+
+将 akshare / yfinance 的完整K线、yfinance 的 info 和一次模型回复保存到 benchmarks/fixtures，
+之后 run.py 优先回放这些真实数据；未录制的股票仍使用合成行情。
+"""
+import argparse
+import json
+import os
+from datetime import datetime
+
+import akshare as ak
+import yfinance as yf
+
+from .fixtures import FIXTURE_DIR, SYNTHETIC_START, FixtureStore
+
+
+def _save_frame(df, kind: str, symbol: str):
+    path = FixtureStore()._path(kind, symbol, ".parquet")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_parquet(path)
+    print(f"{kind}/{symbol}: {len(df)} rows -> {path}")
+
+
+def _save_json(data, kind: str, name: str):
+    path = FixtureStore()._path(kind, name, ".json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+    print(f"{kind}/{name} -> {path}")
+
+
+def record_a_share(symbol: str, start: str, end: str):
+    df = ak.stock_zh_a_hist(symbol=symbol, period="daily", start_date=start, end_date=end, adjust="qfq")
+    _save_frame(df, "akshare", symbol)
+
+
+def record_index(symbol: str, start: str, end: str):
+    df = ak.index_zh_a_hist(symbol=symbol, period="daily", start_date=start, end_date=end)
+    _save_frame(df, "akshare_index", f"sh{symbol}")
+
+
+def record_us(symbol: str, start: str):
+    ticker = yf.Ticker(symbol)
+    _save_frame(ticker.history(start=start), "yfinance", symbol)
+    _save_json(ticker.info, "yfinance_info", symbol)
+
+
+def record_llm(name: str):
+    """用真实模型生成一条脚本：记录第一轮的工具调用和最终回复文本"""
+    from openai import OpenAI
+
+    from app.utils.tools import tools
+
+    client = OpenAI(
+        api_key=os.getenv("DASHSCOPE_API_KEY"),
+        base_url="https://dashscope.aliyuncs.com/compatible-mode/v1"
+    )
+    messages = [{"role": "user", "content": "分析一下苹果公司的股票"}]
+    first = client.chat.completions.create(model="qwen-plus", messages=messages, tools=tools)
+    calls = first.choices[0].message.tool_calls or []
+    final = client.chat.completions.create(model="qwen-plus", messages=messages)
+    _save_json({
+        "tool_calls": [
+            {"name": call.function.name, "arguments": json.loads(call.function.arguments or "{}")}
+            for call in calls
+        ],
+        "content": final.choices[0].message.content,
+    }, "llm", name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="录制离线基准测试数据")
+    parser.add_argument("--a-shares", nargs="*", default=["600000"], help="A股代码")
+    parser.add_argument("--us", nargs="*", default=["AAPL"], help="yfinance 代码")
+    parser.add_argument("--indexes", nargs="*", default=["000001"], help="akshare 指数代码")
+    parser.add_argument("--benchmarks", nargs="*", default=["^SSE", "^SZSE"], help="yfinance 基准指数")
+    parser.add_argument("--start", default=SYNTHETIC_START.replace("-", ""))
+    parser.add_argument("--llm", action="store_true", help="同时录制一条模型回复（需要 DASHSCOPE_API_KEY）")
+    parser.add_argument("--llm-name", default="default")
+    args = parser.parse_args(argv)
+
+    end = datetime.now().strftime('%Y%m%d')
+    start_iso = f"{args.start[:4]}-{args.start[4:6]}-{args.start[6:]}"
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for symbol in args.a_shares:
+        record_a_share(symbol, args.start, end)
+    for symbol in args.indexes:
+        record_index(symbol, args.start, end)
+    for symbol in args.us:
+        record_us(symbol, start_iso)
+    for symbol in args.benchmarks:
+        _save_frame(yf.Ticker(symbol).history(start=start_iso), "yfinance", symbol)
+    if args.llm:
+        record_llm(args.llm_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""离线基准测试
+
+在 backend 目录下运行：
+
+    python -m benchmarks.run                  # 完整基准，结果写入 benchmarks/results/
+    python -m benchmarks.run --quick          # 每项少量样本，用于快速验证
+    python -m benchmarks.run --only analysis  # 只运行名称包含 analysis 的用例
+    python -m benchmarks.run --latency 0.05   # 每次上游调用模拟 50ms 网络延迟
+
+akshare / yfinance / 大模型的调用全部替换为 benchmarks/fixtures 下的录制数据（缺失时使用合成行情），
+MongoDB 替换为内存实现，整个过程不需要网络。
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# 必须在导入 app 之前设置，避免写入真实的K线目录、连接 Redis 或启动后台任务
+_BAR_STORE_DIR = tempfile.mkdtemp(prefix="cws-bench-bars-")
+os.environ["BAR_STORE_DIR"] = _BAR_STORE_DIR
+os.environ["PREFETCH_ENABLED"] = "false"
+os.environ["QUOTE_SOURCE"] = "fake"
+os.environ.setdefault("DASHSCOPE_API_KEY", "benchmark")
+os.environ.pop("CACHE_BACKEND_URL", None)
+os.environ.setdefault("LOG_FILE", "")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx  # noqa: E402
+
+import app.main as app_main  # noqa: E402
+from app.api import stock as stock_api  # noqa: E402
+from app.services import chat_service as chat_module  # noqa: E402
+from app.services.benchmark_cache import benchmark_cache  # noqa: E402
+from app.services.forecast import forecast_batch  # noqa: E402
+from app.utils.bar_store import bar_store  # noqa: E402
+from app.utils.cache import shared_cache  # noqa: E402
+
+from .fake_mongo import FakeMotorClient  # noqa: E402
+from .fakes import FakeCompletions, FakeLLMClient, UpstreamStats, install_fakes  # noqa: E402
+from .fixtures import FixtureStore  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+US_SYMBOLS = ["AAPL", "MSFT", "NVDA", "TSLA", "AMZN", "GOOGL", "META", "JPM"]
+HISTORY_YEARS = (1, 3, 10)
+BATCH_SIZES = (1, 10, 100)
+CONCURRENCY = (1, 8, 32)
+
+
+def _a_shares(count: int) -> List[str]:
+    return [f"{600000 + i:06d}" for i in range(count)]
+
+
+def _start_date(years: int) -> str:
+    return (datetime.now() - timedelta(days=365 * years)).strftime('%Y%m%d')
+
+
+def _git_sha() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(__file__), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class Bench:
+    """用例的运行与结果收集
+
+    每个用例先按 repeat 次计时（取 p50/p95/均值/最小值），再单独运行一次统计 tracemalloc 峰值内存，
+    避免内存追踪拖慢计时；cold 用例每次运行前清空缓存、本地K线存储和内存数据库。
+    """
+
+    def __init__(self, stats: UpstreamStats, mongo: FakeMotorClient, repeat: int, only: Optional[str]):
+        self.stats = stats
+        self.mongo = mongo
+        self.repeat = repeat
+        self.only = only
+        self.results: List[Dict[str, Any]] = []
+
+    async def reset(self):
+        shared_cache.clear()
+        shutil.rmtree(bar_store.root, ignore_errors=True)
+        benchmark_cache._series.clear()
+        benchmark_cache._coverage.clear()
+        self.mongo.clear()
+        if app_main.chat_service:
+            app_main.chat_service._tool_memos.clear()
+
+    async def _once(self, fn: Callable[[], Awaitable[Any]], concurrency: int) -> float:
+        start = time.perf_counter()
+        if concurrency > 1:
+            await asyncio.gather(*[fn() for _ in range(concurrency)])
+        else:
+            await fn()
+        return time.perf_counter() - start
+
+    async def case(
+        self,
+        name: str,
+        fn: Callable[[], Awaitable[Any]],
+        params: Dict[str, Any] = None,
+        cold: bool = False,
+        concurrency: int = 1,
+        repeat: int = None
+    ):
+        params = dict(params or {})
+        if concurrency > 1:
+            params["concurrency"] = concurrency
+        key = name + "".join(f"[{k}={v}]" for k, v in sorted(params.items()))
+        if self.only and self.only not in key:
+            return
+        repeat = repeat or self.repeat
+
+        if not cold:
+            await fn()  # 预热：填充缓存、本地存储和惰性导入
+        samples, upstream = [], {}
+        for _ in range(repeat):
+            if cold:
+                await self.reset()
+            self.stats.reset()
+            samples.append(await self._once(fn, concurrency))
+            for call, count in self.stats.calls.items():
+                upstream[call] = upstream.get(call, 0) + count
+
+        if cold:
+            await self.reset()
+        tracemalloc.start()
+        try:
+            await self._once(fn, concurrency)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        result = {
+            "name": name,
+            "params": params,
+            "key": key,
+            "samples": len(samples),
+            "p50_ms": round(_percentile(samples, 50) * 1000, 3),
+            "p95_ms": round(_percentile(samples, 95) * 1000, 3),
+            "mean_ms": round(statistics.mean(samples) * 1000, 3),
+            "min_ms": round(min(samples) * 1000, 3),
+            "peak_kb": round(peak / 1024, 1),
+            "ops_per_sec": round(concurrency / statistics.mean(samples), 2),
+            "upstream_calls": {call: round(count / repeat, 2) for call, count in sorted(upstream.items())},
+        }
+        self.results.append(result)
+        print(f"{key:<72} p50 {result['p50_ms']:>10.2f} ms  p95 {result['p95_ms']:>10.2f} ms  "
+              f"peak {result['peak_kb']:>10.1f} KB  {result['ops_per_sec']:>8.2f} op/s", flush=True)
+
+
+async def service_cases(bench: Bench, store: FixtureStore, quick: bool):
+    stock_service = app_main.stock_service
+    analysis_service = stock_api.stock_analysis_service
+    chat_service = app_main.chat_service
+    batch_sizes = BATCH_SIZES[:2] if quick else BATCH_SIZES
+
+    # StockService：yfinance 行情、风险分析与历史数据
+    for cold in (True, False):
+        params = {"cache": "cold" if cold else "warm"}
+        await bench.case("stock.get_stock_data", lambda: stock_service.get_stock_data("AAPL"), params, cold)
+        await bench.case("stock.get_risk_analysis", lambda: stock_service.get_risk_analysis("AAPL"), params, cold)
+    for period in ("1mo", "1y", "5y"):
+        await bench.case(
+            "stock.get_historical_data",
+            lambda period=period: stock_service.get_historical_data("AAPL", period),
+            {"period": period}
+        )
+    await bench.case("stock.get_forecast", lambda: stock_service.get_forecast("AAPL", 30, 2000), {"days": 30, "paths": 2000}, cold=True)
+
+    # StockAnalysisService：不同历史长度与股票数量
+    for years in HISTORY_YEARS:
+        start = _start_date(years)
+        for cold in (True, False):
+            await bench.case(
+                "analysis.get_stock_metrics",
+                lambda start=start: analysis_service.get_stock_metrics("600000", start),
+                {"years": years, "cache": "cold" if cold else "warm"},
+                cold
+            )
+    for size in batch_sizes:
+        symbols = _a_shares(size)
+        for cold in (True, False):
+            await bench.case(
+                "analysis.get_batch_metrics",
+                lambda symbols=symbols: analysis_service.get_batch_metrics(symbols, _start_date(1)),
+                {"symbols": size, "cache": "cold" if cold else "warm"},
+                cold,
+                repeat=3 if cold and size >= 100 else None
+            )
+    fast, slow = [3, 5, 8, 10, 13, 15, 20, 25, 30, 40], [50, 60, 80, 100, 120, 150, 200, 250, 300, 400]
+    await bench.case(
+        "analysis.run_backtest",
+        lambda: analysis_service.run_backtest("600000", _start_date(5), "ma_cross", {"fast": fast, "slow": slow}),
+        {"strategy": "ma_cross", "combinations": len(fast) * len(slow), "years": 5}
+    )
+
+    # 纯计算：蒙特卡洛预测
+    for size in batch_sizes:
+        prices = [store.akshare_hist(symbol)['收盘'].to_numpy()[-750:] for symbol in _a_shares(size)]
+        await bench.case(
+            "forecast.forecast_batch",
+            lambda prices=prices: asyncio.to_thread(forecast_batch, prices, 30, 2000, "gbm", 42),
+            {"symbols": size, "paths": 2000, "days": 30}
+        )
+
+    # ChatService：回放脚本化的模型回复和工具调用
+    for cold in (True, False):
+        await bench.case(
+            "chat.process_message",
+            lambda: chat_service.process_message("分析一下苹果公司的股票", "bench"),
+            {"cache": "cold" if cold else "warm"},
+            cold
+        )
+
+
+async def endpoint_cases(bench: Bench, quick: bool):
+    transport = httpx.ASGITransport(app=app_main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def call(method: str, url: str, **kwargs):
+            response = await client.request(method, url, **kwargs)
+            response.raise_for_status()
+            return response
+
+        await bench.case("api.GET /api/stock/{symbol}", lambda: call("GET", "/api/stock/AAPL"))
+        await bench.case(
+            "api.GET /api/stock/analysis/{symbol}",
+            lambda: call("GET", "/api/stock/analysis/600000", params={"start_date": _start_date(1)})
+        )
+        for size in (BATCH_SIZES[:2] if quick else BATCH_SIZES):
+            body = {"symbols": _a_shares(size), "start_date": _start_date(1)}
+            await bench.case(
+                "api.POST /api/stock/batch",
+                lambda body=body: call("POST", "/api/stock/batch", json=body),
+                {"symbols": size}
+            )
+        await bench.case(
+            "api.POST /api/chat/",
+            lambda: call("POST", "/api/chat/", json={"role": "user", "content": "分析一下苹果公司的股票"})
+        )
+
+        # 吞吐：并发请求不同股票，覆盖数据线程池、请求合并和缓存的共同效果
+        for concurrency in (CONCURRENCY[:2] if quick else CONCURRENCY):
+            symbols = (US_SYMBOLS * concurrency)[:concurrency]
+            counter = iter(range(10 ** 9))
+            await bench.case(
+                "throughput.GET /api/stock/{symbol}",
+                lambda symbols=symbols, counter=counter: call("GET", f"/api/stock/{symbols[next(counter) % len(symbols)]}"),
+                concurrency=concurrency
+            )
+            counter = iter(range(10 ** 9))
+            a_shares = _a_shares(concurrency)
+            await bench.case(
+                "throughput.GET /api/stock/analysis/{symbol}",
+                lambda a_shares=a_shares, counter=counter: call(
+                    "GET", f"/api/stock/analysis/{a_shares[next(counter) % len(a_shares)]}",
+                    params={"start_date": _start_date(3)}
+                ),
+                {"cache": "cold"},
+                cold=True,
+                concurrency=concurrency
+            )
+
+
+async def main(args) -> Dict[str, Any]:
+    store = FixtureStore(end=args.end)
+    stats = UpstreamStats()
+    mongo = FakeMotorClient()
+    completions = FakeCompletions(
+        store.llm_script(args.llm_script),
+        first_token_latency=args.llm_latency,
+        token_latency=args.llm_token_latency
+    )
+    app_main.AsyncIOMotorClient = lambda *a, **kw: mongo
+    chat_module.async_client = FakeLLMClient(completions)
+
+    bench = Bench(stats, mongo, args.repeat, args.only)
+    with install_fakes(store, stats, args.latency):
+        async with app_main.app.router.lifespan_context(app_main.app):
+            await service_cases(bench, store, args.quick)
+            await endpoint_cases(bench, args.quick)
+
+    return {
+        "meta": {
+            "git_sha": _git_sha(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": datetime.now().isoformat(timespec='seconds'),
+            "params": {
+                "repeat": args.repeat,
+                "quick": args.quick,
+                "latency": args.latency,
+                "llm_latency": args.llm_latency,
+                "llm_token_latency": args.llm_token_latency,
+                "only": args.only,
+            },
+        },
+        "results": bench.results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="ChatWithStock 离线基准测试")
+    parser.add_argument("--repeat", type=int, default=10, help="每个用例的计时次数")
+    parser.add_argument("--quick", action="store_true", help="只运行较小的规模，每个用例 3 次")
+    parser.add_argument("--only", help="只运行 key 中包含该字符串的用例")
+    parser.add_argument("--latency", type=float, default=0.0, help="每次上游行情调用模拟的延迟（秒）")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="模型首 token 延迟（秒）")
+    parser.add_argument("--llm-token-latency", type=float, default=0.0, help="模型每个 token 的间隔（秒）")
+    parser.add_argument("--llm-script", default="default", help="fixtures/llm 下的回复脚本名称")
+    parser.add_argument("--end", help="合成行情的最后一天，默认今天")
+    parser.add_argument("--out", help="结果文件路径，默认 benchmarks/results/<时间>-<提交>.json")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.repeat = min(args.repeat, 3)
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        report = asyncio.run(main(args))
+    finally:
+        shutil.rmtree(_BAR_STORE_DIR, ignore_errors=True)
+    out = args.out
+    if not out:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        out = os.path.join(RESULTS_DIR, f"{stamp}-{report['meta']['git_sha'] or 'local'}.json")
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Results written to {out}")
@@ -0,0 +1,33 @@
+import tracemalloc
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import admin
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", "secret")
+    app = FastAPI()
+    app.include_router(admin.router, prefix="/admin")
+    yield TestClient(app)
+    admin.memory_snapshots.stop()
+
+
+def test_tracemalloc_frames_validated_and_reported(client):
+    headers = {"X-Admin-Token": "secret"}
+
+    for frames in (0, 101):
+        assert client.post("/admin/tracemalloc/start", params={"frames": frames}, headers=headers).status_code == 422
+
+    response = client.post("/admin/tracemalloc/start", params={"frames": 10}, headers=headers)
+    assert response.json() == {"tracing": True, "frames": 10}
+    # 已在追踪时沿用原有深度
+    response = client.post("/admin/tracemalloc/start", params={"frames": 50}, headers=headers)
+    assert response.json()["frames"] == tracemalloc.get_traceback_limit() == 10
+
+
+def test_invalid_token_is_rejected(client):
+    assert client.post("/admin/tracemalloc/start", headers={"X-Admin-Token": "wrong"}).status_code == 403
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from app.services.backtest import expand_grid, run_sweep, sharpe_key
+
+COST = 0.001
+
+
+def _prices(n: int = 300, seed: int = 3) -> np.ndarray:
+    return 50 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0.0005, 0.02, n)))
+
+
+def _ema(prices, span):
+    alpha = 2 / (span + 1)
+    out = [prices[0]]
+    for price in prices[1:]:
+        out.append(out[-1] + alpha * (price - out[-1]))
+    return out
+
+
+def _rsi(prices, periods):
+    """与 ewm(alpha=1/periods, adjust=False, min_periods=periods) 相同的 Wilder 平滑，逐日计算"""
+    out = [None] * len(prices)
+    gain = loss = None
+    for t in range(1, len(prices)):
+        change = prices[t] - prices[t - 1]
+        up, down = max(change, 0.0), max(-change, 0.0)
+        if gain is None:
+            gain, loss = up, down
+        else:
+            gain += (up - gain) / periods
+            loss += (down - loss) / periods
+        if t >= periods:
+            out[t] = 100.0 if loss == 0 else 100 - 100 / (1 + gain / loss)
+    return out
+
+
+def _naive_positions(prices, strategy, params):
+    held, state = [], 0.0
+    if strategy == "macd":
+        fast, slow = _ema(prices, params["fast"]), _ema(prices, params["slow"])
+        macd = [f - s for f, s in zip(fast, slow)]
+        signal = _ema(macd, params["signal"])
+    if strategy == "rsi":
+        rsi = _rsi(prices, params["periods"])
+    for t in range(len(prices)):
+        if strategy == "ma_cross":
+            if t + 1 >= params["slow"]:
+                fast = sum(prices[t + 1 - params["fast"]:t + 1]) / params["fast"]
+                slow = sum(prices[t + 1 - params["slow"]:t + 1]) / params["slow"]
+                state = 1.0 if fast > slow else 0.0
+        elif strategy == "rsi":
+            if rsi[t] is not None and rsi[t] < params["lower"]:
+                state = 1.0
+            elif rsi[t] is not None and rsi[t] > params["upper"]:
+                state = 0.0
+        else:
+            state = 1.0 if macd[t] > signal[t] else 0.0
+        held.append(state)
+    return held
+
+
+def _naive_backtest(prices, strategy, params):
+    held = _naive_positions(prices, strategy, params)
+    equity, exposure = [1.0], [0.0]
+    for t in range(1, len(prices)):
+        exposure.append(held[t - 1])
+        daily = prices[t] / prices[t - 1] - 1
+        equity.append(equity[-1] * (1 + exposure[t] * daily - abs(exposure[t] - exposure[t - 1]) * COST))
+    trades = sum(1 for t in range(len(held)) if held[t] > (held[t - 1] if t else 0.0))
+    return np.array(equity), trades, sum(exposure) / len(exposure)
+
+
+@pytest.mark.parametrize("strategy, params", [
+    ("ma_cross", {"fast": 5, "slow": 20}),
+    ("ma_cross", {"fast": 10, "slow": 50}),
+    ("rsi", {"periods": 14, "lower": 40, "upper": 60}),
+    ("macd", {"fast": 12, "slow": 26, "signal": 9}),
+])
+def test_run_sweep_matches_naive_loop(strategy, params):
+    prices = _prices()
+    sweep = run_sweep(prices, strategy, [params], COST)
+    equity, trades, exposure = _naive_backtest(prices.tolist(), strategy, params)
+
+    result = sweep["results"][0]
+    np.testing.assert_allclose(sweep["best_equity"], equity, rtol=1e-10)
+    assert result["trades"] == trades > 0
+    assert result["exposure"] == round(exposure, 4)
+    assert result["total_return"] == pytest.approx((equity[-1] - 1) * 100, abs=0.005)
+
+
+def test_run_sweep_picks_best_sharpe_of_grid():
+    prices = _prices(seed=7)
+    combinations = expand_grid("ma_cross", {"fast": [3, 5, 10], "slow": [20, 40]})
+    sweep = run_sweep(prices, "ma_cross", combinations, COST)
+
+    assert len(sweep["results"]) == 6
+    best = max(sweep["results"], key=sharpe_key)
+    assert sweep["results"][sweep["best"]]["sharp_ratio"] == best["sharp_ratio"]
+    equity, _, _ = _naive_backtest(prices.tolist(), "ma_cross", combinations[sweep["best"]])
+    np.testing.assert_allclose(sweep["best_equity"], equity, rtol=1e-10)
+
+
+def test_expand_grid_rejects_unknown_params():
+    with pytest.raises(ValueError):
+        expand_grid("rsi", {"window": 5})
+    assert expand_grid("rsi", {"lower": [20, 30]}) == [
+        {"periods": 14, "lower": 20, "upper": 70},
+        {"periods": 14, "lower": 30, "upper": 70},
+    ]
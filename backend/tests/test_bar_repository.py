@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+from app.services import bar_repository
+from app.services.bar_repository import StockBarRepository
+from app.utils.market_hours import last_session_close
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = []
+
+    async def find_one(self, query, projection=None, sort=None):
+        docs = [doc for doc in self.docs if doc["symbol"] == query["symbol"]]
+        return max(docs, key=lambda doc: doc["date"]) if docs else None
+
+    async def insert_many(self, docs, ordered=True):
+        self.docs.extend(docs)
+
+
+def _repository() -> StockBarRepository:
+    return StockBarRepository({"stock_bars": FakeCollection()})
+
+
+def _bars(*dates: str) -> pd.DataFrame:
+    n = len(dates)
+    return pd.DataFrame(
+        {"Open": [10.0] * n, "High": [11.0] * n, "Low": [9.0] * n, "Close": [10.5] * n, "Volume": [1000] * n},
+        index=pd.to_datetime(list(dates))
+    )
+
+
+def _freeze(monkeypatch, now: datetime):
+    monkeypatch.setattr(bar_repository, "last_session_close", lambda market: last_session_close(market, now))
+
+
+def test_lunch_break_does_not_append_half_day_bar(monkeypatch):
+    _freeze(monkeypatch, datetime(2026, 10, 14, 12, 0, tzinfo=ZoneInfo("Asia/Shanghai")))
+    repository = _repository()
+
+    written = asyncio.run(repository.append("600519.SS", _bars("2026-10-12", "2026-10-13", "2026-10-14")))
+
+    assert written == 2
+    assert [doc["date"] for doc in repository.collection.docs] == [datetime(2026, 10, 12), datetime(2026, 10, 13)]
+
+
+def test_hk_lunch_break_does_not_append_half_day_bar(monkeypatch):
+    _freeze(monkeypatch, datetime(2026, 10, 14, 12, 30, tzinfo=ZoneInfo("Asia/Hong_Kong")))
+    repository = _repository()
+
+    assert asyncio.run(repository.append("0700.HK", _bars("2026-10-13", "2026-10-14"))) == 1
+
+
+def test_append_after_close_writes_today_once(monkeypatch):
+    _freeze(monkeypatch, datetime(2026, 10, 14, 15, 30, tzinfo=ZoneInfo("Asia/Shanghai")))
+    repository = _repository()
+    hist = _bars("2026-10-13", "2026-10-14")
+
+    assert asyncio.run(repository.append("600519.SS", hist)) == 2
+    assert asyncio.run(repository.append("600519.SS", hist)) == 0
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta, timezone
+
+from app.utils.bar_store import BarStore
+from app.utils.market_hours import market_for_symbol
+
+CST = timezone(timedelta(hours=8))
+
+
+def _final(end: str, updated_at: datetime, market: str) -> bool:
+    return BarStore._is_final({"end": end, "updated_at": updated_at.isoformat()}, market)
+
+
+def test_cn_bars_final_only_after_afternoon_close():
+    assert not _final("20261014", datetime(2026, 10, 14, 12, 0, tzinfo=CST), "CN")
+    assert not _final("20261014", datetime(2026, 10, 14, 14, 59, tzinfo=CST), "CN")
+    assert _final("20261014", datetime(2026, 10, 14, 15, 0, tzinfo=CST), "CN")
+
+
+def test_hk_lunch_break_is_not_final():
+    assert not _final("20261014", datetime(2026, 10, 14, 12, 30, tzinfo=CST), "HK")
+    assert _final("20261014", datetime(2026, 10, 14, 16, 5, tzinfo=CST), "HK")
+
+
+def test_us_bars_use_new_york_close():
+    # 北京时间 16:30 时纽约当天尚未开盘
+    assert not _final("20261014", datetime(2026, 10, 14, 16, 30, tzinfo=CST), "US")
+    assert _final("20261014", datetime(2026, 10, 15, 4, 5, tzinfo=CST), "US")
+
+
+def test_range_ending_on_weekend_is_final_after_friday_close():
+    assert _final("20261017", datetime(2026, 10, 17, 10, 0, tzinfo=CST), "CN")
+    assert not _final("20261017", datetime(2026, 10, 16, 11, 0, tzinfo=CST), "CN")
+
+
+def test_benchmark_symbols_map_to_their_market():
+    assert market_for_symbol("sh000001") == "CN"
+    assert market_for_symbol("^SSE") == "CN"
+    assert market_for_symbol("^HSI") == "HK"
+    assert market_for_symbol("AAPL") == "US"
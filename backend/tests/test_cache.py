@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.utils.cache import FrameCache, TieredCache, estimate_size
+from app.utils.cache_backends import InMemoryCacheBackend, decode_json, encode_json
+
+
+def test_lru_evicts_least_recently_used():
+    cache = FrameCache(max_bytes=1024 * 1024, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # a 变为最近使用
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_byte_budget_evicts_oldest_entries():
+    cache = FrameCache(max_bytes=250)
+    for key in ("a", "b", "c"):
+        cache.set(key, "x", size=100)
+
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 200
+    cache.set("big", "x", size=300)  # 超过整个预算的条目不写入
+    assert cache.get("big") is None
+    assert cache.get("b") == "x" and cache.get("c") == "x"
+
+
+def test_ttl_expiry():
+    cache = FrameCache(max_bytes=1024, default_ttl=60)
+    cache.set("quote", {"price": 1.0}, ttl=0.05)
+    cache.set("info", {"name": "AAPL"})
+    time.sleep(0.1)
+
+    assert cache.get("quote") is None
+    assert cache.get("info") == {"name": "AAPL"}
+    assert cache.expirations == 1
+    assert cache.stats()["bytes"] == estimate_size({"name": "AAPL"})
+
+
+def test_estimate_size_counts_container_contents():
+    prices = [float(i) for i in range(10000)]
+    payload = {"dates": [f"2024-01-{i % 28 + 1:02d}" for i in range(10000)], "prices": prices}
+
+    assert estimate_size(payload) > 10000 * 24
+    assert estimate_size({"a": prices, "b": prices}) < estimate_size(prices) * 1.1  # 共享的对象只计一次
+    frame = pd.DataFrame({"close": np.arange(1000, dtype=float)})
+    assert estimate_size({"frame": frame}) >= frame.memory_usage(deep=True).sum()
+
+
+def _tiered(default_ttl: float = 3600) -> TieredCache:
+    return TieredCache(FrameCache(max_bytes=1024 * 1024, default_ttl=default_ttl), InMemoryCacheBackend())
+
+
+def test_l2_hit_keeps_remaining_ttl():
+    """其他 worker 从二级缓存回填时，进程内条目的有效期不超过二级缓存中剩余的时间"""
+    async def run():
+        writer, reader = _tiered(), _tiered()
+        reader.backend = writer.backend
+        writer.set(("yf_info", "AAPL"), {"price": 1.0}, ttl=60, dumps=encode_json)
+        await asyncio.gather(*writer._pending)
+
+        assert await reader.get(("yf_info", "AAPL"), loads=decode_json) == {"price": 1.0}
+        assert reader.l2_hits == 1
+        remaining = reader.ttl_remaining(("yf_info", "AAPL"))
+        assert remaining is not None and remaining <= 60
+
+    asyncio.run(run())
+
+
+def test_l2_hit_expires_with_backend_entry():
+    async def run():
+        writer, reader = _tiered(), _tiered()
+        reader.backend = writer.backend
+        writer.set("quote", {"price": 1.0}, ttl=0.2, dumps=encode_json)
+        await asyncio.gather(*writer._pending)
+
+        assert await reader.get("quote", loads=decode_json) == {"price": 1.0}
+        await asyncio.sleep(0.3)
+        assert reader.local.get("quote") is None
+        assert await reader.get("quote", loads=decode_json) is None
+
+    asyncio.run(run())
+
+
+def test_l2_hit_capped_by_local_default_ttl():
+    async def run():
+        writer, reader = _tiered(), _tiered(default_ttl=10)
+        reader.backend = writer.backend
+        writer.set("history", [1, 2, 3], ttl=3600, dumps=encode_json)
+        await asyncio.gather(*writer._pending)
+
+        assert await reader.get("history", loads=decode_json) == [1, 2, 3]
+        assert reader.ttl_remaining("history") <= 10
+
+    asyncio.run(run())
+
+
+def test_in_memory_backend_reports_remaining_ttl():
+    async def run():
+        backend = InMemoryCacheBackend()
+        await backend.set("key", b"value", ttl=30)
+        value, remaining = await backend.get_with_ttl("key")
+        assert value == b"value"
+        assert 29 < remaining <= 30
+        assert await backend.get_with_ttl("missing") == (None, None)
+
+    asyncio.run(run())
@@ -0,0 +1,49 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.utils.executor import DataFetchExecutor
+
+
+def test_timeout_includes_waiting_for_a_slot():
+    executor = DataFetchExecutor(max_workers=2, source_limits={"slow": 1})
+    release = threading.Event()
+
+    async def run():
+        first = asyncio.ensure_future(executor.run("slow", release.wait, 5, timeout=5))
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        with pytest.raises(TimeoutError):
+            await executor.run("slow", lambda: "ok", timeout=0.2)
+        waited = time.perf_counter() - start
+        release.set()
+        assert await first is True
+        return waited
+
+    try:
+        assert asyncio.run(run()) < 1
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_timeout_covers_slot_wait_and_call_together():
+    executor = DataFetchExecutor(max_workers=2, source_limits={"slow": 1})
+
+    async def run():
+        first = asyncio.ensure_future(executor.run("slow", time.sleep, 0.3, timeout=5))
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        with pytest.raises(TimeoutError):
+            # 名额在约 0.25 秒后释放，剩余的时间不足以完成 0.3 秒的调用
+            await executor.run("slow", time.sleep, 0.3, timeout=0.4)
+        elapsed = time.perf_counter() - start
+        await first
+        return elapsed
+
+    try:
+        assert asyncio.run(run()) < 0.5
+    finally:
+        executor.shutdown()
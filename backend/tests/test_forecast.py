@@ -0,0 +1,52 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import stock
+from app.services.forecast import forecast_series, simulate_paths
+from app.services.stock_analysis_service import StockAnalysisService
+
+
+def _frame(seed: int, n: int = 120) -> pd.DataFrame:
+    closes = 100 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.01, n)))
+    return pd.DataFrame({"日期": pd.bdate_range(end="2026-10-14", periods=n), "收盘": closes})
+
+
+def _batch(frames, **kwargs):
+    service = StockAnalysisService()
+
+    async def load_frames(symbols, start_date, end_date):
+        return {symbol: frames[symbol] for symbol in symbols}, {}
+
+    service._load_frames = load_frames
+    return asyncio.run(service.get_batch_forecast(list(frames), "20250101", end_date="20261014", **kwargs))
+
+
+def test_batch_forecast_does_not_depend_on_batch_members():
+    frames = {symbol: _frame(i) for i, symbol in enumerate(["600519", "000001", "300750"])}
+    together = _batch(frames)["forecasts"]
+    alone = _batch({"000001": frames["000001"]})["forecasts"]
+
+    assert together["000001"] == alone["000001"]
+    single = forecast_series("000001", frames["000001"].set_index("日期")["收盘"])
+    assert together["000001"] == single
+
+
+def test_per_symbol_seeds_match_single_symbol_simulation():
+    prices = [_frame(i)["收盘"].to_numpy() for i in range(3)]
+    for method in ("gbm", "bootstrap"):
+        batch = simulate_paths(prices, 5, 200, method, seed=[11, 12, 13])
+        assert np.array_equal(batch[1], simulate_paths(prices[1:2], 5, 200, method, seed=12)[0])
+
+
+def test_forecast_route_rejects_non_positive_days_and_paths():
+    app = FastAPI()
+    app.include_router(stock.router)
+    client = TestClient(app)
+
+    assert client.get("/AAPL/forecast", params={"days": 0}).status_code == 422
+    assert client.get("/AAPL/forecast", params={"paths": 0}).status_code == 422
+    assert client.get("/AAPL/forecast", params={"days": 61}).status_code == 422
@@ -0,0 +1,114 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.indicators import EWMA, MACD, DrawdownTracker, IndicatorSet, RollingVariance, WilderRSI
+
+
+def _prices(n: int = 300) -> pd.Series:
+    closes = 30 * np.exp(np.cumsum(np.random.default_rng(9).normal(0.0003, 0.02, n)))
+    return pd.Series(closes, index=pd.bdate_range("2025-01-01", periods=n))
+
+
+def _run(indicator, values):
+    return [indicator.update(float(value)) for value in values]
+
+
+def _wilder(changes: pd.Series, periods: int) -> pd.Series:
+    """以前 periods 个变动的简单平均为初值、alpha = 1 / periods 的指数加权"""
+    seeded = pd.concat([pd.Series([changes.iloc[:periods].mean()]), changes.iloc[periods:]], ignore_index=True)
+    return seeded.ewm(alpha=1 / periods, adjust=False).mean()
+
+
+def test_ewma_matches_pandas():
+    prices = _prices()
+    np.testing.assert_allclose(_run(EWMA(20), prices), prices.ewm(span=20, adjust=False).mean(), rtol=1e-12)
+
+
+def test_macd_matches_pandas():
+    prices = _prices()
+    macd = MACD()
+    _run(macd, prices)
+    line = prices.ewm(span=12, adjust=False).mean() - prices.ewm(span=26, adjust=False).mean()
+    signal = line.ewm(span=9, adjust=False).mean()
+
+    assert macd.value["macd"] == pytest.approx(line.iloc[-1], rel=1e-12)
+    assert macd.value["signal"] == pytest.approx(signal.iloc[-1], rel=1e-12)
+    assert macd.value["histogram"] == pytest.approx(line.iloc[-1] - signal.iloc[-1], rel=1e-9)
+
+
+def test_wilder_rsi_matches_pandas():
+    prices = _prices()
+    changes = prices.diff().iloc[1:].reset_index(drop=True)
+    avg_gain = _wilder(changes.clip(lower=0), 14)
+    avg_loss = _wilder(-changes.clip(upper=0), 14)
+    expected = 100 - 100 / (1 + avg_gain / avg_loss)
+
+    values = _run(WilderRSI(14), prices)
+    assert values[:14] == [None] * 14
+    np.testing.assert_allclose(values[14:], expected, rtol=1e-9)
+
+
+def test_rolling_variance_matches_pandas():
+    returns = _prices().pct_change().iloc[1:]
+    rolling = RollingVariance(60)
+    variances = _run(rolling, returns)
+    expected = returns.rolling(60, min_periods=2).var()
+
+    assert variances[0] is None
+    np.testing.assert_allclose(variances[1:], expected.iloc[1:], rtol=1e-8)
+    assert rolling.mean == pytest.approx(returns.iloc[-60:].mean(), rel=1e-9)
+
+
+def test_drawdown_matches_pandas():
+    prices = _prices()
+    expected = -(prices / prices.cummax() - 1).min()
+    assert _run(DrawdownTracker(), prices)[-1] == pytest.approx(expected, rel=1e-12)
+
+
+def test_indicator_set_resumes_from_state():
+    prices = _prices()
+    full = IndicatorSet()
+    resumed = IndicatorSet()
+    for date, price in prices.iloc[:200].items():
+        full.update(date, price)
+        resumed.update(date, price)
+    resumed = IndicatorSet.from_state(resumed.state())
+    for date, price in prices.iloc[200:].items():
+        full.update(date, price)
+        resumed.update(date, price)
+
+    assert resumed.state() == full.state()
+    returns = prices.pct_change().iloc[1:]
+    technical = full.technical()
+    assert technical["volatility"] == pytest.approx(returns.iloc[-252:].std() * math.sqrt(252), rel=1e-9)
+
+
+def test_single_row():
+    indicators = IndicatorSet()
+    indicators.update(pd.Timestamp("2026-10-14"), 10.0)
+    technical = indicators.technical()
+
+    assert math.isnan(technical["volatility"]) and math.isnan(technical["sharpe_ratio"])
+    assert math.isnan(technical["rsi"])
+    assert technical["macd"]["macd"] == 0  # 与 pandas 对单个值做 ewm 的结果一致
+    assert indicators.drawdown.max_drawdown == 0
+    assert indicators.since == indicators.last_date == pd.Timestamp("2026-10-14")
+
+
+def test_leading_nans_are_skipped():
+    prices = _prices(120)
+    padded = pd.concat([pd.Series(np.nan, index=pd.bdate_range(end="2024-12-31", periods=5)), prices])
+    clean, with_nans = IndicatorSet(), IndicatorSet()
+    for date, price in prices.items():
+        clean.update(date, price)
+    for date, price in padded.items():
+        with_nans.update(date, price)
+
+    assert with_nans.state() == clean.state()
+    assert with_nans.since == prices.index[0]
+    assert with_nans.macd.value["macd"] == pytest.approx(
+        (padded.ewm(span=12, adjust=False).mean() - padded.ewm(span=26, adjust=False).mean()).iloc[-1], rel=1e-12
+    )
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.metric_engine import METRICS, PriceMatrix, rounded
+
+RISK_FREE = 0.03
+
+
+def _closes() -> pd.DataFrame:
+    rng = np.random.default_rng(5)
+    dates = pd.bdate_range("2026-01-01", periods=250)
+    frame = pd.DataFrame(
+        {symbol: 20 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, len(dates)))) for symbol in ("A", "B", "C")},
+        index=dates
+    )
+    frame.iloc[:30, 1] = np.nan  # B 上市较晚
+    return frame
+
+
+def _pandas_metrics(prices: pd.Series, market: pd.Series) -> dict:
+    valid = prices.dropna()
+    returns = prices.pct_change(fill_method=None).dropna()
+    cumulative = valid / valid.iloc[0]
+    aligned = pd.concat([returns, market], axis=1, join="inner").dropna()
+    return {
+        "last_price": valid.iloc[-1],
+        "total_return": (valid.iloc[-1] / valid.iloc[0] - 1) * 100,
+        "volatility": returns.std() * np.sqrt(252) * 100,
+        "sharp_ratio": (returns.mean() * 252 - RISK_FREE) / (returns.std() * np.sqrt(252)),
+        "max_drawdown": (cumulative / cumulative.cummax() - 1).min() * 100,
+        "beta": aligned.iloc[:, 0].cov(aligned.iloc[:, 1]) / aligned.iloc[:, 1].var(),
+    }
+
+
+def test_matches_pandas_including_leading_nans():
+    closes = _closes()
+    market = closes["A"].pct_change().iloc[1:] * 0.5 + 0.001
+    matrix = PriceMatrix(closes.to_numpy(), closes.index, closes.columns)
+    values = matrix.compute(METRICS, market_returns=matrix.market_returns_for(market), risk_free_rate=RISK_FREE)
+
+    for i, symbol in enumerate(closes.columns):
+        expected = _pandas_metrics(closes[symbol], market)
+        for metric in METRICS:
+            assert values[metric][i] == pytest.approx(expected[metric], rel=1e-9), (symbol, metric)
+
+
+def test_from_closes_aligns_dates_and_fills_suspensions():
+    a = pd.Series([10.0, 11.0, 12.0, 13.0], index=pd.bdate_range("2026-03-02", periods=4))
+    b = pd.Series([5.0, 6.0], index=pd.DatetimeIndex(["2026-03-03", "2026-03-05"]))
+    matrix = PriceMatrix.from_closes({"A": a, "B": b})
+
+    assert list(matrix.symbols) == ["A", "B"]
+    np.testing.assert_array_equal(matrix.prices[:, 1], [np.nan, 5.0, 5.0, 6.0])
+    assert matrix.compute(("total_return",))["total_return"][1] == pytest.approx(20.0)
+
+
+def test_single_row():
+    values = rounded(PriceMatrix(np.array([[10.0, np.nan]])).compute(METRICS, market_returns=np.array([])))
+
+    assert values["last_price"] == [10.0, None]
+    assert values["total_return"] == [0.0, None]
+    assert values["max_drawdown"] == [0.0, None]
+    for metric in ("volatility", "sharp_ratio", "beta"):
+        assert values[metric] == [None, None]
+
+
+def test_constant_prices_have_zero_sharpe():
+    values = PriceMatrix(np.full(20, 10.0)).compute(("volatility", "sharp_ratio"))
+    assert values["volatility"][0] == 0
+    assert values["sharp_ratio"][0] == 0
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+
+import orjson
+from fastapi import WebSocketDisconnect
+
+from app.api import quotes
+
+
+class FakeHub:
+    def subscribe(self, subscription, symbol):
+        subscription.symbols.add(symbol)
+
+    def unsubscribe(self, subscription, symbol):
+        subscription.symbols.discard(symbol)
+
+    def remove(self, subscription):
+        subscription.symbols.clear()
+
+
+class FakeWebSocket:
+    def __init__(self, incoming, fail_send: bool = False):
+        self.incoming = list(incoming)
+        self.sent = []
+        self.fail_send = fail_send
+
+    async def accept(self):
+        pass
+
+    async def receive_text(self):
+        await asyncio.sleep(0.01)  # 让发送协程先处理队列中的消息
+        if not self.incoming:
+            raise WebSocketDisconnect()
+        return self.incoming.pop(0)
+
+    async def send_text(self, text):
+        if self.fail_send:
+            raise RuntimeError("socket closed")
+        self.sent.append(orjson.loads(text))
+
+
+def _stream(websocket, symbols=None):
+    quotes.init_router(FakeHub())
+
+    async def run():
+        await quotes.quote_stream(websocket, symbols)
+        # 连接处理结束时发送任务应已结束，不会留在事件循环中
+        return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    return asyncio.run(run())
+
+
+def test_sender_finishes_with_the_connection():
+    websocket = FakeWebSocket([orjson.dumps({"action": "subscribe", "symbols": ["msft"]}).decode()])
+
+    assert _stream(websocket, "AAPL") == []
+    assert websocket.sent == [
+        {"type": "subscribed", "symbols": ["AAPL"]},
+        {"type": "subscribed", "symbols": ["AAPL", "MSFT"]},
+    ]
+
+
+def test_sender_errors_are_logged(caplog):
+    with caplog.at_level(logging.WARNING, logger="app.api.quotes"):
+        assert _stream(FakeWebSocket([], fail_send=True), "AAPL") == []
+    assert "socket closed" in caplog.text
@@ -0,0 +1,98 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services import stock_analysis_service
+from app.services.stock_analysis_service import CoveredFrame, StockAnalysisService
+from app.utils.cache import FrameCache, TieredCache
+
+# 上游最新的K线为 2026-10-14（周三）
+BARS = pd.DataFrame({
+    "日期": pd.bdate_range("2026-01-01", "2026-10-14").strftime("%Y-%m-%d"),
+})
+BARS["收盘"] = np.arange(len(BARS), dtype=float) + 100
+
+
+class FakeBarStore:
+    def __init__(self):
+        self.calls = []
+
+    def sync(self, namespace, symbol, start_date, end_date, fetch, date_column, price_column):
+        self.calls.append((start_date, end_date))
+        dates = pd.to_datetime(BARS["日期"])
+        mask = (dates >= pd.Timestamp(start_date)) & (dates <= pd.Timestamp(end_date))
+        return BARS[mask.values].reset_index(drop=True)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = FakeBarStore()
+    monkeypatch.setattr(stock_analysis_service, "bar_store", store)
+    return store
+
+
+@pytest.fixture
+def service(store):
+    service = StockAnalysisService()
+    service._cache = TieredCache(FrameCache(max_bytes=64 * 1024 * 1024))
+    return service
+
+
+def _get(service, start, end):
+    return asyncio.run(service._get_stock_data("600519", start, end))
+
+
+def _dates(df):
+    return df["日期"].iloc[0], df["日期"].iloc[-1]
+
+
+def test_slice_includes_both_ends_and_skips_non_trading_days():
+    covered = CoveredFrame(BARS, "20260101", "20261014")
+    assert _dates(covered.slice("20260105", "20260109")) == ("2026-01-05", "2026-01-09")
+    # 周末为边界时取区间内的交易日
+    assert _dates(covered.slice("20260103", "20260111")) == ("2026-01-05", "2026-01-09")
+    assert covered.slice("20261015", "20261020").empty
+    assert covered.contains("20260101", "20261014")
+    assert not covered.contains("20251231", "20261014")
+    assert not covered.contains("20260101", "20261015")
+
+
+def test_request_inside_cached_range_is_sliced_without_fetching(service, store):
+    _get(service, "20260301", "20260930")
+    df = _get(service, "20260401", "20260430")
+
+    assert store.calls == [("20260301", "20260930")]
+    assert _dates(df) == ("2026-04-01", "2026-04-30")
+
+
+def test_request_widens_cached_range_on_either_side(service, store):
+    _get(service, "20260301", "20260630")
+
+    df = _get(service, "20260201", "20260315")
+    assert store.calls[-1] == ("20260201", "20260630")
+    assert _dates(df) == ("2026-02-02", "2026-03-13")
+
+    df = _get(service, "20260601", "20260731")
+    assert store.calls[-1] == ("20260201", "20260731")
+    assert _dates(df) == ("2026-06-01", "2026-07-31")
+
+    # 合并后的区间已覆盖两端之间的所有请求
+    _get(service, "20260210", "20260720")
+    assert len(store.calls) == 3
+
+
+def test_request_beyond_newest_bar(service, store):
+    _get(service, "20260901", "20261014")
+
+    df = _get(service, "20260901", "20261016")
+    assert store.calls[-1] == ("20260901", "20261016")
+    assert _dates(df) == ("2026-09-01", "2026-10-14")
+
+    # 覆盖区间已延伸到 10-16，没有新的K线时不再重复获取
+    _get(service, "20261001", "20261016")
+    assert len(store.calls) == 2
+    with pytest.raises(Exception, match="No data available"):
+        _get(service, "20261015", "20261016")
+    assert len(store.calls) == 2
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from app.utils.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"price": 1.0}
+
+    async def run():
+        results = await asyncio.gather(*[flight.do("AAPL", fetch) for _ in range(10)])
+        assert flight.inflight_count() == 0
+        return results
+
+    results = asyncio.run(run())
+    assert calls == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key
+
+    async def run():
+        return await asyncio.gather(flight.do("a", lambda: fetch("a")), flight.do("b", lambda: fetch("b")))
+
+    assert asyncio.run(run()) == ["a", "b"]
+    assert sorted(calls) == ["a", "b"]
+
+
+def test_key_cleared_after_exception():
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        if calls == 1:
+            raise ValueError("upstream down")
+        return "ok"
+
+    async def run():
+        results = await asyncio.gather(*[flight.do("AAPL", fetch) for _ in range(3)], return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        assert flight.inflight_count() == 0
+        # 失败的请求不会被缓存，下一次调用重新执行
+        return await flight.do("AAPL", fetch)
+
+    assert asyncio.run(run()) == "ok"
+    assert calls == 2
+
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("AAPL", fetch))
+        second = asyncio.ensure_future(flight.do("AAPL", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "ok"
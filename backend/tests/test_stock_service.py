@@ -0,0 +1,43 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.services import stock_service
+from app.services.stock_service import StockService
+from app.utils.market_hours import last_session_close
+
+SHANGHAI = ZoneInfo("Asia/Shanghai")
+
+
+def _hist(end: str, n: int = 40) -> pd.DataFrame:
+    dates = pd.bdate_range(end=end, periods=n)
+    closes = 100 + np.cumsum(np.random.default_rng(0).normal(0, 1, n))
+    return pd.DataFrame({"Close": closes}, index=dates)
+
+
+def _freeze(monkeypatch, now: datetime):
+    monkeypatch.setattr(stock_service, "last_session_close", lambda market: last_session_close(market, now))
+
+
+def test_lunch_break_does_not_advance_checkpoint(monkeypatch):
+    service = StockService(AsyncIOMotorClient())
+    hist = _hist("2026-10-14")
+
+    _freeze(monkeypatch, datetime(2026, 10, 14, 12, 0, tzinfo=SHANGHAI))
+    checkpoint, live = service._advance_indicators("600519.SS", hist)
+
+    assert checkpoint.last_date == pd.Timestamp("2026-10-13")
+    assert live.last_date == pd.Timestamp("2026-10-14")
+    assert live.last_price == hist["Close"].iloc[-1]
+
+    # 收盘后当日的收盘价可能与午间不同，检查点应从前一交易日续算
+    hist.iloc[-1, 0] += 1.5
+    _freeze(monkeypatch, datetime(2026, 10, 14, 15, 30, tzinfo=SHANGHAI))
+    resumed, _ = service._advance_indicators("600519.SS", hist, checkpoint.state())
+    rebuilt, _ = service._advance_indicators("600519.SS", hist)
+
+    assert resumed.last_date == pd.Timestamp("2026-10-14")
+    assert resumed.state() == rebuilt.state()